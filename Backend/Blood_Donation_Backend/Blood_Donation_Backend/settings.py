@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,7 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'accounts.load_shedding.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +83,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than shared-cache memory, so concurrency tests see real
+        # write locking (busy timeout) instead of immediate "table is locked"
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Region shards (accounts.sharding): region -> database alias. Profiles, medical
+# records, donations and appointments live in their user's region database;
+# everything else stays on 'default'. DJANGO_SHARDS=north,south adds one SQLite
+# file per region for local testing. Only ever append regions: a region's
+# position fixes the id block its rows are numbered from.
+SHARDS = {'default': 'default'}
+DEFAULT_REGION = 'default'
+
+for region in filter(None, os.environ.get('DJANGO_SHARDS', '').split(',')):
+    DATABASES[f'shard_{region}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'shard_{region}.sqlite3',
+    }
+    SHARDS[region] = f'shard_{region}'
+
+DATABASE_ROUTERS = ['accounts.sharding.RegionRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by all worker processes on the host (profile payloads, metrics). Point
+# this at Redis/Memcached when running on more than one machine.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        # The default of 300 entries is below one profile payload plus version
+        # key per active user, and each cull then drops a third of the files at
+        # random. Culling only ever costs a cache miss: an evicted version key
+        # is replaced by a fresh one, never by an older value.
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
     }
 }
 
@@ -120,6 +164,43 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Logging
+# Records are redacted and sampled in the request thread, then handed to a
+# background listener thread that formats and writes them.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'redact_phi': {
+            '()': 'accounts.log.RedactPHIFilter',
+        },
+        'sample': {
+            '()': 'accounts.log.SamplingFilter',
+            'rate': 1.0 if DEBUG else 0.1,
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'accounts.log.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'accounts.log.QueueListenerHandler',
+            'filters': ['redact_phi', 'sample'],
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'accounts': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -131,6 +212,85 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Token-bucket throttling (accounts.throttling)
+# 'capacity' is the burst size, 'per_minute' the sustained refill rate. The
+# login 'user' bucket is per (client IP, username) and only failed logins spend it.
+THROTTLE_STORE_PATH = BASE_DIR / 'throttle.sqlite3'
+
+THROTTLE_BUCKETS = {
+    'login': {
+        'ip': {'capacity': 20, 'per_minute': 10},
+        'user': {'capacity': 5, 'per_minute': 2},
+    },
+    'register': {
+        'ip': {'capacity': 5, 'per_minute': 1},
+    },
+    'emergency_response': {
+        'user': {'capacity': 10, 'per_minute': 5},
+    },
+}
+
+# Donor notifications (accounts.notifications)
+NOTIFICATION_BACKEND = 'accounts.notifications.ConsoleBackend'
+EMERGENCY_NOTIFY_URGENCIES = ['critical']
+DONATION_INTERVAL_DAYS = 56
+
+# Offline geocoding (accounts.geocoding): postal code / place centroids as CSV
+# (postal_code, place, latitude, longitude) or a GeoNames postal dump (*.txt)
+GEOCODER_GAZETTEER = BASE_DIR / 'gazetteer.csv'
+
+# On-demand request profiling (accounts.profiling). Requests sent with an
+# X-Profile token from `manage.py profiles token` are always profiled.
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 200
+
+# Hot/cold archival (accounts.archive): closed rows older than this move to the
+# archive tables
+ARCHIVE_RETENTION_DAYS = {
+    'donations': 365,
+    'emergency_requests': 90,
+}
+
+# Load shedding (accounts.load_shedding), per worker process: at most
+# 'concurrency' requests run at once; keep it below the server's threads per
+# process so waiting requests queue here. Classes are listed highest priority
+# first. 'share' caps the slots a class and those below it may hold together;
+# 'queue' and 'timeout' (seconds) bound how many wait and for how long before
+# being shed with 503 + Retry-After. A class without 'paths' is the fallback.
+# 'concurrency': 0 turns it off.
+LOAD_SHEDDING = {
+    'concurrency': 8,
+    'retry_after': 5,
+    'exempt': [r'^/api/metrics/$'],
+    'classes': {
+        'emergency': {
+            'paths': [r'^/api/emergency-(requests|responses)/'],
+            'queue': 64,
+            'timeout': 10.0,
+            'retry_after': 1,
+        },
+        'default': {'share': 0.75, 'queue': 16, 'timeout': 2.0},
+        'bulk': {
+            'paths': [r'^/api/(profile|donations|exports|analytics|forecasts|search)/'],
+            'share': 0.5,
+            'queue': 4,
+            'timeout': 0.5,
+            'retry_after': 30,
+        },
+    },
+}
+
+# Background job queue (accounts.jobs); periodic jobs run every 'interval' seconds
+JOB_SCHEDULE = {
+    'notification-outbox-sweep': {'task': 'notifications.process_outbox', 'interval': 60},
+    'expire-emergency-requests': {'task': 'emergency.expire_requests', 'interval': 300},
+    'prune-sync-tombstones': {'task': 'sync.prune_tombstones', 'interval': 24 * 60 * 60},
+    'refresh-analytics-rollups': {'task': 'analytics.refresh_rollups', 'interval': 15 * 60},
+    'nightly-shortage-forecast': {'task': 'forecast.shortages', 'interval': 24 * 60 * 60},
+    'archive-closed-records': {'task': 'archive.closed_records', 'interval': 24 * 60 * 60},
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,16 @@
+"""
+Settings for the test suite:
+
+    python manage.py test --settings=Blood_Donation_Backend.test_settings
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# A spare shard database for accounts.test_sharding, which turns it into a
+# region with override_settings(SHARDS=...). The test runner only creates it
+# for test cases that list it in `databases`.
+DATABASES['shard_test'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'shard_test.sqlite3',
+    'TEST': {'NAME': BASE_DIR / 'shard_test_db.sqlite3'},
+}
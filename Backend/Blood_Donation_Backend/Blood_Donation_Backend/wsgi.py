@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Blood_Donation_Backend.settings')
 
 application = get_wsgi_application()
+
+# Opt-in: pay the first request's import/URL/serializer/database costs now
+if os.environ.get('DJANGO_WARMUP', '').lower() in ('1', 'true', 'yes'):
+    from accounts.warmup import warm_up
+    warm_up()
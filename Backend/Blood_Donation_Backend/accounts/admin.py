@@ -0,0 +1,273 @@
+"""
+Admin for operations staff.
+
+The donor tables run to millions of rows, so their change lists never run an
+exact ``COUNT(*)`` (``EstimatedCountPaginator``), list in id order and only
+filter on indexed columns, join the rows ``__str__`` needs
+(``list_select_related``) and pick users by id (``raw_id_fields``). Bulk
+actions are one UPDATE each.
+
+Sharded models (see accounts.sharding) list one region at a time, chosen with
+the Region filter; single objects are found in whichever shard holds them.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import (
+    UserProfile, MedicalAllergy, Medication, MedicalCondition, DonationCenter,
+    Donation, EmergencyRequest, EmergencyResponse, DonationAppointment, Tombstone
+)
+from .sharding import db_for_region, is_multi_region, shard_aliases
+from .sync import SYNC_STREAMS
+
+# Filtered change lists count at most this many rows
+COUNT_LIMIT = 10000
+
+SYNC_KINDS = {model: kind for kind, (model, _, _) in SYNC_STREAMS.items()}
+
+
+def estimated_row_count(model, using='default'):
+    """The planner's row count estimate for ``model``'s table, or None if there is none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 exists once ANALYZE has run; each stat starts with the row count
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # PostgreSQL reports -1 for a table that was never analyzed
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts a whole large table.
+
+    Unfiltered lists of more than ``COUNT_LIMIT`` rows use the planner's
+    estimate; everything else is counted up to ``COUNT_LIMIT``, so pages past
+    that are not linked until the list is filtered further.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:COUNT_LIMIT].count()
+
+
+class RegionListFilter(admin.SimpleListFilter):
+    """Points the change list at one region's database; only shown with more than one region."""
+    title = 'region'
+    parameter_name = 'region'
+
+    def lookups(self, request, model_admin):
+        if not is_multi_region():
+            return []
+        return [(region, region) for region in settings.SHARDS]
+
+    def choices(self, changelist):
+        # There is no "All": a change list reads one database
+        selected = self.value() or settings.DEFAULT_REGION
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': selected == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(db_for_region(self.value()))
+
+
+class EmergencyStatusListFilter(admin.SimpleListFilter):
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return EmergencyRequest.STATUS_CHOICES
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        if self.value() == 'active':
+            return queryset.filter(status='active')
+        # Repeat the condition of the partial emergency_status_idx so the planner can use it
+        return queryset.filter(~Q(status='active'), status=self.value())
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Sorting by other columns would sort the whole table
+    ordering = ('-id',)
+    sortable_by = ()
+
+
+class ShardedAdmin(LargeTableAdmin):
+    raw_id_fields = ('user',)
+    list_select_related = ('user',)
+    list_filter = (RegionListFilter,)
+
+    def get_object(self, request, object_id, from_field=None):
+        queryset = self.get_queryset(request)
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except (ValidationError, ValueError):
+            return None
+        # Ids are unique across shards (sharding.seed_id_blocks)
+        for alias in shard_aliases():
+            obj = queryset.using(alias).filter(**{field.name: object_id}).first()
+            if obj is not None:
+                return obj
+        return None
+
+    def delete_model(self, request, obj):
+        kind = SYNC_KINDS.get(self.model)
+        using = obj._state.db
+        with transaction.atomic(using=using):
+            if kind:
+                # Offline clients drop the row on their next /api/sync/
+                Tombstone.objects.using(using).create(user_id=obj.user_id, kind=kind, object_id=obj.pk)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        kind = SYNC_KINDS.get(self.model)
+        with transaction.atomic(using=queryset.db):
+            if kind:
+                Tombstone.objects.using(queryset.db).bulk_create([
+                    Tombstone(user_id=user_id, kind=kind, object_id=pk)
+                    for pk, user_id in queryset.values_list('pk', 'user_id')
+                ])
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'blood_type', 'phone_number', 'donation_eligibility', 'updated_at')
+    # Filled from the address by accounts.geocoding
+    readonly_fields = ('latitude', 'longitude', 'created_at', 'updated_at')
+
+
+@admin.register(MedicalAllergy)
+class MedicalAllergyAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'allergy_name', 'severity', 'updated_at')
+
+
+@admin.register(Medication)
+class MedicationAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'medication_name', 'dosage', 'is_active', 'updated_at')
+
+
+@admin.register(MedicalCondition)
+class MedicalConditionAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'condition_name', 'is_chronic', 'diagnosed_date', 'updated_at')
+
+
+@admin.register(DonationCenter)
+class DonationCenterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'region', 'phone_number', 'operating_hours', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+@admin.register(Donation)
+class DonationAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'donation_center', 'scheduled_date', 'status', 'units_collected')
+    list_select_related = ('user', 'donation_center')
+    list_filter = (RegionListFilter, 'status')
+    autocomplete_fields = ('donation_center',)
+
+
+@admin.register(DonationAppointment)
+class DonationAppointmentAdmin(ShardedAdmin):
+    list_display = ('id', 'user', 'donation_center', 'appointment_date', 'status', 'reminder_sent')
+    list_select_related = ('user', 'donation_center')
+    list_filter = (RegionListFilter, 'status')
+    autocomplete_fields = ('donation_center',)
+    actions = ('mark_completed',)
+
+    @admin.action(description='Mark selected appointments completed', permissions=['change'])
+    def mark_completed(self, request, queryset):
+        # One UPDATE; update() skips auto_now, and sync reads updated_at
+        count = queryset.exclude(status__in=['completed', 'cancelled']).update(
+            status='completed', updated_at=timezone.now()
+        )
+        self.message_user(request, f'{count} appointments marked completed.')
+
+
+@admin.register(EmergencyRequest)
+class EmergencyRequestAdmin(LargeTableAdmin):
+    list_display = (
+        'id', 'hospital_name', 'blood_type_needed', 'units_needed', 'urgency', 'status',
+        'expires_at', 'responses_count', 'confirmed_count',
+    )
+    list_filter = (EmergencyStatusListFilter,)
+    # Maintained by EmergencyRequest.apply_response_change()
+    readonly_fields = ('responses_count', 'interested_count', 'confirmed_count', 'created_at', 'updated_at')
+    actions = ('expire_requests',)
+
+    @admin.action(description='Expire selected active requests', permissions=['change'])
+    def expire_requests(self, request, queryset):
+        count = queryset.filter(status='active').update(status='expired', updated_at=timezone.now())
+        self.message_user(request, f'{count} requests expired.')
+
+
+@admin.register(EmergencyResponse)
+class EmergencyResponseAdmin(LargeTableAdmin):
+    list_display = ('id', 'emergency_request', 'user', 'status', 'response_time')
+    list_select_related = ('emergency_request', 'user')
+    raw_id_fields = ('emergency_request', 'user')
+
+    def get_readonly_fields(self, request, obj=None):
+        # The request's counters follow the response, not the other way round
+        return ('emergency_request', 'user') if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if not change:
+                super().save_model(request, obj, form, change)
+                EmergencyRequest.apply_response_change(obj.emergency_request_id, new_status=obj.status)
+                return
+            new_status, obj.status = obj.status, form.initial['status']
+            if not obj.change_status(new_status):
+                # Changed concurrently; keep that status and save the other fields
+                obj.refresh_from_db(fields=['status'])
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            EmergencyRequest.apply_response_change(obj.emergency_request_id, old_status=obj.status)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list('emergency_request_id', 'status'))
+            super().delete_queryset(request, queryset)
+            for request_id, status in rows:
+                EmergencyRequest.apply_response_change(request_id, old_status=status)
@@ -1,4 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import ensure_fts_triggers
+        from .sharding import seed_id_blocks
+        post_migrate.connect(ensure_fts_triggers, sender=self)
+        post_migrate.connect(seed_id_blocks, sender=self)
@@ -0,0 +1,154 @@
+"""
+Hot/cold archival of closed donations and emergency requests.
+
+``archive_batch`` moves at most ``batch_size`` closed rows older than their
+retention window (``settings.ARCHIVE_RETENTION_DAYS``) from the live table to
+its archive table in one short transaction, ids unchanged. Emergency requests
+take their responses, outbox events and per-donor notification records with
+them (deleting the live request would cascade them away); requests with
+undelivered notifications wait.
+
+Full-history reads go through ``full_history`` (one ordered stream over both
+tables) and aggregates through ``history_querysets`` (sum over both tables in
+every shard). Donations are archived inside their region shard.
+"""
+import heapq
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Donation, EmergencyRequest, EmergencyResponse, NotificationOutbox, DonorNotification,
+    ArchivedDonation, ArchivedEmergencyRequest, ArchivedEmergencyResponse,
+    ArchivedNotificationOutbox, ArchivedDonorNotification
+)
+from .sharding import aliases_for
+
+ARCHIVES = {
+    'donations': {
+        'model': Donation,
+        'archive': ArchivedDonation,
+        'closed': {'status__in': ['completed', 'cancelled', 'no_show']},
+        'age_field': 'scheduled_date',
+        'date_field': 'scheduled_date',
+        'related': ('donation_center',),
+        'children': [],
+    },
+    'emergency_requests': {
+        'model': EmergencyRequest,
+        'archive': ArchivedEmergencyRequest,
+        'closed': {'status__in': ['fulfilled', 'expired', 'cancelled']},
+        # updated_at is when the request was closed
+        'age_field': 'updated_at',
+        'date_field': 'created_at',
+        'related': (),
+        # (live model, archive model, lookup of the parent id), parents first
+        'children': [
+            (EmergencyResponse, ArchivedEmergencyResponse, 'emergency_request_id'),
+            (NotificationOutbox, ArchivedNotificationOutbox, 'emergency_request_id'),
+            (DonorNotification, ArchivedDonorNotification, 'outbox__emergency_request_id'),
+        ],
+    },
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def history_models(model):
+    """The live model followed by its archive model, if it has one."""
+    for spec in ARCHIVES.values():
+        if spec['model'] is model:
+            return [model, spec['archive']]
+    return [model]
+
+
+def history_querysets(model):
+    """A queryset per (history model, shard) pair: sum or concatenate them for full history."""
+    return [m.objects.using(alias) for m in history_models(model) for alias in aliases_for(m)]
+
+
+def _copy(row, archive_model):
+    return archive_model(**{
+        field.attname: getattr(row, field.attname)
+        for field in archive_model._meta.concrete_fields
+        if field.attname != 'archived_at'
+    })
+
+
+def archive_candidates(kind, now=None, using='default'):
+    spec = ARCHIVES[kind]
+    cutoff = (now or timezone.now()) - timedelta(days=settings.ARCHIVE_RETENTION_DAYS[kind])
+    queryset = spec['model'].objects.using(using).filter(**spec['closed'], **{f"{spec['age_field']}__lt": cutoff})
+    if spec['model'] is EmergencyRequest:
+        queryset = queryset.exclude(outbox_events__status__in=['pending', 'processing'])
+    return queryset
+
+
+def archive_batch(kind, batch_size=DEFAULT_BATCH_SIZE, now=None, using='default'):
+    """Move one batch of ``kind`` in database ``using`` into its archive table; returns the number of rows moved."""
+    spec = ARCHIVES[kind]
+    with transaction.atomic(using=using):
+        ids = list(archive_candidates(kind, now, using).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+        # ignore_conflicts: a row copied by an interrupted run is not copied twice
+        spec['archive'].objects.using(using).bulk_create(
+            [_copy(row, spec['archive']) for row in spec['model'].objects.using(using).filter(pk__in=ids)],
+            ignore_conflicts=True,
+        )
+        for child_model, archive_model, parent_field in spec['children']:
+            archive_model.objects.using(using).bulk_create(
+                [_copy(row, archive_model)
+                 for row in child_model.objects.using(using).filter(**{f'{parent_field}__in': ids})],
+                ignore_conflicts=True,
+            )
+        spec['model'].objects.using(using).filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive(kinds=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0.0):
+    """Archive in bounded batches, pausing between them so writers get the lock; returns ``{kind: rows}``.
+
+    Sharded kinds are archived shard by shard, ``max_batches`` applying to each.
+    """
+    moved = {}
+    for kind in kinds or ARCHIVES:
+        moved[kind] = 0
+        for alias in aliases_for(ARCHIVES[kind]['model']):
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                count = archive_batch(kind, batch_size, using=alias)
+                moved[kind] += count
+                batches += 1
+                if count < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+    return moved
+
+
+def full_history(kind, using=None, **filters):
+    """Live and archived rows of ``kind`` in database ``using`` matching ``filters``, newest first, as one stream."""
+    spec = ARCHIVES[kind]
+    ordering = f"-{spec['date_field']}"
+    live = spec['model'].objects.using(using).filter(**filters).select_related(*spec['related']).order_by(ordering)
+    archived = spec['archive'].objects.using(using).filter(**filters).select_related(*spec['related']).order_by(ordering)
+    return heapq.merge(
+        live.iterator(), archived.iterator(),
+        key=lambda row: getattr(row, spec['date_field']), reverse=True,
+    )
+
+
+def archive_stats():
+    stats = {}
+    for kind, spec in ARCHIVES.items():
+        aliases = aliases_for(spec['model'])
+        stats[kind] = {
+            'live': sum(spec['model'].objects.using(alias).count() for alias in aliases),
+            'archived': sum(spec['archive'].objects.using(alias).count() for alias in aliases),
+            'eligible': sum(archive_candidates(kind, using=alias).count() for alias in aliases),
+        }
+    return stats
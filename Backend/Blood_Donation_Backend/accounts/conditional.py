@@ -0,0 +1,94 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the accounts API views.
+
+Validators are computed with one aggregate query (MAX(updated_at), COUNT) over
+the same queryset the view would serialize, so unchanged resources are
+answered with 304 before any serialization happens. Related rows serialized
+with each object (``conditional_related``) add their own MAX(updated_at).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from . import metrics
+
+COUNTERS = ('conditional.requests', 'conditional.with_validators', 'conditional.not_modified')
+
+_counters = metrics.BufferedCounters()
+
+
+def make_etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    For generic list/detail views whose model has ``updated_at``. Override
+    ``get_validators()`` to return ``(etag, last_modified)`` differently.
+    """
+    # Foreign keys serialized with each object, e.g. ('donation_center',); the
+    # related model needs ``updated_at`` too
+    conditional_related = ()
+
+    def get_validators(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        detail = lookup_url_kwarg in kwargs
+        if detail:
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        state = queryset.aggregate(
+            count=Count('pk'),
+            last_modified=Max('updated_at'),
+            **{f'related_{i}': Max(f'{path}__updated_at') for i, path in enumerate(self.conditional_related)},
+        )
+        versions = [value for key, value in state.items() if key != 'count']
+        etag = make_etag(
+            request.get_full_path(), request.user.pk, state['count'],
+            *(version.isoformat() if version else '' for version in versions),
+        )
+        if not detail:
+            # No Last-Modified on collections: deleting a row, or two changes
+            # within one second, leave the whole-second date where it was and
+            # If-Modified-Since would answer 304. The ETag has COUNT for that.
+            return etag, None
+        return etag, max(filter(None, versions), default=None)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        _counters.incr('conditional.requests')
+        if 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            _counters.incr('conditional.with_validators')
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            _counters.incr('conditional.not_modified')
+            return self._set_validators(not_modified, etag, timestamp)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_validators(response, etag, timestamp)
+        return response
+
+    def _set_validators(self, response, etag, timestamp):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+def conditional_stats():
+    # This process's latest counts; other processes' within BufferedCounters.interval
+    _counters.flush()
+    counters = metrics.get_counters(*COUNTERS)
+    requests = counters['conditional.requests']
+    not_modified = counters['conditional.not_modified']
+    return {
+        'requests': requests,
+        'with_validators': counters['conditional.with_validators'],
+        'not_modified': not_modified,
+        'hit_rate': round(not_modified / requests, 4) if requests else 0.0,
+    }
@@ -0,0 +1,123 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .archive import history_models
+from .models import Donation, DonationAppointment
+from .sharding import aliases_for
+
+# Flat values() projections: no model instances and no nested serializers per row
+EXPORTS = {
+    'donations': {
+        'model': Donation,
+        'date_field': 'scheduled_date',
+        'fields': [
+            'id', 'user_id', 'user__username', 'donation_center_id', 'donation_center__name',
+            'scheduled_date', 'actual_date', 'status', 'blood_type', 'units_collected',
+            'created_at', 'updated_at',
+        ],
+    },
+    'appointments': {
+        'model': DonationAppointment,
+        'date_field': 'appointment_date',
+        'fields': [
+            'id', 'user_id', 'user__username', 'donation_center_id', 'donation_center__name',
+            'appointment_date', 'status', 'reminder_sent', 'pre_screening_completed',
+            'created_at', 'updated_at',
+        ],
+    },
+}
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _day_start(value, name):
+    day = parse_date(value) if isinstance(value, str) else value
+    if day is None:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_export_queryset(kind, center=None, start=None, end=None, status=None, include_archived=False,
+                          using=None):
+    """Return a values_list() queryset for ``kind`` in database ``using`` narrowed by the optional filters.
+
+    ``start`` and ``end`` are inclusive dates; ``include_archived`` adds the
+    rows moved to the archive table (UNION ALL). Raises ValueError on bad input.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}'. Choose from: {', '.join(EXPORTS)}")
+    spec = EXPORTS[kind]
+    model = spec['model']
+    filters = {}
+
+    if center:
+        try:
+            filters['donation_center_id'] = int(center)
+        except (TypeError, ValueError):
+            raise ValueError('center must be an integer id')
+    if start:
+        filters[f"{spec['date_field']}__gte"] = _day_start(start, 'start')
+    if end:
+        filters[f"{spec['date_field']}__lt"] = _day_start(end, 'end') + timedelta(days=1)
+    if status:
+        valid = {choice for choice, _ in model.STATUS_CHOICES}
+        if status not in valid:
+            raise ValueError(f"status must be one of: {', '.join(sorted(valid))}")
+        filters['status'] = status
+
+    queryset = model.objects.using(using).filter(**filters).order_by('pk').values_list(*spec['fields'])
+    if include_archived:
+        for archive_model in history_models(model)[1:]:
+            archived = archive_model.objects.using(using).filter(**filters).order_by().values_list(*spec['fields'])
+            queryset = queryset.order_by().union(archived, all=True).order_by('id')
+    return queryset
+
+
+def build_export_querysets(kind, **options):
+    """One ``build_export_queryset`` per shard; pass them to ``iter_export`` to stream shard by shard."""
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}'. Choose from: {', '.join(EXPORTS)}")
+    return [build_export_queryset(kind, using=alias, **options) for alias in aliases_for(EXPORTS[kind]['model'])]
+
+
+def _rows(querysets, chunk_size):
+    if isinstance(querysets, QuerySet):
+        querysets = [querysets]
+    for queryset in querysets:
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(kind, querysets, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORTS[kind]['fields'])
+    for row in _rows(querysets, chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(kind, querysets, chunk_size=DEFAULT_CHUNK_SIZE):
+    fields = EXPORTS[kind]['fields']
+    for row in _rows(querysets, chunk_size):
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(kind, export_format, querysets, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream ``querysets`` (one queryset or a list of them, in order) as lines of ``export_format``."""
+    if export_format == 'csv':
+        return iter_csv(kind, querysets, chunk_size)
+    if export_format == 'ndjson':
+        return iter_ndjson(kind, querysets, chunk_size)
+    raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
@@ -0,0 +1,236 @@
+"""
+Offline geocoding of free-text addresses against a local gazetteer.
+
+``settings.GEOCODER_GAZETTEER`` points at a file of postal code and place
+centroids: a CSV with ``postal_code``, ``place``, ``latitude`` and
+``longitude`` columns (either key may be blank), or a GeoNames postal code
+dump (``*.txt``, tab separated). It is read once per process into two dicts.
+
+An address resolves to the postal code it contains, else to the most specific
+place named in it. Results, misses included, are memoized per normalized
+address in ``GeocodeCache`` and tagged with the gazetteer version, so
+replacing the file invalidates them. Nothing here makes a network call, so it
+is safe on save paths; ``manage.py geocode_addresses`` backfills in batches.
+"""
+import csv
+import hashlib
+import logging
+import re
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import profile_cache
+from .models import DonationCenter, GeocodeCache, UserProfile
+from .sharding import aliases_for, is_multi_region, mirror_center
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+COORDINATE = Decimal('0.00000001')
+# Longest place name tried, in words ("new york city")
+MAX_PLACE_WORDS = 4
+DEFAULT_BATCH_SIZE = 500
+
+_lock = threading.Lock()
+_gazetteer = None
+
+
+class Gazetteer:
+    def __init__(self, postal_codes, places, version):
+        self.postal_codes = postal_codes
+        self.places = places
+        self.version = version
+
+    def lookup(self, normalized):
+        """``(latitude, longitude, precision)`` for a normalized address, or None."""
+        parts = [part.split() for part in normalized.split(', ')]
+        tokens = [token for part in parts for token in part]
+        # Postal codes are the most precise; they usually come last
+        for i in range(len(tokens) - 1, -1, -1):
+            for key in (tokens[i], tokens[i] + tokens[i + 1] if i + 1 < len(tokens) else None):
+                if key in self.postal_codes:
+                    return (*self.postal_codes[key], 'postal')
+        for words in reversed(parts):
+            words = [word for word in words if not word.isdigit()]
+            for size in range(min(len(words), MAX_PLACE_WORDS), 0, -1):
+                for start in range(len(words) - size, -1, -1):
+                    name = ' '.join(words[start:start + size])
+                    if name in self.places:
+                        return (*self.places[name], 'place')
+        return None
+
+
+def normalize(address):
+    """Lowercased, punctuation-free address with its comma-separated parts kept."""
+    parts = (' '.join(TOKEN_RE.findall(part.lower())) for part in (address or '').split(','))
+    return ', '.join(part for part in parts if part)
+
+
+def _read_rows(path):
+    with open(path, newline='', encoding='utf-8') as fh:
+        if path.suffix == '.txt':
+            # GeoNames: country, postal code, place name, admin names/codes x6, lat, lon, accuracy
+            for row in csv.reader(fh, delimiter='\t'):
+                if len(row) >= 11:
+                    yield row[1], row[2], row[9], row[10]
+        else:
+            for row in csv.DictReader(fh):
+                yield row.get('postal_code', ''), row.get('place', ''), row['latitude'], row['longitude']
+
+
+def _centroids(points):
+    return {
+        key: (
+            Decimal(sum(lat for lat, _ in values) / len(values)).quantize(COORDINATE),
+            Decimal(sum(lon for _, lon in values) / len(values)).quantize(COORDINATE),
+        )
+        for key, values in points.items()
+    }
+
+
+def load_gazetteer(path):
+    postal_codes, places = {}, {}
+    for postal_code, place, latitude, longitude in _read_rows(path):
+        try:
+            point = (float(latitude), float(longitude))
+        except (TypeError, ValueError):
+            continue
+        # A postal code or place listed more than once resolves to the mean point
+        if postal_code.strip():
+            postal_codes.setdefault(''.join(TOKEN_RE.findall(postal_code.lower())), []).append(point)
+        if normalize(place):
+            places.setdefault(normalize(place).replace(',', ''), []).append(point)
+    stat = path.stat()
+    version = hashlib.sha1(f'{path.name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+    return Gazetteer(_centroids(postal_codes), _centroids(places), version)
+
+
+def get_gazetteer():
+    """The process-wide gazetteer; empty (version '') when no file is configured."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                path = getattr(settings, 'GEOCODER_GAZETTEER', None)
+                path = Path(path) if path else None
+                if path is None or not path.exists():
+                    logger.warning('No gazetteer file; addresses are not geocoded', extra={'data': {'path': str(path)}})
+                    _gazetteer = Gazetteer({}, {}, '')
+                else:
+                    _gazetteer = load_gazetteer(path)
+    return _gazetteer
+
+
+def geocode_many(addresses):
+    """
+    ``{address: (latitude, longitude) or None}`` for ``addresses``, reading the
+    cache with one query and writing new or stale entries in bulk.
+    """
+    gazetteer = get_gazetteer()
+    keys = {}
+    for address in addresses:
+        normalized = normalize(address)
+        if normalized:
+            keys[address] = (hashlib.sha1(normalized.encode()).hexdigest(), normalized)
+    if not gazetteer.version:
+        # Never cache results of an empty gazetteer
+        return dict.fromkeys(addresses)
+
+    cached = {
+        row.key: row
+        for row in GeocodeCache.objects.filter(key__in={key for key, _ in keys.values()})
+    }
+    fresh, stale = {}, []
+    for key, normalized in keys.values():
+        row = cached.get(key)
+        if row is not None and row.gazetteer_version == gazetteer.version:
+            continue
+        latitude, longitude, precision = gazetteer.lookup(normalized) or (None, None, '')
+        entry = GeocodeCache(
+            key=key, query=normalized, latitude=latitude, longitude=longitude,
+            precision=precision, gazetteer_version=gazetteer.version,
+        )
+        if row is not None:
+            entry.pk = row.pk
+            stale.append(entry)
+        fresh[key] = cached[key] = entry
+    if fresh:
+        GeocodeCache.objects.bulk_create([e for e in fresh.values() if e.pk is None], ignore_conflicts=True)
+        GeocodeCache.objects.bulk_update(stale, ['latitude', 'longitude', 'precision', 'gazetteer_version'])
+
+    results = {}
+    for address in addresses:
+        row = cached.get(keys[address][0]) if address in keys else None
+        results[address] = (row.latitude, row.longitude) if row is not None and row.latitude is not None else None
+    return results
+
+
+def geocode(address):
+    return geocode_many([address])[address]
+
+
+def fill_coordinates(instance, overwrite=True):
+    """Set ``instance.latitude``/``longitude`` from its address; returns True if they changed."""
+    if not overwrite and instance.latitude is not None and instance.longitude is not None:
+        return False
+    latitude, longitude = geocode(instance.address) or (None, None)
+    if (latitude, longitude) == (instance.latitude, instance.longitude):
+        return False
+    instance.latitude, instance.longitude = latitude, longitude
+    return True
+
+
+def _backfill(queryset, batch_size, fields):
+    """Geocode ``queryset`` in pk order, one cache query and one bulk UPDATE per batch; returns changed rows."""
+    changed, last_pk = [], 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return changed
+        last_pk = batch[-1].pk
+        coordinates = geocode_many({row.address for row in batch})
+        updated = []
+        for row in batch:
+            latitude, longitude = coordinates[row.address] or (None, None)
+            if (latitude, longitude) != (row.latitude, row.longitude):
+                row.latitude, row.longitude = latitude, longitude
+                updated.append(row)
+        if not updated:
+            continue
+        if 'updated_at' in fields:
+            # bulk_update() skips auto_now; sync clients must see the change
+            now = timezone.now()
+            for row in updated:
+                row.updated_at = now
+        queryset.model.objects.using(queryset.db).bulk_update(updated, fields)
+        changed.extend(updated)
+
+
+def backfill_coordinates(overwrite=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Geocode profile addresses in every shard (all of them with ``overwrite``,
+    else only those without coordinates) and centers that have none; returns
+    ``{'profiles': n, 'centers': n}`` rows changed.
+    """
+    profiles = 0
+    for alias in aliases_for(UserProfile):
+        queryset = UserProfile.objects.using(alias).exclude(address='').only('address', 'latitude', 'longitude', 'user_id')
+        if not overwrite:
+            queryset = queryset.filter(latitude__isnull=True)
+        changed = _backfill(queryset, batch_size, ['latitude', 'longitude', 'updated_at'])
+        for profile in changed:
+            profile_cache.bump_version(profile.user_id)
+        profiles += len(changed)
+
+    centers = _backfill(
+        DonationCenter.objects.exclude(address='').filter(latitude__isnull=True).only('address', 'latitude', 'longitude'),
+        batch_size, ['latitude', 'longitude', 'updated_at'],
+    )
+    if is_multi_region():
+        for center in centers:
+            mirror_center(DonationCenter.objects.get(pk=center.pk))
+    return {'profiles': profiles, 'centers': len(centers)}
@@ -0,0 +1,210 @@
+"""
+A small job queue stored in the project database.
+
+Tasks are plain functions registered with ``@task('name')`` (see
+``accounts/tasks.py``) and queued with ``enqueue('name', ...)``. Workers claim
+jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the backend supports it
+and with a compare-and-set UPDATE on SQLite.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Running jobs locked for longer than this are assumed to belong to a dead worker
+LOCK_TIMEOUT = timedelta(minutes=15)
+# How often each worker looks for such jobs
+STALE_SWEEP_SECONDS = 60
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    from . import tasks  # noqa: F401 - registers the built-in tasks
+    return TASKS[name]
+
+
+def enqueue(name, *args, run_at=None, delay=None, priority=0, max_attempts=3, **kwargs):
+    get_task(name)  # fail fast on unknown task names
+    if delay is not None:
+        run_at = timezone.now() + timedelta(seconds=delay)
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def schedule_periodic(schedule=None):
+    """
+    Make sure every entry of ``settings.JOB_SCHEDULE`` has exactly one job row.
+
+    ``JOB_SCHEDULE = {'key': {'task': 'name', 'interval': seconds, ...}}``
+    """
+    schedule = settings.JOB_SCHEDULE if schedule is None else schedule
+    for key, entry in schedule.items():
+        # Refresh the definition but keep the next run time of an existing row
+        Job.objects.update_or_create(
+            periodic_key=key,
+            defaults={
+                'name': entry['task'],
+                'interval_seconds': entry['interval'],
+                'args': entry.get('args', []),
+                'kwargs': entry.get('kwargs', {}),
+                'priority': entry.get('priority', 0),
+            },
+        )
+
+
+def requeue_stale():
+    """
+    Treat jobs stranded in 'running' by a crashed worker as failed runs: retry
+    them with backoff, or fail them once ``max_attempts`` is used up.
+
+    The lost run was already counted in ``attempts`` when it was claimed.
+    """
+    stale = Job.objects.filter(status='running', locked_at__lt=timezone.now() - LOCK_TIMEOUT)
+    recovered = 0
+    for job in stale:
+        error = f'Lock held by {job.locked_by} since {job.locked_at:%Y-%m-%d %H:%M:%S} expired'
+        recovered += _retry_or_fail(job, error)
+    return recovered
+
+
+def _ready_jobs(now):
+    return Job.objects.filter(status='queued', run_at__lte=now).order_by('-priority', 'run_at')
+
+
+def claim(worker_id):
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _ready_jobs(now).select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(
+                status='running', locked_by=worker_id, locked_at=now, started_at=now,
+                attempts=F('attempts') + 1,
+            )
+    else:
+        # SQLite has no row locks: race on a conditional UPDATE instead
+        for job in _ready_jobs(now)[:10]:
+            claimed = Job.objects.filter(pk=job.pk, status='queued').update(
+                status='running', locked_by=worker_id, locked_at=now, started_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                break
+        else:
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    try:
+        get_task(job.name)(*job.args, **job.kwargs)
+    except Exception as e:
+        logger.exception('Job failed', extra={'data': {'job_id': job.pk, 'name': job.name}})
+        _retry_or_fail(job, str(e))
+        return False
+    _finish(job, status='succeeded', last_error='')
+    return True
+
+
+def _retry_or_fail(job, error):
+    """Queue ``job`` again after its backoff, or fail it once ``max_attempts`` is used up."""
+    if job.attempts < job.max_attempts:
+        backoff = min(BACKOFF_BASE_SECONDS * 2 ** (job.attempts - 1), BACKOFF_MAX_SECONDS)
+        return _finish(job, status='queued', run_at=timezone.now() + timedelta(seconds=backoff), last_error=error)
+    return _finish(job, status='failed', last_error=error)
+
+
+def _finish(job, status, **fields):
+    fields.update(locked_by='', locked_at=None, finished_at=timezone.now())
+    if job.interval_seconds and status in ('succeeded', 'failed'):
+        # Periodic jobs go straight back to the queue for their next run
+        status = 'queued'
+        fields.update(
+            attempts=0,
+            run_at=max(job.run_at + timedelta(seconds=job.interval_seconds), timezone.now()),
+        )
+    return Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(status=status, **fields)
+
+
+def work(worker_id, stop_event=None, poll_interval=1.0, burst=False):
+    """Claim and run jobs until ``stop_event`` is set (or the queue is empty when ``burst``)."""
+    processed = 0
+    next_sweep = 0.0
+    while stop_event is None or not stop_event.is_set():
+        try:
+            if time.monotonic() >= next_sweep:
+                # Long-running workers must notice jobs lost by crashed peers
+                requeue_stale()
+                next_sweep = time.monotonic() + STALE_SWEEP_SECONDS
+            job = claim(worker_id)
+        except DatabaseError:
+            # e.g. SQLite "database is locked" under contention; back off and retry
+            logger.warning('Job claim failed', exc_info=True)
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def queue_stats():
+    now = timezone.now()
+    counts = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    for row in Job.objects.order_by().values('status').annotate(n=Count('id')):
+        counts[row['status']] = row['n']
+
+    ready = _ready_jobs(now)
+    oldest_ready = ready.order_by('run_at').values_list('run_at', flat=True).first()
+    # Periodic rows have their run_at moved on after each run, so leave them out
+    recent = Job.objects.filter(
+        status__in=['succeeded', 'failed'], periodic_key__isnull=True,
+        finished_at__gte=now - timedelta(hours=1),
+    )
+    latency = recent.aggregate(
+        wait=Avg(ExpressionWrapper(F('started_at') - F('run_at'), output_field=DurationField())),
+        run=Avg(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())),
+    )
+    return {
+        'depth': counts,
+        'ready': ready.count(),
+        'scheduled': Job.objects.filter(status='queued', run_at__gt=now).count(),
+        'oldest_ready_seconds': round((now - oldest_ready).total_seconds(), 1) if oldest_ready else 0,
+        'avg_wait_seconds': _seconds(latency['wait']),
+        'avg_run_seconds': _seconds(latency['run']),
+        'failed_last_hour': Job.objects.filter(status='failed', finished_at__gte=now - timedelta(hours=1)).count(),
+    }
+
+
+def _seconds(value):
+    return round(value.total_seconds(), 3) if value is not None else None
@@ -0,0 +1,331 @@
+"""
+Priority-aware load shedding.
+
+Each worker process runs at most ``settings.LOAD_SHEDDING['concurrency']``
+requests at once. Requests are sorted into the priority classes of
+``settings.LOAD_SHEDDING['classes']`` (highest first) by path. A request that
+finds no free slot waits in its class's bounded queue. Freed slots go to the
+highest class with a waiter. A request whose queue is full, or that waits
+longer than its class timeout, is shed with 503 and ``Retry-After``.
+
+A class's ``share`` caps the slots it and the classes below it may hold
+together, so the rest stay free for higher classes: bulk reads and profile
+edits can never take the slots emergency traffic needs. Queue depths are per process
+and reported live; shed and timeout counts are also added to the shared
+metrics (see accounts.metrics).
+
+The middleware runs under WSGI and ASGI. Under ASGI a queued request awaits
+its slot on the event loop instead of blocking the loop's thread, so waiting
+requests never stall the ones that are running.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+from . import metrics
+
+COUNTERS = ('admitted', 'queued', 'shed', 'timed_out')
+# Shared counters are flushed at most this often
+FLUSH_INTERVAL = 1.0
+
+
+class PriorityClass:
+    def __init__(self, name, rank, limit, queue, timeout, retry_after, paths=()):
+        self.name = name
+        self.rank = rank
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.paths = [re.compile(path) for path in paths]
+        self.running = 0
+        self.waiters = deque()
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+
+class Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+    def wake(self):
+        self.event.set()
+
+
+class AsyncWaiter:
+    """A waiter parked on an event loop; it may be woken from any thread."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self._set)
+
+    def _set(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class PriorityLimiter:
+    def __init__(self, concurrency, classes):
+        self.concurrency = concurrency
+        # Highest priority first
+        self.classes = sorted(classes, key=lambda cls: cls.rank)
+        self.by_name = {cls.name: cls for cls in self.classes}
+        self.fallback = next((cls.name for cls in self.classes if not cls.paths), self.classes[-1].name)
+        self.running = 0
+        self._lock = threading.Lock()
+        self._unflushed = {}
+        self._flushed_at = time.monotonic()
+
+    def _can_run(self, cls):
+        if self.running >= self.concurrency:
+            return False
+        return sum(lower.running for lower in self.classes[cls.rank:]) < cls.limit
+
+    def _start(self, cls):
+        self.running += 1
+        cls.running += 1
+
+    def _count(self, cls, counter):
+        cls.counts[counter] += 1
+        if counter in ('shed', 'timed_out'):
+            key = f'load_shedding.{cls.name}.{counter}'
+            self._unflushed[key] = self._unflushed.get(key, 0) + 1
+
+    def _take_unflushed(self):
+        if not self._unflushed or time.monotonic() - self._flushed_at < FLUSH_INTERVAL:
+            return {}
+        unflushed, self._unflushed = self._unflushed, {}
+        self._flushed_at = time.monotonic()
+        return unflushed
+
+    def _flush(self, unflushed):
+        # Cache writes happen outside the lock
+        for key, delta in unflushed.items():
+            metrics.incr(key, delta)
+
+    def _grant_waiters(self):
+        for cls in self.classes:
+            while cls.waiters and self._can_run(cls):
+                waiter = cls.waiters.popleft()
+                self._start(cls)
+                waiter.granted = True
+                waiter.wake()
+
+    def _admit_or_queue(self, cls, make_waiter):
+        """True if admitted, False if shed, else the waiter now queued for ``cls``."""
+        with self._lock:
+            if self._can_run(cls):
+                self._start(cls)
+                self._count(cls, 'admitted')
+                return True
+            if len(cls.waiters) < cls.queue and cls.timeout > 0:
+                waiter = make_waiter()
+                cls.waiters.append(waiter)
+                self._count(cls, 'queued')
+                return waiter
+            self._count(cls, 'shed')
+            unflushed = self._take_unflushed()
+        self._flush(unflushed)
+        return False
+
+    def _end_wait(self, cls, waiter):
+        with self._lock:
+            # A slot may have been handed over just as the wait timed out
+            if waiter.granted:
+                self._count(cls, 'admitted')
+                return True
+            cls.waiters.remove(waiter)
+            self._count(cls, 'timed_out')
+            unflushed = self._take_unflushed()
+        self._flush(unflushed)
+        return False
+
+    def acquire(self, name):
+        """Take a slot for class ``name``, waiting in its queue; False if the request is to be shed."""
+        cls = self.by_name[name]
+        waiter = self._admit_or_queue(cls, Waiter)
+        if isinstance(waiter, bool):
+            return waiter
+        waiter.event.wait(cls.timeout)
+        return self._end_wait(cls, waiter)
+
+    async def aacquire(self, name):
+        """``acquire()`` for the event loop: the wait suspends the request, not the thread."""
+        cls = self.by_name[name]
+        loop = asyncio.get_running_loop()
+        waiter = self._admit_or_queue(cls, lambda: AsyncWaiter(loop))
+        if isinstance(waiter, bool):
+            return waiter
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), cls.timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The client went away; give back a slot handed over meanwhile
+            if self._end_wait(cls, waiter):
+                self.release(name)
+            raise
+        return self._end_wait(cls, waiter)
+
+    def release(self, name):
+        cls = self.by_name[name]
+        with self._lock:
+            self.running -= 1
+            cls.running -= 1
+            self._grant_waiters()
+            unflushed = self._take_unflushed()
+        self._flush(unflushed)
+
+    def classify(self, path):
+        """The first class with a pattern matching ``path``, else the class without patterns."""
+        for cls in self.classes:
+            if any(pattern.search(path) for pattern in cls.paths):
+                return cls.name
+        return self.fallback
+
+    def stats(self):
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'running': self.running,
+                'classes': {
+                    cls.name: {
+                        'limit': cls.limit,
+                        'running': cls.running,
+                        'queue_depth': len(cls.waiters),
+                        'queue_size': cls.queue,
+                        **cls.counts,
+                    }
+                    for cls in self.classes
+                },
+            }
+
+
+def build_limiter(config):
+    concurrency = config['concurrency']
+    classes = []
+    for rank, (name, spec) in enumerate(config['classes'].items()):
+        classes.append(PriorityClass(
+            name,
+            rank,
+            limit=max(1, int(concurrency * spec.get('share', 1.0))),
+            queue=spec.get('queue', 0),
+            timeout=spec.get('timeout', 0),
+            retry_after=spec.get('retry_after', config.get('retry_after', 5)),
+            paths=spec.get('paths', ()),
+        ))
+    return PriorityLimiter(concurrency, classes)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """The process-wide limiter, or None when load shedding is off."""
+    global _limiter
+    config = getattr(settings, 'LOAD_SHEDDING', None)
+    if not config or not config.get('concurrency'):
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = build_limiter(config)
+    return _limiter
+
+
+def load_shedding_stats():
+    limiter = get_limiter()
+    if limiter is None:
+        return {'enabled': False}
+    names = [f'load_shedding.{name}.{counter}' for name in limiter.by_name for counter in ('shed', 'timed_out')]
+    return {
+        'enabled': True,
+        # This worker process only
+        'process': limiter.stats(),
+        'shed_total': metrics.get_counters(*names),
+    }
+
+
+class LoadSheddingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limiter = get_limiter()
+        if self.limiter is None:
+            raise MiddlewareNotUsed
+        self.exempt = [re.compile(path) for path in settings.LOAD_SHEDDING.get('exempt', ())]
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if any(pattern.search(request.path_info) for pattern in self.exempt):
+            return self.get_response(request)
+        name = self.limiter.classify(request.path_info)
+        if not self.limiter.acquire(name):
+            return self.busy(name)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.limiter.release(name)
+            raise
+        return self.finish(name, response)
+
+    async def __acall__(self, request):
+        if any(pattern.search(request.path_info) for pattern in self.exempt):
+            return await self.get_response(request)
+        name = self.limiter.classify(request.path_info)
+        if not await self.limiter.aacquire(name):
+            return self.busy(name)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.limiter.release(name)
+            raise
+        return self.finish(name, response)
+
+    def busy(self, name):
+        response = JsonResponse({'error': 'Server is busy, please retry later.'}, status=503)
+        response['Retry-After'] = str(self.limiter.by_name[name].retry_after)
+        return response
+
+    def finish(self, name, response):
+        if response.streaming and not response.is_async:
+            # Exports do their work while streaming; hold the slot until the
+            # server closes the response
+            response.streaming_content = ReleaseOnClose(response.streaming_content, lambda: self.limiter.release(name))
+        else:
+            self.limiter.release(name)
+        return response
+
+
+class ReleaseOnClose:
+    def __init__(self, content, release):
+        self.content = content
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def close(self):
+        release, self.release = self.release, None
+        if release is not None:
+            release()
@@ -0,0 +1,123 @@
+"""
+Logging helpers for the accounts app.
+
+Request threads only redact, sample and enqueue records; a background
+QueueListener thread does the formatting and the actual stream I/O.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener
+
+REDACTED = '[REDACTED]'
+
+# Credentials and protected health information that must never reach the logs
+SENSITIVE_FIELDS = frozenset({
+    'password', 'password2', 'access', 'refresh', 'token',
+    'username', 'user__username', 'first_name', 'last_name', 'email',
+    'phone_number', 'address', 'location', 'latitude', 'longitude',
+    'contact_person', 'contact_phone',
+    'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship',
+    'blood_type', 'blood_type_needed', 'weight', 'height', 'date_of_birth',
+    'last_checkup', 'donation_eligibility', 'units_collected',
+    'allergies', 'allergy_name', 'severity',
+    'medications', 'medication_name', 'dosage', 'frequency', 'start_date', 'end_date',
+    'medical_conditions', 'condition_name', 'diagnosed_date', 'is_chronic', 'notes',
+    'patient_age', 'patient_condition', 'pre_screening_notes', 'post_donation_notes',
+})
+
+# Record attributes that carry structured payloads (passed via ``extra=``)
+STRUCTURED_ATTRS = ('data', 'errors')
+
+
+def redact(value):
+    """Return a copy of ``value`` with sensitive keys masked at any depth."""
+    if isinstance(value, Mapping):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class RedactPHIFilter(logging.Filter):
+    def filter(self, record):
+        for attr in STRUCTURED_ATTRS:
+            if hasattr(record, attr):
+                setattr(record, attr, redact(getattr(record, attr)))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every WARNING and above, and a ``rate`` fraction of everything else."""
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for attr in STRUCTURED_ATTRS:
+            if hasattr(record, attr):
+                payload[attr] = getattr(record, attr)
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Non-blocking handler: emit() puts the record on a bounded queue and a
+    listener thread writes it to ``stream``. When the queue is full the record
+    is dropped (and counted) rather than stalling the request.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, not in the request thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Keep the structured attributes; the target formatter renders them later
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # logging.shutdown() closes handlers at exit; drain the queue once
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
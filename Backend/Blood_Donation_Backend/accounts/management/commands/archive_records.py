@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.archive import ARCHIVES, DEFAULT_BATCH_SIZE, archive, archive_stats
+
+class Command(BaseCommand):
+    help = 'Move closed donations and emergency requests past their retention window into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"What to archive (default: {', '.join(ARCHIVES)})")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches per kind and shard')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+        parser.add_argument('--stats', action='store_true', help='Only print live/archived/eligible row counts')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(ARCHIVES)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}")
+        if options['stats']:
+            for kind, counts in archive_stats().items():
+                self.stdout.write(f"{kind}: {counts['live']} live, {counts['archived']} archived, "
+                                  f"{counts['eligible']} eligible for archival")
+            return
+        moved = archive(
+            options['kinds'] or None,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+        )
+        for kind, count in moved.items():
+            self.stdout.write(self.style.SUCCESS(f"Archived {count} {kind}"))
@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from accounts.forecasting import DEFAULT_ALPHA, forecast_arrays
+
+class Command(BaseCommand):
+    help = 'Time the vectorized shortage forecast on synthetic data (default 1,000 centers x 8 types x 3 years)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--centers', type=int, default=1000)
+        parser.add_argument('--types', type=int, default=8)
+        parser.add_argument('--days', type=int, default=3 * 365)
+        parser.add_argument('--horizon', type=int, default=14)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--loop-sample', type=int, default=20,
+                            help='Centers to run through the per-series Python loop for comparison (0 to skip)')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        shape = (options['centers'], options['types'], options['days'])
+        supply = rng.poisson(0.8, shape).astype(np.float64)
+        demand = rng.poisson(0.7, shape).astype(np.float64)
+        self.stdout.write(f"Arrays {shape}, {2 * supply.nbytes / 1e6:.0f} MB")
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            result = forecast_arrays(supply, demand, 0, options['horizon'])
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        self.stdout.write(self.style.SUCCESS(
+            f"Vectorized: best {best * 1000:.1f} ms, median {np.median(timings) * 1000:.1f} ms "
+            f"over {options['repeat']} run(s); {(result[2] > 0).sum()} shortage(s)"
+        ))
+
+        sample = min(options['loop_sample'], options['centers'])
+        if sample:
+            started = time.perf_counter()
+            for c in range(sample):
+                for t in range(options['types']):
+                    for series in (supply[c, t].tolist(), demand[c, t].tolist()):
+                        level = series[0]
+                        for value in series:
+                            level += DEFAULT_ALPHA * (value - level)
+            loop = (time.perf_counter() - started) * options['centers'] / sample
+            self.stdout.write(
+                f"Per-series Python loop (smoothing only, extrapolated from {sample} center(s)): "
+                f"{loop * 1000:.0f} ms, {loop / best:.0f}x slower"
+            )
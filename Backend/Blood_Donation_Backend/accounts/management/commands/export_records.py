@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.exports import (
+    EXPORTS, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, build_export_querysets, iter_export
+)
+
+class Command(BaseCommand):
+    help = 'Stream donation or appointment history as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--center', type=int, help='Only rows for this donation center id')
+        parser.add_argument('--start', help='First date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--status')
+        parser.add_argument('--include-archived', action='store_true', help='Also export archived rows')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        try:
+            querysets = build_export_querysets(
+                kind,
+                center=options['center'],
+                start=options['start'],
+                end=options['end'],
+                status=options['status'],
+                include_archived=options['include_archived'],
+            )
+            rows = iter_export(kind, options['export_format'], querysets, options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as fh:
+                lines = self._write(rows, fh)
+            count = lines - 1 if options['export_format'] == 'csv' else lines
+            self.stderr.write(self.style.SUCCESS(f"Exported {count} {kind} to {options['output']}"))
+        else:
+            self._write(rows, sys.stdout)
+
+    def _write(self, rows, fh):
+        lines = 0
+        for line in rows:
+            fh.write(line)
+            lines += 1
+        return lines
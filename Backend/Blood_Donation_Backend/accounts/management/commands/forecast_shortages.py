@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.forecasting import DEFAULT_ALPHA, DEFAULT_HISTORY_DAYS, DEFAULT_HORIZON_DAYS, forecast_shortages
+from accounts.models import ShortageForecast
+
+class Command(BaseCommand):
+    help = 'Forecast per-center blood type shortages and store them for /api/forecasts/shortages/ (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=DEFAULT_HORIZON_DAYS, help='Forecast horizon in days')
+        parser.add_argument('--history', type=int, default=DEFAULT_HISTORY_DAYS, help='Days of history to learn from')
+        parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help='Exponential smoothing factor')
+
+    def handle(self, *args, **options):
+        if options['history'] < 1:
+            raise CommandError('--history must be at least 1 day')
+        started = time.monotonic()
+        count = forecast_shortages(horizon=options['days'], history_days=options['history'], alpha=options['alpha'])
+        short = ShortageForecast.objects.filter(shortage__gt=0).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {count} center/blood type pair(s) over {options['days']} day(s) in "
+            f"{time.monotonic() - started:.2f}s; {short} expected to run short"
+        ))
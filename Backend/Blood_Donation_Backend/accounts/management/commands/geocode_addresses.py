@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.geocoding import DEFAULT_BATCH_SIZE, backfill_coordinates, get_gazetteer
+
+class Command(BaseCommand):
+    help = 'Fill donor and center coordinates from their addresses using the local gazetteer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Re-geocode every profile address, not only those without coordinates')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        gazetteer = get_gazetteer()
+        if not gazetteer.version:
+            self.stderr.write(self.style.WARNING('No gazetteer file configured (GEOCODER_GAZETTEER); nothing to do'))
+            return
+        self.stdout.write(
+            f"Gazetteer: {len(gazetteer.postal_codes)} postal code(s), {len(gazetteer.places)} place(s)"
+        )
+        started = time.monotonic()
+        counts = backfill_coordinates(overwrite=options['overwrite'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {counts['profiles']} profile(s) and {counts['centers']} center(s) "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
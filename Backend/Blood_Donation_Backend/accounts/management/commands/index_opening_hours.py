@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from accounts.models import DonationCenter
+from accounts.opening_hours import index_center
+
+class Command(BaseCommand):
+    help = 'Rebuild the weekly opening intervals of every donation center from its operating_hours text'
+
+    def handle(self, *args, **options):
+        centers = intervals = 0
+        for center in DonationCenter.objects.order_by('pk').iterator():
+            count = index_center(center)
+            centers += 1
+            intervals += count
+            if not count and center.operating_hours.strip():
+                self.stdout.write(self.style.WARNING(
+                    f"#{center.pk} {center.name}: could not parse {center.operating_hours!r}"
+                ))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {intervals} interval(s) for {centers} center(s)"))
@@ -0,0 +1,38 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from accounts.notifications import process_outbox
+
+class Command(BaseCommand):
+    help = 'Deliver donor notifications queued in the notification outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}:{os.getpid()}')
+
+    def handle(self, *args, **options):
+        totals = {'events': 0, 'sent': 0, 'failed': 0, 'lost': 0}
+        try:
+            while True:
+                stats = process_outbox(worker_id=options['worker_id'], batch_size=options['batch_size'])
+                if stats['events'] or stats['failed'] or stats['lost']:
+                    self.stdout.write(
+                        f"Processed {stats['events']} event(s), sent {stats['sent']} notification(s), "
+                        f"{stats['failed']} failed, {stats['lost']} lost to another worker "
+                        f"in {stats['seconds']}s ({stats['per_second']}/s)"
+                    )
+                for key in totals:
+                    totals[key] += stats[key]
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['events']} event(s), {totals['sent']} notification(s) sent, {totals['failed']} failed, "
+            f"{totals['lost']} lost to another worker"
+        ))
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so every import is cold
+PROBE = """
+import json, os, time
+started = time.perf_counter()
+import {module} as entry
+report = {{'load_seconds': time.perf_counter() - started}}
+if {warmup}:
+    from accounts.warmup import warm_up
+    report['warmup'] = warm_up()
+from django.test import RequestFactory
+for key in ('first_request_seconds', 'second_request_seconds'):
+    request = RequestFactory().get({path!r}, HTTP_HOST='localhost')
+    started = time.perf_counter()
+    entry.application.get_response(request)
+    report[key] = time.perf_counter() - started
+print(json.dumps(report))
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+class Command(BaseCommand):
+    help = 'Report cold-start import times of the WSGI entry point and the first-request latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Number of modules to list')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+        parser.add_argument('--warmup', action='store_true', help='Run accounts.warmup before the first request')
+        parser.add_argument('--path', default='/api/donation-centers/', help='URL requested after startup')
+        parser.add_argument('--save', metavar='FILE', help='Write the report as JSON')
+        parser.add_argument('--baseline', metavar='FILE', help='Compare with a report saved by --save')
+        parser.add_argument('--fail-over', type=float, metavar='PERCENT',
+                            help='Exit non-zero if total import time regressed by more than PERCENT vs --baseline')
+
+    def handle(self, *args, **options):
+        if options['fail_over'] is not None and not options['baseline']:
+            raise CommandError('--fail-over needs a --baseline report to compare with')
+        module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        code = PROBE.format(module=module, warmup=options['warmup'], path=options['path'])
+        env = dict(os.environ, DJANGO_WARMUP='0', PYTHONDONTWRITEBYTECODE='1')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Probe failed:\n{result.stderr[-2000:]}')
+
+        modules = []
+        total_us = 0
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({'module': name, 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+            if len(indent) == 1:
+                total_us += int(cumulative_us)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        report = {
+            'entry_point': module,
+            'total_import_ms': round(total_us / 1000, 1),
+            'load_ms': round(timings['load_seconds'] * 1000, 1),
+            'first_request_ms': round(timings['first_request_seconds'] * 1000, 1),
+            'second_request_ms': round(timings['second_request_seconds'] * 1000, 1),
+            'warmup': timings.get('warmup'),
+            'modules': modules,
+        }
+
+        key = f"{options['sort']}_ms"
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for entry in sorted(modules, key=lambda m: m[key], reverse=True)[:options['top']]:
+            self.stdout.write(f"{entry['self_ms']:9.1f} {entry['cumulative_ms']:9.1f}  {entry['module']}")
+        self.stdout.write('')
+        self.stdout.write(f"Modules imported: {len(modules)}, total import time {report['total_import_ms']} ms")
+        self.stdout.write(f"Load {report['load_ms']} ms, first request {report['first_request_ms']} ms, "
+                          f"second request {report['second_request_ms']} ms ({options['path']})")
+        if report['warmup']:
+            steps = ', '.join(f"{name} {step['seconds'] * 1000:.1f} ms" for name, step in report['warmup'].items())
+            self.stdout.write(f"Warm-up: {steps}")
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['fail_over'])
+
+    def compare(self, report, path, fail_over):
+        with open(path) as f:
+            baseline = json.load(f)
+        before = {m['module']: m['cumulative_ms'] for m in baseline['modules']}
+        added = [m for m in report['modules'] if m['module'] not in before]
+        change = report['total_import_ms'] - baseline['total_import_ms']
+        percent = 100 * change / baseline['total_import_ms'] if baseline['total_import_ms'] else 0
+        self.stdout.write(f"vs baseline: total import {change:+.1f} ms ({percent:+.1f}%), "
+                          f"first request {report['first_request_ms'] - baseline['first_request_ms']:+.1f} ms")
+        for entry in sorted(added, key=lambda m: m['cumulative_ms'], reverse=True)[:10]:
+            self.stdout.write(f"  new import: {entry['module']} ({entry['cumulative_ms']:.1f} ms)")
+        if fail_over is not None and percent > fail_over:
+            raise CommandError(f'Import time regressed by {percent:.1f}% (limit {fail_over}%)')
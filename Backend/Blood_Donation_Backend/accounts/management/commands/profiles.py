@@ -0,0 +1,67 @@
+import io
+import pstats
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.profiling import TOKEN_MAX_AGE, ProfileStore, make_token
+
+class Command(BaseCommand):
+    help = 'List stored request profiles, render one, or issue an X-Profile header token'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action')
+        list_parser = subparsers.add_parser('list', help='List stored profiles, newest first')
+        list_parser.add_argument('--limit', type=int, default=20)
+        list_parser.add_argument('--path', help='Only profiles whose URL path contains this')
+
+        show_parser = subparsers.add_parser('show', help='Render the top functions and SQL of a profile')
+        show_parser.add_argument('profile_id')
+        show_parser.add_argument('--limit', type=int, default=25)
+        show_parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'])
+        show_parser.add_argument('--queries', type=int, default=10, help='Slowest SQL statements to show')
+
+        token_parser = subparsers.add_parser('token', help='Print a signed value for the X-Profile request header')
+        token_parser.add_argument('--label', default='')
+
+    def handle(self, *args, **options):
+        action = options['action'] or 'list'
+        getattr(self, f'handle_{action}')(options)
+
+    def handle_list(self, options):
+        profiles = ProfileStore().list()
+        if options.get('path'):
+            profiles = [p for p in profiles if options['path'] in p['path']]
+        if not profiles:
+            self.stdout.write('No stored profiles')
+            return
+        self.stdout.write(f"{'id':<28} {'when':<19} {'status':>6} {'ms':>8} {'sql':>4} {'sql ms':>8}  request")
+        for profile in profiles[:options.get('limit', 20)]:
+            when = datetime.fromtimestamp(profile['created']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{profile['id']:<28} {when:<19} {profile['status']:>6} {profile['ms']:>8.1f} "
+                f"{len(profile['queries']):>4} {profile['sql_ms']:>8.1f}  {profile['method']} {profile['path']}"
+                + (' (sampled)' if profile.get('sampled') else '')
+            )
+
+    def handle_show(self, options):
+        try:
+            meta, stats_path = ProfileStore().load(options['profile_id'])
+        except (OSError, ValueError):
+            raise CommandError(f"No stored profile '{options['profile_id']}'")
+        self.stdout.write(
+            f"{meta['method']} {meta['path']} -> {meta['status']} in {meta['ms']} ms; "
+            f"{len(meta['queries'])} SQL statement(s) taking {meta['sql_ms']} ms"
+        )
+
+        output = io.StringIO()
+        pstats.Stats(str(stats_path), stream=output).strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(output.getvalue())
+
+        if options['queries'] and meta['queries']:
+            self.stdout.write(f"Slowest SQL (of {len(meta['queries'])}):")
+            for query in sorted(meta['queries'], key=lambda q: q['ms'], reverse=True)[:options['queries']]:
+                self.stdout.write(f"{query['ms']:>9.3f} ms  [{query['alias']}] {query['sql']}")
+
+    def handle_token(self, options):
+        self.stdout.write(make_token(options['label']))
+        self.stderr.write(f'Send as "X-Profile: <token>"; valid for {TOKEN_MAX_AGE // 60} minutes')
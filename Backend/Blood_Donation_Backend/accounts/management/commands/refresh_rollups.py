@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.rollups import ROLLUPS, refresh_rollups
+
+class Command(BaseCommand):
+    help = 'Fold donations and emergency requests changed since the last run into the analytics rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rollups', nargs='*', help=f"Rollups to refresh (default: {', '.join(ROLLUPS)})")
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every period from scratch, e.g. after deletes or date corrections')
+
+    def handle(self, *args, **options):
+        unknown = set(options['rollups']) - set(ROLLUPS)
+        if unknown:
+            raise CommandError(f"Unknown rollup(s): {', '.join(sorted(unknown))}")
+        results = refresh_rollups(options['rollups'] or None, rebuild=options['rebuild'])
+        for name, stats in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: recomputed {stats['periods']} period(s), {stats['rows']} rollup row(s)"
+            ))
@@ -0,0 +1,79 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from accounts import jobs
+
+def _work(worker_id, stop_event, poll_interval, burst):
+    try:
+        jobs.work(worker_id, stop_event=stop_event, poll_interval=poll_interval, burst=burst)
+    finally:
+        connections.close_all()
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to fork')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is ready')
+        parser.add_argument('--stats', action='store_true', help='Print queue statistics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(jobs.queue_stats(), indent=2))
+            return
+
+        jobs.requeue_stale()
+        jobs.schedule_periodic()
+
+        if options['processes'] > 1:
+            # Forked children must not share the parent's database connection
+            connections.close_all()
+            children = [
+                multiprocessing.Process(target=self.run_threads, args=(options,))
+                for _ in range(options['processes'])
+            ]
+            for child in children:
+                child.start()
+            signal.signal(signal.SIGTERM, lambda *_: [child.terminate() for child in children])
+            try:
+                for child in children:
+                    child.join()
+            except KeyboardInterrupt:
+                for child in children:
+                    child.join()
+        else:
+            self.run_threads(options)
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
+
+    def run_threads(self, options):
+        stop_event = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=_work,
+                args=(f'{prefix}:{i}', stop_event, options['poll_interval'], options['burst']),
+                daemon=True,
+            )
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from accounts.models import UserShard
+from accounts.sharding import (
+    SHARDED_MODELS, derive_region, move_user, region_for_user_id, sync_reference_data
+)
+
+class Command(BaseCommand):
+    help = 'Show how donors are spread over the region shards, or move them between shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username or id of one user to move (with --region)')
+        parser.add_argument('--region', choices=list(settings.SHARDS))
+        parser.add_argument('--derive', action='store_true',
+                            help="Move every user to the region of the centers they give at")
+        parser.add_argument('--dry-run', action='store_true', help='With --derive: only report the moves')
+        parser.add_argument('--sync-reference', action='store_true',
+                            help='Copy all donation centers and sharded users into their shards first')
+
+    def handle(self, *args, **options):
+        if options['sync_reference']:
+            counts = sync_reference_data()
+            self.stdout.write(f"Mirrored {counts['centers']} center(s) and {counts['users']} user(s)")
+
+        if options['user']:
+            if not options['region']:
+                raise CommandError('--user needs --region')
+            lookup = {'pk': options['user']} if options['user'].isdigit() else {'username': options['user']}
+            try:
+                user = User.objects.get(**lookup)
+            except User.DoesNotExist:
+                raise CommandError(f"No user '{options['user']}'")
+            moved = move_user(user, options['region'])
+            self.stdout.write(self.style.SUCCESS(f"Moved {user.username} to {options['region']} ({moved} rows)"))
+        elif options['derive']:
+            self.derive(options['dry_run'])
+        elif not options['sync_reference']:
+            self.stats()
+
+    def derive(self, dry_run):
+        users = rows = 0
+        for user in User.objects.order_by('pk').iterator():
+            region = derive_region(user)
+            if region is None or region == region_for_user_id(user.pk):
+                continue
+            users += 1
+            if dry_run:
+                self.stdout.write(f"{user.username}: {region_for_user_id(user.pk)} -> {region}")
+            else:
+                rows += move_user(user, region)
+        verb = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {users} user(s)" + ('' if dry_run else f" ({rows} rows)")))
+
+    def stats(self):
+        per_region = dict(UserShard.objects.order_by().values_list('region').annotate(users=Count('pk')))
+        # Users without a UserShard row belong to the default region
+        per_region[settings.DEFAULT_REGION] = User.objects.count() - sum(
+            count for region, count in per_region.items() if region != settings.DEFAULT_REGION
+        )
+        for region, alias in settings.SHARDS.items():
+            counts = ', '.join(
+                f"{model.__name__}: {model.objects.using(alias).count()}"
+                for model in SHARDED_MODELS
+            )
+            self.stdout.write(f"{region} [{alias}] {per_region.get(region, 0)} user(s); {counts}")
@@ -0,0 +1,59 @@
+"""Process-shared counters kept in the default cache (approximate under contention)."""
+import threading
+import time
+
+from django.core.cache import cache
+
+PREFIX = 'metrics:'
+
+
+def incr(name, delta=1):
+    key = PREFIX + name
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, delta, None)
+
+
+def get_counters(*names):
+    values = cache.get_many([PREFIX + name for name in names])
+    return {name: values.get(PREFIX + name, 0) for name in names}
+
+
+class BufferedCounters:
+    """
+    Counts kept in process and added to the shared counters at most every
+    ``interval`` seconds, for counters bumped on every request: with the
+    file-based cache each ``incr()`` is a file write.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._unflushed = {}
+        self._flushed_at = time.monotonic()
+
+    def incr(self, name, delta=1):
+        with self._lock:
+            self._unflushed[name] = self._unflushed.get(name, 0) + delta
+            if time.monotonic() - self._flushed_at < self.interval:
+                return
+            unflushed = self._take()
+        self._write(unflushed)
+
+    def flush(self):
+        with self._lock:
+            unflushed = self._take()
+        self._write(unflushed)
+
+    def _take(self):
+        unflushed, self._unflushed = self._unflushed, {}
+        self._flushed_at = time.monotonic()
+        return unflushed
+
+    def _write(self, unflushed):
+        # Cache writes happen outside the lock
+        for name, delta in unflushed.items():
+            incr(name, delta)
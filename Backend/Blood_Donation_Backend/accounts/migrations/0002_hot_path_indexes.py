@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['user', '-scheduled_date'], name='donation_user_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationappointment',
+            index=models.Index(fields=['user', 'appointment_date'], name='appointment_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationcenter',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name'], name='center_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyrequest',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-urgency', '-created_at', 'expires_at'], name='emergency_active_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    EmergencyRequest = apps.get_model('accounts', 'EmergencyRequest')
+    counted = EmergencyRequest.objects.annotate(
+        total=Count('responses'),
+        interested=Count('responses', filter=Q(responses__status='interested')),
+        confirmed=Count('responses', filter=Q(responses__status__in=['confirmed', 'completed'])),
+    ).filter(total__gt=0)
+    for request in counted.iterator():
+        EmergencyRequest.objects.filter(pk=request.pk).update(
+            responses_count=request.total,
+            interested_count=request.interested,
+            confirmed_count=request.confirmed,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emergencyrequest',
+            name='confirmed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emergencyrequest',
+            name='interested_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emergencyrequest',
+            name='responses_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_sync_change_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('blood_type_needed', models.CharField(max_length=3)),
+                ('urgency', models.CharField(max_length=10)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('units_needed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DonationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('blood_type', models.CharField(blank=True, max_length=3)),
+                ('donations', models.PositiveIntegerField(default=0)),
+                ('units', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['updated_at'], name='donation_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['scheduled_date'], name='donation_completed_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyrequest',
+            index=models.Index(fields=['updated_at'], name='emergency_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyrequest',
+            index=models.Index(fields=['created_at'], name='emergency_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='demandrollup',
+            unique_together={('grain', 'period_start', 'blood_type_needed', 'urgency')},
+        ),
+        migrations.AddField(
+            model_name='donationrollup',
+            name='donation_center',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='accounts.donationcenter'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='donationrollup',
+            unique_together={('grain', 'period_start', 'donation_center', 'blood_type')},
+        ),
+    ]
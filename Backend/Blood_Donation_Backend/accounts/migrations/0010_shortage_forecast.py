@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortageForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_at', models.DateTimeField()),
+                ('horizon_days', models.PositiveIntegerField()),
+                ('blood_type', models.CharField(max_length=3)),
+                ('expected_supply', models.FloatField()),
+                ('expected_demand', models.FloatField()),
+                ('shortage', models.FloatField(help_text='Expected demand not covered by supply over the horizon, in units')),
+                ('donation_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='accounts.donationcenter')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('shortage__gt', 0)), fields=['-shortage'], name='forecast_shortage_idx')],
+                'unique_together': {('donation_center', 'blood_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_shortage_forecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmergencyRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('hospital_name', models.CharField(max_length=200)),
+                ('blood_type_needed', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('units_needed', models.IntegerField()),
+                ('urgency', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=10)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('fulfilled', 'Fulfilled'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('patient_age', models.IntegerField(blank=True, null=True)),
+                ('patient_condition', models.CharField(blank=True, max_length=200)),
+                ('contact_person', models.CharField(max_length=100)),
+                ('contact_phone', models.CharField(max_length=15)),
+                ('location', models.TextField()),
+                ('latitude', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True)),
+                ('expires_at', models.DateTimeField()),
+                ('responses_count', models.PositiveIntegerField(default=0)),
+                ('interested_count', models.PositiveIntegerField(default=0)),
+                ('confirmed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='archived_emergency_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEmergencyResponse',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(max_length=20)),
+                ('response_time', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('emergency_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='accounts.archivedemergencyrequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_emergency_responses', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedDonation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('scheduled_date', models.DateTimeField()),
+                ('actual_date', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('no_show', 'No Show')], max_length=20)),
+                ('blood_type', models.CharField(blank=True, max_length=3)),
+                ('units_collected', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('pre_screening_notes', models.TextField(blank=True)),
+                ('post_donation_notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('donation_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_donations', to='accounts.donationcenter')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_donations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-scheduled_date'],
+                'indexes': [models.Index(fields=['user', '-scheduled_date'], name='archived_donation_user_idx'), models.Index(condition=models.Q(('status', 'completed')), fields=['scheduled_date'], name='archived_donation_sched_idx')],
+            },
+        ),
+    ]
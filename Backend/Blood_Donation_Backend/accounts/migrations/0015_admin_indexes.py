@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_center_opening_hours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', 'id'], name='donation_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationappointment',
+            index=models.Index(fields=['status', 'id'], name='appointment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyrequest',
+            index=models.Index(condition=models.Q(('status', 'active'), _negated=True), fields=['status', 'id'], name='emergency_status_idx'),
+        ),
+    ]
@@ -1,5 +1,25 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+class UserOwnedQuerySet(models.QuerySet):
+    """Rows keyed by user, stored in the user's region database (see accounts.sharding)."""
+    
+    def for_user(self, user):
+        from .sharding import db_for_user
+        return self.using(db_for_user(user)).filter(user=user)
+    
+    def create(self, **kwargs):
+        # Model.save() is routed by its instance, but QuerySet.create() gives
+        # the router no hints; route by the owner instead
+        if self._db is None and ('user' in kwargs or 'user_id' in kwargs):
+            from .sharding import db_for_user, db_for_user_id
+            user = kwargs.get('user')
+            db = db_for_user(user) if user is not None else db_for_user_id(kwargs['user_id'])
+            return self.using(db).create(**kwargs)
+        return super().create(**kwargs)
 
 class UserProfile(models.Model):
     BLOOD_TYPE_CHOICES = [
@@ -20,6 +40,9 @@ class UserProfile(models.Model):
     date_of_birth = models.DateField(null=True, blank=True)
     phone_number = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
+    # Filled from address by accounts.geocoding (offline gazetteer)
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
     emergency_contact_name = models.CharField(max_length=100, blank=True)
     emergency_contact_phone = models.CharField(max_length=15, blank=True)
     emergency_contact_relationship = models.CharField(max_length=50, blank=True)
@@ -28,6 +51,8 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserOwnedQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
@@ -40,9 +65,15 @@ class MedicalAllergy(models.Model):
         ('severe', 'Severe'),
     ], default='mild')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = UserOwnedQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = "Medical Allergies"
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='allergy_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.allergy_name}"
@@ -56,6 +87,14 @@ class Medication(models.Model):
     end_date = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = UserOwnedQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='medication_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.medication_name}"
@@ -67,6 +106,14 @@ class MedicalCondition(models.Model):
     is_chronic = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = UserOwnedQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='condition_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.condition_name}"
@@ -79,12 +126,37 @@ class DonationCenter(models.Model):
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
     operating_hours = models.TextField(blank=True)
+    # Donors who give here are placed in this region's shard; blank is DEFAULT_REGION
+    region = models.CharField(max_length=50, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Donation and appointment validators fold this in (accounts.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=models.Q(is_active=True), name='center_active_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
+class CenterOpeningHours(models.Model):
+    """One weekly opening interval of a center, compiled from operating_hours (see accounts.opening_hours)."""
+    donation_center = models.ForeignKey(DonationCenter, on_delete=models.CASCADE, related_name='opening_hours')
+    # Minutes since Monday 00:00, end exclusive; intervals never wrap past Sunday midnight
+    start_minute = models.PositiveIntegerField()
+    end_minute = models.PositiveIntegerField()
+    
+    class Meta:
+        verbose_name_plural = "Center opening hours"
+        indexes = [
+            models.Index(fields=['donation_center', 'start_minute', 'end_minute'], name='opening_hours_center_idx'),
+        ]
+    
+    def __str__(self):
+        return f"center #{self.donation_center_id} {self.start_minute}-{self.end_minute}"
+
 class Donation(models.Model):
     STATUS_CHOICES = [
         ('scheduled', 'Scheduled'),
@@ -105,8 +177,19 @@ class Donation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserOwnedQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-scheduled_date']
+        indexes = [
+            models.Index(fields=['user', '-scheduled_date'], name='donation_user_sched_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='donation_user_updated_idx'),
+            # Rollups: changed rows since the watermark, completed donations per period
+            models.Index(fields=['updated_at'], name='donation_updated_idx'),
+            models.Index(fields=['scheduled_date'], condition=models.Q(status='completed'), name='donation_completed_sched_idx'),
+            # Admin change list: status filter in id order
+            models.Index(fields=['status', 'id'], name='donation_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.scheduled_date.strftime('%Y-%m-%d')}"
@@ -150,16 +233,77 @@ class EmergencyRequest(models.Model):
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
     expires_at = models.DateTimeField()
+    # Denormalized from EmergencyResponse, maintained by apply_response_change()
+    responses_count = models.PositiveIntegerField(default=0)
+    interested_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Active listing: filters on status/expires_at, orders by urgency then recency
+            models.Index(
+                fields=['-urgency', '-created_at', 'expires_at'],
+                condition=models.Q(status='active'),
+                name='emergency_active_idx',
+            ),
+            # Rollups: changed rows since the watermark, demand per period
+            models.Index(fields=['updated_at'], name='emergency_updated_idx'),
+            models.Index(fields=['created_at'], name='emergency_created_idx'),
+            # Admin change list; active rows are served by emergency_active_idx
+            models.Index(fields=['status', 'id'], condition=~models.Q(status='active'), name='emergency_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.hospital_name} - {self.blood_type_needed} ({self.urgency})"
+    
+    @classmethod
+    def apply_response_change(cls, request_id, old_status=None, new_status=None):
+        """
+        Adjust the response counters of one request in a single UPDATE.
+        
+        ``old_status=None`` means a response was created, ``new_status=None``
+        that one was deleted. An active request whose confirmed donors now cover
+        ``units_needed`` is flipped to 'fulfilled' by the same statement, and a
+        fulfilled, unexpired one that loses cover goes back to 'active', so
+        concurrent responses can never lose an increment or miss a transition.
+        """
+        def bucket_delta(field):
+            statuses = EmergencyResponse.COUNTER_FIELDS[field]
+            return int(new_status in statuses) - int(old_status in statuses)
+        
+        interested_delta = bucket_delta('interested_count')
+        confirmed_delta = bucket_delta('confirmed_count')
+        responses_delta = int(new_status is not None) - int(old_status is not None)
+        if not (interested_delta or confirmed_delta or responses_delta):
+            return 0
+        
+        now = timezone.now()
+        confirmed = F('confirmed_count') + confirmed_delta
+        return cls.objects.filter(pk=request_id).update(
+            responses_count=F('responses_count') + responses_delta,
+            interested_count=F('interested_count') + interested_delta,
+            confirmed_count=confirmed,
+            status=Case(
+                When(Q(status='active') & Q(units_needed__lte=confirmed), then=Value('fulfilled')),
+                When(
+                    Q(status='fulfilled') & Q(units_needed__gt=confirmed) & Q(expires_at__gt=now),
+                    then=Value('active'),
+                ),
+                default=F('status'),
+            ),
+            updated_at=now,
+        )
 
 class EmergencyResponse(models.Model):
+    # Which response statuses feed each EmergencyRequest counter
+    COUNTER_FIELDS = {
+        'interested_count': ('interested',),
+        'confirmed_count': ('confirmed', 'completed'),
+    }
+    
     emergency_request = models.ForeignKey(EmergencyRequest, on_delete=models.CASCADE, related_name='responses')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='emergency_responses')
     status = models.CharField(max_length=20, choices=[
@@ -176,6 +320,22 @@ class EmergencyResponse(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.emergency_request.hospital_name}"
+    
+    def change_status(self, new_status):
+        """
+        Compare-and-set the status and update the request counters atomically.
+        
+        Returns False if another writer changed the status first.
+        """
+        if new_status == self.status:
+            return True
+        with transaction.atomic():
+            updated = EmergencyResponse.objects.filter(pk=self.pk, status=self.status).update(status=new_status)
+            if not updated:
+                return False
+            EmergencyRequest.apply_response_change(self.emergency_request_id, self.status, new_status)
+        self.status = new_status
+        return True
 
 class DonationAppointment(models.Model):
     STATUS_CHOICES = [
@@ -196,8 +356,310 @@ class DonationAppointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserOwnedQuerySet.as_manager()
+    
     class Meta:
         ordering = ['appointment_date']
+        indexes = [
+            models.Index(fields=['user', 'appointment_date'], name='appointment_user_date_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='appointment_user_updated_idx'),
+            models.Index(fields=['status', 'id'], name='appointment_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.appointment_date.strftime('%Y-%m-%d %H:%M')}"
+
+class NotificationOutbox(models.Model):
+    """
+    Events written in the same transaction as the change that caused them and
+    delivered later by the ``process_notifications`` worker.
+    """
+    EVENT_CHOICES = [
+        ('emergency_created', 'Emergency Created'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    event = models.CharField(max_length=30, choices=EVENT_CHOICES)
+    emergency_request = models.ForeignKey(EmergencyRequest, on_delete=models.CASCADE, related_name='outbox_events')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    recipients_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'claimed_at'], name='outbox_status_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} #{self.emergency_request_id} ({self.status})"
+    
+    @classmethod
+    def enqueue_emergency(cls, emergency_request):
+        """Record a fan-out event for urgent requests; call inside the creating transaction."""
+        if emergency_request.urgency not in settings.EMERGENCY_NOTIFY_URGENCIES:
+            return None
+        return cls.objects.create(event='emergency_created', emergency_request=emergency_request)
+
+class DonorNotification(models.Model):
+    outbox = models.ForeignKey(NotificationOutbox, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['outbox', 'user']
+        indexes = [
+            models.Index(fields=['outbox', 'id'], condition=models.Q(sent_at__isnull=True), name='notification_unsent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.outbox}"
+
+class Job(models.Model):
+    """A unit of background work claimed and run by the ``run_worker`` command."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Periodic jobs are re-queued interval_seconds after each run
+    periodic_key = models.CharField(max_length=100, null=True, blank=True, unique=True)
+    interval_seconds = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'run_at'], condition=models.Q(status='queued'), name='job_ready_idx'),
+            models.Index(fields=['status', 'locked_at'], name='job_status_lock_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+class Tombstone(models.Model):
+    """Records a deleted row so offline clients can drop it on their next /api/sync/."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    objects = UserOwnedQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} deleted"
+
+class UserShard(models.Model):
+    """The region whose database holds a user's records; no row means DEFAULT_REGION."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='shard')
+    region = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"user #{self.user_id} @ {self.region}"
+
+class GeocodeCache(models.Model):
+    """Memoized gazetteer lookup of one normalized address; misses are stored too (see accounts.geocoding)."""
+    key = models.CharField(max_length=40, unique=True, help_text="SHA-1 of the normalized address")
+    query = models.TextField()
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    precision = models.CharField(max_length=10, blank=True)
+    gazetteer_version = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.query} -> {self.latitude}, {self.longitude}"
+
+class RollupWatermark(models.Model):
+    """How far ``accounts.rollups`` has folded each source table into its rollups."""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class DonationRollup(models.Model):
+    """Completed donations per period, center and blood type (see accounts.rollups)."""
+    GRAIN_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+    
+    grain = models.CharField(max_length=10, choices=GRAIN_CHOICES)
+    period_start = models.DateField()
+    donation_center = models.ForeignKey(DonationCenter, on_delete=models.CASCADE, related_name='rollups')
+    blood_type = models.CharField(max_length=3, blank=True)
+    donations = models.PositiveIntegerField(default=0)
+    units = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['grain', 'period_start', 'donation_center', 'blood_type']
+    
+    def __str__(self):
+        return f"{self.grain} {self.period_start} center #{self.donation_center_id} {self.blood_type}"
+
+class DemandRollup(models.Model):
+    """Emergency requests per period, blood type and urgency (see accounts.rollups)."""
+    grain = models.CharField(max_length=10, choices=DonationRollup.GRAIN_CHOICES)
+    period_start = models.DateField()
+    blood_type_needed = models.CharField(max_length=3)
+    urgency = models.CharField(max_length=10)
+    requests = models.PositiveIntegerField(default=0)
+    units_needed = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['grain', 'period_start', 'blood_type_needed', 'urgency']
+    
+    def __str__(self):
+        return f"{self.grain} {self.period_start} {self.blood_type_needed} {self.urgency}"
+
+class ShortageForecast(models.Model):
+    """Latest per-center, per-blood-type supply/demand forecast (see accounts.forecasting)."""
+    generated_at = models.DateTimeField()
+    horizon_days = models.PositiveIntegerField()
+    donation_center = models.ForeignKey(DonationCenter, on_delete=models.CASCADE, related_name='forecasts')
+    blood_type = models.CharField(max_length=3)
+    expected_supply = models.FloatField()
+    expected_demand = models.FloatField()
+    shortage = models.FloatField(help_text="Expected demand not covered by supply over the horizon, in units")
+    
+    class Meta:
+        unique_together = ['donation_center', 'blood_type']
+        indexes = [
+            models.Index(fields=['-shortage'], condition=models.Q(shortage__gt=0), name='forecast_shortage_idx'),
+        ]
+    
+    def __str__(self):
+        return f"center #{self.donation_center_id} {self.blood_type}: short {self.shortage:.1f} units"
+
+# Archive tables (accounts.archive): closed rows past their retention window
+# move here with their ids unchanged, keeping the live tables and indexes small.
+class ArchivedDonation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_donations')
+    donation_center = models.ForeignKey(DonationCenter, on_delete=models.CASCADE, related_name='archived_donations')
+    scheduled_date = models.DateTimeField()
+    actual_date = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Donation.STATUS_CHOICES)
+    blood_type = models.CharField(max_length=3, blank=True)
+    units_collected = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    pre_screening_notes = models.TextField(blank=True)
+    post_donation_notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    objects = UserOwnedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-scheduled_date']
+        indexes = [
+            models.Index(fields=['user', '-scheduled_date'], name='archived_donation_user_idx'),
+            models.Index(fields=['scheduled_date'], condition=models.Q(status='completed'), name='archived_donation_sched_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.scheduled_date.strftime('%Y-%m-%d')} (archived)"
+
+class ArchivedEmergencyRequest(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    hospital_name = models.CharField(max_length=200)
+    blood_type_needed = models.CharField(max_length=3, choices=EmergencyRequest.BLOOD_TYPE_CHOICES)
+    units_needed = models.IntegerField()
+    urgency = models.CharField(max_length=10, choices=EmergencyRequest.URGENCY_CHOICES)
+    status = models.CharField(max_length=20, choices=EmergencyRequest.STATUS_CHOICES)
+    patient_age = models.IntegerField(null=True, blank=True)
+    patient_condition = models.CharField(max_length=200, blank=True)
+    contact_person = models.CharField(max_length=100)
+    contact_phone = models.CharField(max_length=15)
+    location = models.TextField()
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    expires_at = models.DateTimeField()
+    responses_count = models.PositiveIntegerField(default=0)
+    interested_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='archived_emergency_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.hospital_name} - {self.blood_type_needed} ({self.urgency}, archived)"
+
+class ArchivedEmergencyResponse(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    emergency_request = models.ForeignKey(ArchivedEmergencyRequest, on_delete=models.CASCADE, related_name='responses')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_emergency_responses')
+    status = models.CharField(max_length=20)
+    response_time = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user.username} - request #{self.emergency_request_id} (archived)"
+
+class ArchivedNotificationOutbox(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    event = models.CharField(max_length=30, choices=NotificationOutbox.EVENT_CHOICES)
+    emergency_request = models.ForeignKey(ArchivedEmergencyRequest, on_delete=models.CASCADE, related_name='outbox_events')
+    status = models.CharField(max_length=20, choices=NotificationOutbox.STATUS_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    recipients_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.event} #{self.emergency_request_id} ({self.status}, archived)"
+
+class ArchivedDonorNotification(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    outbox = models.ForeignKey(ArchivedNotificationOutbox, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.outbox} (archived)"
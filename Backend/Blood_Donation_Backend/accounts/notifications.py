@@ -0,0 +1,273 @@
+"""
+Donor notification fan-out for urgent emergency requests.
+
+``process_outbox`` claims NotificationOutbox rows, materializes the recipient
+set with one set-wise query per region shard (run in parallel), and hands
+messages to the configured backend in batches. Per-recipient DonorNotification rows record what was sent, so a
+worker that dies mid fan-out resumes without re-notifying anyone. The claim is
+renewed before every batch; a worker whose lease was taken over stops sending.
+"""
+import logging
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import (
+    UserProfile, Donation, EmergencyResponse, NotificationOutbox, DonorNotification
+)
+from .sharding import scatter, users_by_shard
+
+logger = logging.getLogger(__name__)
+
+# Red cell compatibility: recipient blood type -> donor blood types
+COMPATIBLE_DONORS = {
+    'O-': ['O-'],
+    'O+': ['O-', 'O+'],
+    'A-': ['O-', 'A-'],
+    'A+': ['O-', 'O+', 'A-', 'A+'],
+    'B-': ['O-', 'B-'],
+    'B+': ['O-', 'O+', 'B-', 'B+'],
+    'AB-': ['O-', 'A-', 'B-', 'AB-'],
+    'AB+': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
+}
+
+# A 'processing' claim older than this is assumed to belong to a dead worker
+CLAIM_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+
+
+class ClaimLost(Exception):
+    """The outbox row was reclaimed by another worker after this worker's lease expired."""
+
+
+class BaseNotificationBackend:
+    def send_messages(self, messages):
+        """Deliver a batch of message dicts and return how many were sent."""
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseNotificationBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send_messages(self, messages):
+        with self._lock:
+            for message in messages:
+                self.stream.write(f"[notify user={message['user_id']}] {message['subject']}\n")
+            self.stream.flush()
+        return len(messages)
+
+
+class LocmemBackend(BaseNotificationBackend):
+    """Keeps sent messages in memory (``LocmemBackend.outbox``) for tests and local runs."""
+    outbox = []
+
+    def send_messages(self, messages):
+        LocmemBackend.outbox.extend(messages)
+        return len(messages)
+
+
+def get_backend():
+    return import_string(settings.NOTIFICATION_BACKEND)()
+
+
+def eligible_recipients(emergency_request):
+    """User ids of compatible, eligible donors who have not already responded, from every shard."""
+    recent_donation_cutoff = timezone.now() - timedelta(days=settings.DONATION_INTERVAL_DAYS)
+    # Responses live on 'default' and donors in their shards: fetch the (few)
+    # responders once instead of joining across databases
+    already_responded = list(
+        EmergencyResponse.objects.filter(emergency_request_id=emergency_request.pk).values_list('user_id', flat=True)
+    )
+
+    def donors_in(alias):
+        recent_donation = Donation.objects.using(alias).filter(
+            user_id=OuterRef('user_id'),
+            status='completed',
+            scheduled_date__gte=recent_donation_cutoff,
+        )
+        return list(
+            UserProfile.objects.using(alias)
+            .filter(
+                blood_type__in=COMPATIBLE_DONORS.get(emergency_request.blood_type_needed, []),
+                donation_eligibility=True,
+                user__is_active=True,
+            )
+            .exclude(Exists(recent_donation))
+            .exclude(user_id__in=already_responded)
+            .values_list('user_id', flat=True)
+        )
+
+    return [user_id for user_ids in scatter(donors_in) for user_id in user_ids]
+
+
+def phone_numbers(user_ids):
+    """``{user_id: phone_number}`` read from each user's shard."""
+    grouped = users_by_shard(user_ids)
+    if not grouped:
+        return {}
+    numbers = {}
+    for rows in scatter(
+        lambda alias: list(
+            UserProfile.objects.using(alias).filter(user_id__in=grouped[alias]).values_list('user_id', 'phone_number')
+        ),
+        list(grouped),
+    ):
+        numbers.update(rows)
+    return numbers
+
+
+def build_message(notification, emergency_request, phone_number=''):
+    return {
+        'user_id': notification.user_id,
+        'email': notification.user.email,
+        'phone_number': phone_number,
+        'subject': (
+            f"Urgent: {emergency_request.hospital_name} needs "
+            f"{emergency_request.blood_type_needed} blood"
+        ),
+        'body': (
+            f"{emergency_request.units_needed} unit(s) of {emergency_request.blood_type_needed} "
+            f"are needed at {emergency_request.location}. "
+            f"Open the app to respond before {emergency_request.expires_at:%Y-%m-%d %H:%M} UTC."
+        ),
+    }
+
+
+def claim_next(worker_id):
+    """Atomically claim the oldest pending (or abandoned) outbox row, or return None."""
+    now = timezone.now()
+    candidates = NotificationOutbox.objects.filter(
+        Q(status='pending') | Q(status='processing', claimed_at__lt=now - CLAIM_LEASE)
+    ).order_by('created_at')
+    for event in candidates[:10]:
+        # Compare-and-set on (status, claimed_at): exactly one worker wins each row
+        claimed = NotificationOutbox.objects.filter(
+            pk=event.pk, status=event.status, claimed_at=event.claimed_at
+        ).update(
+            status='processing', claimed_by=worker_id, claimed_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return NotificationOutbox.objects.select_related('emergency_request').get(pk=event.pk)
+    return None
+
+
+def owned(event):
+    """The outbox row, filtered on the claim token (claimed_by, claimed_at) ``event`` was claimed with."""
+    return NotificationOutbox.objects.filter(
+        pk=event.pk, status='processing', claimed_by=event.claimed_by, claimed_at=event.claimed_at
+    )
+
+
+def renew_claim(event):
+    """Extend the lease on ``event`` if this worker still holds it, else raise ClaimLost."""
+    now = timezone.now()
+    if not owned(event).update(claimed_at=now):
+        raise ClaimLost(event.pk)
+    event.claimed_at = now
+
+
+def fan_out(event, backend, batch_size):
+    emergency_request = event.emergency_request
+    if emergency_request.status != 'active' or emergency_request.expires_at <= timezone.now():
+        return 0
+    recipients = eligible_recipients(emergency_request)
+
+    # Materialize the recipient set; ignore_conflicts makes a resumed run idempotent
+    pending = []
+    for user_id in recipients:
+        pending.append(DonorNotification(outbox=event, user_id=user_id))
+        if len(pending) >= batch_size:
+            DonorNotification.objects.bulk_create(pending, ignore_conflicts=True)
+            pending = []
+    if pending:
+        DonorNotification.objects.bulk_create(pending, ignore_conflicts=True)
+
+    sent = 0
+    unsent = DonorNotification.objects.filter(outbox=event, sent_at__isnull=True).order_by('id')
+    while True:
+        batch = list(unsent.select_related('user')[:batch_size])
+        if not batch:
+            break
+        # Compare-and-set on the claim before sending: a worker that lost its
+        # lease must not deliver a batch the new owner is also sending
+        renew_claim(event)
+        phones = phone_numbers(n.user_id for n in batch)
+        sent += backend.send_messages([
+            build_message(n, emergency_request, phones.get(n.user_id, '')) for n in batch
+        ])
+        DonorNotification.objects.filter(pk__in=[n.pk for n in batch]).update(sent_at=timezone.now())
+    return sent
+
+
+def process_outbox(worker_id='worker', batch_size=500, limit=None, backend=None):
+    """
+    Drain claimable outbox rows and return throughput stats:
+    ``{'events': n, 'sent': n, 'failed': n, 'lost': n, 'seconds': s, 'per_second': r}``.
+    """
+    backend = backend or get_backend()
+    stats = {'events': 0, 'sent': 0, 'failed': 0, 'lost': 0}
+    started = time.monotonic()
+
+    while limit is None or stats['events'] + stats['failed'] + stats['lost'] < limit:
+        event = claim_next(worker_id)
+        if event is None:
+            break
+        event_started = time.monotonic()
+        try:
+            sent = fan_out(event, backend, batch_size)
+        except ClaimLost:
+            # The new owner resumes from the DonorNotification rows
+            logger.warning('Notification claim lost', extra={'data': {'outbox_id': event.pk}})
+            stats['lost'] += 1
+            continue
+        except Exception as e:
+            logger.exception('Notification fan-out failed', extra={'data': {'outbox_id': event.pk}})
+            # Keep the claim so the row is retried once its lease expires
+            owned(event).update(
+                status='failed' if event.attempts >= MAX_ATTEMPTS else 'processing',
+                claimed_by='',
+                claimed_at=timezone.now(),
+                last_error=str(e),
+            )
+            stats['failed'] += 1
+            continue
+
+        owned(event).update(
+            status='done',
+            processed_at=timezone.now(),
+            recipients_count=DonorNotification.objects.filter(outbox=event).count(),
+        )
+        stats['events'] += 1
+        stats['sent'] += sent
+        logger.info('Notification fan-out complete', extra={'data': {
+            'outbox_id': event.pk,
+            'sent': sent,
+            'seconds': round(time.monotonic() - event_started, 3),
+        }})
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    stats['per_second'] = round(stats['sent'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+    return stats
+
+
+def outbox_stats():
+    now = timezone.now()
+    oldest = (
+        NotificationOutbox.objects.filter(status='pending')
+        .order_by('created_at').values_list('created_at', flat=True).first()
+    )
+    return {
+        'pending': NotificationOutbox.objects.filter(status='pending').count(),
+        'processing': NotificationOutbox.objects.filter(status='processing').count(),
+        'failed': NotificationOutbox.objects.filter(status='failed').count(),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'sent_last_hour': DonorNotification.objects.filter(sent_at__gte=now - timedelta(hours=1)).count(),
+    }
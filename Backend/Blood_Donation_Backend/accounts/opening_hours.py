@@ -0,0 +1,171 @@
+"""
+Weekly opening intervals compiled from ``DonationCenter.operating_hours``.
+
+The free text ('Mon-Fri: 8AM-6PM, Sat: 9AM-3PM', 'Daily 07:00-20:00',
+'Sat-Sun: 10pm-2am') is parsed into ``CenterOpeningHours`` rows of
+``[start_minute, end_minute)`` counted from Monday 00:00, rebuilt whenever a
+center is saved. "Open at t" is then one query, a probe of
+``opening_hours_center_idx`` per center, instead of parsing every center's
+text per request.
+
+Hours given without any day ('Open 24 hours', '8am-6pm') apply every day.
+Times are read in the project time zone (``settings.TIME_ZONE``). Text that
+does not parse yields no intervals, so such a center never shows as open;
+``manage.py index_opening_hours`` lists them.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import CenterOpeningHours
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_GROUPS = {
+    'daily': range(7),
+    'everyday': range(7),
+    'weekdays': range(5),
+    'weekends': range(5, 7),
+}
+
+_DAY = r'(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?'
+_DAY_SPEC = rf'(?:daily|every\s*day|weekdays|weekends|{_DAY}(?:\s*(?:-|–|to)\s*{_DAY})?)'
+_TIME = r'(?:noon|midnight|\d{1,2}(?:[:.]\d{2})?\s*(?:[ap]\.?\s?m\.?)?)'
+_RANGE = rf'{_TIME}\s*(?:-|–|to)\s*{_TIME}'
+_HOURS = rf'(?:closed|24\s*(?:hours|hrs|h)|{_RANGE}(?:\s*(?:,|&|and)\s*{_RANGE})*)'
+
+ENTRY_RE = re.compile(
+    rf'(?P<days>{_DAY_SPEC}(?:\s*(?:,|&|and)\s*{_DAY_SPEC})*)\s*:?\s*(?P<hours>{_HOURS})',
+    re.IGNORECASE,
+)
+DAY_SPEC_RE = re.compile(_DAY_SPEC, re.IGNORECASE)
+# Hours with no day spec in front; word-bounded so phone numbers don't read as ranges
+BARE_HOURS_RE = re.compile(rf'(?<!\w)(?P<hours>{_HOURS})(?!\w)', re.IGNORECASE)
+RANGE_RE = re.compile(rf'({_TIME})\s*(?:-|–|to)\s*({_TIME})', re.IGNORECASE)
+ALWAYS_OPEN_RE = re.compile(r'\b24\s*/\s*7\b')
+TIME_RE = re.compile(r'(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?\s?m\.?)?', re.IGNORECASE)
+
+
+def _days(spec):
+    spec = re.sub(r'\s+', '', spec.lower())
+    if spec in DAY_GROUPS:
+        return list(DAY_GROUPS[spec])
+    names = re.findall(r'(mon|tue|wed|thu|fri|sat|sun)', spec)
+    if len(names) == 1:
+        return [DAYS.index(names[0])]
+    first, last = DAYS.index(names[0]), DAYS.index(names[-1])
+    # 'Fri-Mon' wraps around the weekend
+    return [(first + i) % 7 for i in range((last - first) % 7 + 1)]
+
+
+def _minutes(text):
+    text = text.strip().lower()
+    if text == 'noon':
+        return 12 * 60
+    if text == 'midnight':
+        return 0
+    hour, minute, meridiem = TIME_RE.fullmatch(text).groups()
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem == 'p' else 0)
+    if hour > 24 or minute > 59:
+        raise ValueError(f'Invalid time: {text}')
+    return hour * 60 + minute
+
+
+def _range(start_text, end_text):
+    start, end = _minutes(start_text), _minutes(end_text)
+    # A bare '9-5' or '12-4' means 9 AM to 5 PM or noon to 4 PM, not an overnight shift
+    if end <= start <= 12 * 60 < end + 12 * 60 and end_text.strip()[-1].isdigit():
+        end += 12 * 60
+    return start, end
+
+
+def _ranges(hours):
+    ranges = []
+    for start_text, end_text in RANGE_RE.findall(hours):
+        start, end = _range(start_text, end_text)
+        # 'Mon-Fri 9-12, 1-5': a bare range that starts before the one before it
+        # ended carries on into the afternoon
+        if ranges and start < min(ranges[-1][1], 12 * 60) and start_text.strip()[-1].isdigit():
+            start += 12 * 60
+            if end <= start and end_text.strip()[-1].isdigit():
+                end += 12 * 60
+        ranges.append((start, end))
+    return ranges
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def parse_operating_hours(text):
+    """Sorted, non-overlapping ``(start_minute, end_minute)`` week intervals for ``text``."""
+    if ALWAYS_OPEN_RE.search(text or ''):
+        return [(0, WEEK_MINUTES)]
+    entries = [(entry['days'], entry['hours']) for entry in ENTRY_RE.finditer(text or '')]
+    if not entries:
+        bare = BARE_HOURS_RE.search(text or '')
+        entries = [('daily', bare['hours'])] if bare else []
+    intervals = []
+    for day_specs, hours in entries:
+        days = [day for spec in DAY_SPEC_RE.findall(day_specs) for day in _days(spec)]
+        hours = hours.lower()
+        if hours == 'closed':
+            continue
+        if hours.startswith('24'):
+            ranges = [(0, DAY_MINUTES)]
+        else:
+            try:
+                ranges = _ranges(hours)
+            except ValueError:
+                continue
+        for day in days:
+            for start, end in ranges:
+                if end <= start:
+                    # Closes after midnight (or at midnight): runs into the next day
+                    end += DAY_MINUTES
+                start, end = day * DAY_MINUTES + start, day * DAY_MINUTES + end
+                if end > WEEK_MINUTES:
+                    # Sunday night into Monday morning
+                    intervals.append((0, end - WEEK_MINUTES))
+                    end = WEEK_MINUTES
+                intervals.append((start, end))
+    return _merge(intervals)
+
+
+def minute_of_week(moment):
+    local = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+    return local.weekday() * DAY_MINUTES + local.hour * 60 + local.minute
+
+
+def is_open_at(moment):
+    """Condition for DonationCenter querysets: open at ``moment``."""
+    minute = minute_of_week(moment)
+    # A correlated EXISTS keeps the center list in its name index order; a
+    # join would start from the intervals and sort the result
+    return Exists(CenterOpeningHours.objects.filter(
+        donation_center=OuterRef('pk'), start_minute__lte=minute, end_minute__gt=minute,
+    ))
+
+
+def index_center(center):
+    """Replace the stored intervals of ``center``; returns how many it has."""
+    intervals = parse_operating_hours(center.operating_hours)
+    with transaction.atomic():
+        CenterOpeningHours.objects.filter(donation_center=center).delete()
+        CenterOpeningHours.objects.bulk_create([
+            CenterOpeningHours(donation_center=center, start_minute=start, end_minute=end)
+            for start, end in intervals
+        ])
+    return len(intervals)
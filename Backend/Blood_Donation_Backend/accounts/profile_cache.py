@@ -0,0 +1,46 @@
+"""
+Versioned cache of the serialized profile payload (profile + medical lists).
+
+Every write to a user's profile, allergies, medications or conditions moves the
+user's version key on commit, which orphans the old payload instead of trying
+to delete it, so a reader can never re-cache data from before the change.
+"""
+import time
+
+from django.core.cache import cache
+
+PROFILE_CACHE_TIMEOUT = 60 * 60
+VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def _version_key(user_id):
+    return f'profile:version:{user_id}'
+
+
+def get_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = bump_version(user_id)
+    return version
+
+
+def bump_version(user_id):
+    # A fresh timestamp rather than incr(): concurrent bumps can never collide on
+    # one value, and an evicted key never restarts from an old number
+    version = time.time_ns()
+    cache.set(_version_key(user_id), version, VERSION_TIMEOUT)
+    return version
+
+
+def _data_key(user_id, version):
+    return f'profile:data:{user_id}:{version}'
+
+
+def get_cached(user_id):
+    """Return ``(version, payload)``; payload is None on a miss."""
+    version = get_version(user_id)
+    return version, cache.get(_data_key(user_id, version))
+
+
+def set_cached(user_id, version, payload):
+    cache.set(_data_key(user_id, version), payload, PROFILE_CACHE_TIMEOUT)
@@ -0,0 +1,178 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries a valid ``X-Profile`` token (see
+``manage.py profiles token``) or is picked by ``settings.PROFILING_SAMPLE_RATE``.
+The cProfile stats and the SQL statements it ran (text and timings only, never
+parameters) are written to ``settings.PROFILING_DIR``, which keeps only the
+newest ``settings.PROFILING_MAX_FILES`` profiles. ``manage.py profiles`` lists
+and renders them.
+
+Under ASGI, requests that are not profiled pass straight through. A profiled
+one runs the rest of the chain on Django's thread-sensitive sync thread,
+where the sync views and their queries run too, so cProfile and the SQL
+recorder see the request's work and not whatever else the event loop
+interleaves.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'accounts.profiling'
+TOKEN_MAX_AGE = 60 * 60
+
+
+def make_token(label=''):
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(label or 'profile')
+
+
+def check_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that records each statement's SQL, alias and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def wrapper_for(self, alias):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                    'many': many,
+                })
+        return record
+
+
+class ProfileStore:
+    def __init__(self, path=None, max_files=None):
+        self.path = Path(path or settings.PROFILING_DIR)
+        self.max_files = max_files or settings.PROFILING_MAX_FILES
+
+    def save(self, profiler, meta):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Millisecond timestamp first so ids sort oldest to newest
+        now = meta['created']
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(self.path / f'{profile_id}.prof')
+        # The .json is written last and atomically: it is what list() looks for
+        tmp = self.path / f'{profile_id}.json.tmp'
+        tmp.write_text(json.dumps(dict(meta, id=profile_id)))
+        os.replace(tmp, self.path / f'{profile_id}.json')
+        self.rotate()
+        return profile_id
+
+    def rotate(self):
+        for meta_path in self._meta_paths()[self.max_files:]:
+            for path in (meta_path, meta_path.with_suffix('.prof')):
+                path.unlink(missing_ok=True)
+
+    def _meta_paths(self):
+        if not self.path.exists():
+            return []
+        return sorted(self.path.glob('*.json'), reverse=True)
+
+    def list(self):
+        """Metadata of stored profiles, newest first."""
+        profiles = []
+        for path in self._meta_paths():
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def load(self, profile_id):
+        """Return ``(meta, stats_path)``; raises FileNotFoundError for unknown ids."""
+        meta_path = self.path / f'{Path(profile_id).name}.json'
+        return json.loads(meta_path.read_text()), meta_path.with_suffix('.prof')
+
+
+class ProfilingMiddleware:
+    header = 'HTTP_X_PROFILE'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token:
+            return check_token(token)
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(request, async_to_sync(self.get_response))
+
+    def profile(self, request, get_response):
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder.wrapper_for(alias)))
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this thread
+                return get_response(request)
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        try:
+            profile_id = ProfileStore().save(profiler, {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(elapsed * 1000, 1),
+                'created': time.time(),
+                'sampled': self.header not in request.META,
+                'sql_ms': round(sum(q['ms'] for q in recorder.queries), 1),
+                'queries': recorder.queries,
+            })
+        except OSError:
+            logger.warning('Could not store request profile', exc_info=True)
+        else:
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,193 @@
+"""
+Weekly and monthly rollups of completed donations and emergency demand.
+
+``refresh_rollups`` looks only at source rows whose ``updated_at`` moved past
+the stored watermark, finds the periods they fall in and recomputes just those
+periods from the source table. Dashboards read the small rollup tables through
+``trend_queryset`` instead of grouping the raw tables on every load.
+
+A row whose date moves to another period, or a deleted row, leaves its old
+period stale until the next ``refresh_rollups(rebuild=True)``.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .archive import history_querysets
+from .models import (
+    Donation, EmergencyRequest, DonationRollup, DemandRollup, RollupWatermark
+)
+from .sharding import aliases_for
+from .sync import COMMIT_LAG
+
+GRAINS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+ROLLUPS = {
+    'donations': {
+        'source': Donation,
+        'rollup': DonationRollup,
+        'date_field': 'scheduled_date',
+        'filter': {'status': 'completed'},
+        'exclude': {},
+        'group_by': ('donation_center_id', 'blood_type'),
+        'measures': {'donations': Count('id'), 'units': Sum('units_collected')},
+        'filters': {'center': 'donation_center_id', 'blood_type': 'blood_type'},
+    },
+    'demand': {
+        'source': EmergencyRequest,
+        'rollup': DemandRollup,
+        'date_field': 'created_at',
+        'filter': {},
+        'exclude': {'status': 'cancelled'},
+        'group_by': ('blood_type_needed', 'urgency'),
+        'measures': {'requests': Count('id'), 'units_needed': Sum('units_needed')},
+        'filters': {'blood_type': 'blood_type_needed', 'urgency': 'urgency'},
+    },
+}
+
+
+def period_end(start, grain):
+    if grain == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _period_bounds(start, grain):
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(period_end(start, grain), time.min)),
+    )
+
+
+def recompute_period(name, grain, start):
+    """Replace the ``grain`` rollup rows of the period starting on ``start``; returns the row count."""
+    spec = ROLLUPS[name]
+    lower, upper = _period_bounds(start, grain)
+    totals = {}
+    # Archived rows still count towards their period, in every shard
+    for queryset in history_querysets(spec['source']):
+        rows = (
+            queryset
+            .filter(**spec['filter'])
+            .exclude(**spec['exclude'])
+            .filter(**{f"{spec['date_field']}__gte": lower, f"{spec['date_field']}__lt": upper})
+            .order_by()
+            .values(*spec['group_by'])
+            .annotate(**spec['measures'])
+        )
+        for row in rows:
+            key = tuple(row[field] for field in spec['group_by'])
+            total = totals.setdefault(key, dict.fromkeys(spec['measures'], 0))
+            for measure in spec['measures']:
+                # Sum() over only NULL units is NULL
+                total[measure] += row[measure] or 0
+    rollup = spec['rollup']
+    objs = [
+        rollup(grain=grain, period_start=start, **dict(zip(spec['group_by'], key)), **measures)
+        for key, measures in totals.items()
+    ]
+    with transaction.atomic():
+        rollup.objects.filter(grain=grain, period_start=start).delete()
+        rollup.objects.bulk_create(objs)
+    return len(objs)
+
+
+def _periods(querysets, trunc, date_field):
+    starts = set()
+    for queryset in querysets:
+        starts.update(
+            queryset.order_by()
+            .annotate(period=trunc(date_field))
+            .values_list('period', flat=True)
+            .distinct()
+        )
+    return sorted({value.date() for value in starts})
+
+
+def refresh(name, rebuild=False):
+    """
+    Fold the rows changed since the watermark into the ``name`` rollups, or
+    recompute every period that has rows with ``rebuild``.
+
+    Each period is replaced in its own short transaction (``recompute_period``),
+    so dashboards keep reading the other periods and the write lock is never
+    held for a whole rebuild. The watermark moves only once every period is
+    done: a run that fails part-way is repeated from the old watermark.
+    """
+    spec = ROLLUPS[name]
+    horizon = timezone.now() - COMMIT_LAG
+    watermark, _ = RollupWatermark.objects.get_or_create(name=name)
+
+    if rebuild:
+        # Archived rows included, so periods that are only archived survive
+        sources = history_querysets(spec['source'])
+    else:
+        sources = []
+        for alias in aliases_for(spec['source']):
+            queryset = spec['source'].objects.using(alias).filter(updated_at__lte=horizon)
+            if watermark.position:
+                queryset = queryset.filter(updated_at__gt=watermark.position)
+            sources.append(queryset)
+
+    stats = {'periods': 0, 'rows': 0}
+    for grain, trunc in GRAINS.items():
+        starts = _periods(sources, trunc, spec['date_field'])
+        for start in starts:
+            stats['rows'] += recompute_period(name, grain, start)
+            stats['periods'] += 1
+        if rebuild:
+            # Periods none of whose rows are left
+            spec['rollup'].objects.filter(grain=grain).exclude(period_start__in=starts).delete()
+    # Rows stamped after the horizon are picked up by the next run
+    RollupWatermark.objects.filter(pk=watermark.pk).update(position=horizon)
+    return stats
+
+
+def refresh_rollups(names=None, rebuild=False):
+    return {name: refresh(name, rebuild=rebuild) for name in (names or ROLLUPS)}
+
+
+def _date(value, name):
+    day = parse_date(value) if isinstance(value, str) else value
+    if day is None:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+    return day
+
+
+def trend_queryset(metric, grain='week', start=None, end=None, **filters):
+    """Rollup rows for ``metric`` ordered by period; ``start``/``end`` are inclusive dates.
+
+    Raises ValueError on bad input.
+    """
+    if metric not in ROLLUPS:
+        raise ValueError(f"Unknown metric '{metric}'. Choose from: {', '.join(ROLLUPS)}")
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of: {', '.join(GRAINS)}")
+    spec = ROLLUPS[metric]
+
+    queryset = spec['rollup'].objects.filter(grain=grain)
+    if start:
+        queryset = queryset.filter(period_start__gte=_date(start, 'start'))
+    if end:
+        queryset = queryset.filter(period_start__lte=_date(end, 'end'))
+    for param, value in filters.items():
+        if not value:
+            continue
+        if param not in spec['filters']:
+            raise ValueError(f"'{param}' is not a filter for {metric}")
+        queryset = queryset.filter(**{spec['filters'][param]: value})
+
+    return queryset.order_by('period_start', *spec['group_by']).values(
+        'period_start', *spec['group_by'], *spec['measures']
+    )
+
+
+def watermark_position(metric):
+    return RollupWatermark.objects.filter(name=metric).values_list('position', flat=True).first()
@@ -0,0 +1,123 @@
+"""
+Full-text search over donation centers and active emergency requests.
+
+On SQLite each table has an FTS5 index created in 0003_search_index. The
+index is external-content: it stores only the inverted index, and the text is
+read back from the model table. Triggers keep it in step with every insert,
+update and delete, and ``ensure_fts_triggers`` restores them after a migration
+rebuilds the table. Every word of the query must match as a prefix, and
+results are ranked with ``bm25()``, weighting names above addresses and notes.
+
+Other databases have no FTS5 index. There, the same words are matched with
+``icontains`` across the same fields, without ranking.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DonationCenter, EmergencyRequest
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# bm25() weights follow the FTS column order declared in 0003_search_index
+CENTER_SEARCH = {
+    'model': DonationCenter,
+    'fts': 'accounts_donationcenter_fts',
+    'table': 'accounts_donationcenter',
+    'fields': ['name', 'address'],
+    'weights': (10.0, 3.0),
+    'where': 't.is_active = 1',
+    'visible': lambda: Q(is_active=True),
+}
+
+EMERGENCY_SEARCH = {
+    'model': EmergencyRequest,
+    'fts': 'accounts_emergencyrequest_fts',
+    'table': 'accounts_emergencyrequest',
+    'fields': ['hospital_name', 'location', 'patient_condition'],
+    'weights': (10.0, 4.0, 2.0),
+    'where': "t.status = 'active' AND t.expires_at > %s",
+    'visible': lambda: Q(status='active', expires_at__gt=timezone.now()),
+}
+
+
+def _trigger_sql(spec):
+    fts, table, columns = spec['fts'], spec['table'], spec['fields']
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def ensure_fts_triggers(using='default', **kwargs):
+    """
+    post_migrate hook: SQLite rebuilds a table (dropping its triggers) whenever
+    a migration adds a NOT NULL column, so re-create any missing sync triggers.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for spec in (CENTER_SEARCH, EMERGENCY_SEARCH):
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [spec['fts']]
+            )
+            if cursor.fetchone() is None:
+                continue
+            for sql in _trigger_sql(spec):
+                cursor.execute(sql)
+
+
+def build_match_query(text):
+    """Turn free user input into an FTS5 query of quoted prefix terms (all required)."""
+    tokens = TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _search(spec, text, limit, params=()):
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    model = spec['model']
+    if connection.vendor != 'sqlite':
+        # No FTS5 index outside SQLite; fall back to unranked substring matching
+        query = spec['visible']()
+        for token in TOKEN_RE.findall(text):
+            token_q = Q()
+            for field in spec['fields']:
+                token_q |= Q(**{f'{field}__icontains': token})
+            query &= token_q
+        return list(model.objects.filter(query)[:limit])
+
+    fts = spec['fts']
+    weights = ', '.join(str(w) for w in spec['weights'])
+    sql = (
+        f"SELECT t.id FROM {fts} JOIN {spec['table']} t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH %s AND {spec['where']} "
+        f"ORDER BY bm25({fts}, {weights}) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    objects = model.objects.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def search_centers(text, limit=20):
+    return _search(CENTER_SEARCH, text, limit)
+
+
+def search_emergency_requests(text, limit=20):
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    return _search(EMERGENCY_SEARCH, text, limit, params=[now])
@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
 from .models import (
     UserProfile, MedicalAllergy, Medication, MedicalCondition,
     DonationCenter, Donation, EmergencyRequest, EmergencyResponse,
-    DonationAppointment
+    DonationAppointment, ShortageForecast
 )
 
 class MedicalAllergySerializer(serializers.ModelSerializer):
@@ -32,10 +34,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = [
             'id', 'user', 'blood_type', 'weight', 'height', 'date_of_birth', 'phone_number',
-            'address', 'emergency_contact_name', 'emergency_contact_phone',
+            'address', 'latitude', 'longitude', 'emergency_contact_name', 'emergency_contact_phone',
             'emergency_contact_relationship', 'last_checkup', 'donation_eligibility',
             'allergies', 'medications', 'medical_conditions'
         ]
+        # Derived from address when the profile is saved
+        read_only_fields = ['latitude', 'longitude']
     
     def get_user(self, obj):
         return {
@@ -76,10 +80,17 @@ class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=False)
     first_name = serializers.CharField(required=False, allow_blank=True)
     last_name = serializers.CharField(required=False, allow_blank=True)
+    # The region shard the donor's records are kept in; blank is DEFAULT_REGION
+    region = serializers.CharField(required=False, allow_blank=True, write_only=True)
 
     class Meta:
         model = User
-        fields = ('username', 'email', 'password', 'password2', 'first_name', 'last_name')
+        fields = ('username', 'email', 'password', 'password2', 'first_name', 'last_name', 'region')
+
+    def validate_region(self, value):
+        if value and value not in settings.SHARDS:
+            raise serializers.ValidationError(f"Unknown region '{value}'. Choose from: {', '.join(settings.SHARDS)}")
+        return value
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
@@ -89,19 +100,20 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Remove password2 as it's not needed for user creation
         validated_data.pop('password2', None)
-        
-        user = User.objects.create(
+        region = validated_data.pop('region', '')
+
+        user = User(
             username=validated_data['username'],
             email=validated_data.get('email', ''),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', '')
         )
         user.set_password(validated_data['password'])
-        user.save()
-        
-        # Create user profile
-        UserProfile.objects.create(user=user)
-        
+        # The profile itself is created by the post_save signal in accounts.signals,
+        # which records the region first so the profile is written to its shard
+        user._shard_region = region
+        with transaction.atomic():
+            user.save()
         return user
 
 class UserSerializer(serializers.ModelSerializer):
@@ -134,15 +146,19 @@ class DonationAppointmentSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['user']
 
-class EmergencyRequestSerializer(serializers.ModelSerializer):
-    responses_count = serializers.SerializerMethodField()
+class ShortageForecastSerializer(serializers.ModelSerializer):
+    donation_center_name = serializers.CharField(source='donation_center.name', read_only=True)
     
+    class Meta:
+        model = ShortageForecast
+        fields = '__all__'
+
+class EmergencyRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = EmergencyRequest
         fields = '__all__'
-    
-    def get_responses_count(self, obj):
-        return obj.responses.count()
+        # New requests start active; the lifecycle is driven by responses and expiry
+        read_only_fields = ['status', 'responses_count', 'interested_count', 'confirmed_count']
 
 class EmergencyResponseSerializer(serializers.ModelSerializer):
     emergency_request = EmergencyRequestSerializer(read_only=True)
@@ -152,3 +168,10 @@ class EmergencyResponseSerializer(serializers.ModelSerializer):
         model = EmergencyResponse
         fields = '__all__'
         read_only_fields = ['user']
+    
+    def validate_emergency_request_id(self, value):
+        if self.instance is not None and value != self.instance.emergency_request_id:
+            raise serializers.ValidationError("A response cannot be moved to another request.")
+        if self.instance is None and not EmergencyRequest.objects.filter(pk=value, status='active').exists():
+            raise serializers.ValidationError("This emergency request is no longer accepting responses.")
+        return value
@@ -0,0 +1,277 @@
+"""
+Region sharding of per-donor data.
+
+``settings.SHARDS`` maps each region to a database alias. A user's profile,
+medical records, donations, appointments and tombstones (``SHARDED_MODELS``)
+live in the database of the user's region, recorded in ``UserShard`` on
+'default'; users without a row belong to ``settings.DEFAULT_REGION``. All
+other tables are global and stay on 'default'.
+
+Every shard carries the full schema. Users and donation centers are global,
+but each shard keeps a copy of the rows its data points at (``mirror_user``,
+``mirror_center``) so foreign keys and joins such as
+``select_related('donation_center')`` work inside a shard. Sharded tables are
+numbered from a per-shard id block (``seed_id_blocks``), so ids stay unique
+across shards and a user can be moved without renumbering anything.
+
+``RegionRouter`` sends a sharded model to its user's shard whenever the query
+carries an instance (saves, deletes, related managers such as
+``user.profile``); querysets are pinned with ``Model.objects.for_user(user)``
+or ``.using(alias)``. Cross-region reads go through ``scatter``.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+
+from .models import (
+    UserProfile, MedicalAllergy, Medication, MedicalCondition,
+    Donation, DonationAppointment, DonationCenter, Tombstone, ArchivedDonation, UserShard
+)
+from . import profile_cache
+
+# Parents before children: the order rows are copied in when a user moves
+SHARDED_MODELS = [
+    UserProfile, MedicalAllergy, Medication, MedicalCondition,
+    Donation, DonationAppointment, Tombstone, ArchivedDonation,
+]
+SHARDED = {model._meta.label_lower for model in SHARDED_MODELS}
+
+ID_BLOCK = 10 ** 12
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED
+
+
+def shard_aliases():
+    """Every shard database alias, in id block order."""
+    return list(dict.fromkeys(settings.SHARDS.values()))
+
+
+def aliases_for(model):
+    return shard_aliases() if is_sharded(model) else ['default']
+
+
+def is_multi_region():
+    return len(settings.SHARDS) > 1
+
+
+def db_for_region(region):
+    return settings.SHARDS.get(region or settings.DEFAULT_REGION, settings.SHARDS[settings.DEFAULT_REGION])
+
+
+def region_for_user_id(user_id):
+    if not is_multi_region():
+        return settings.DEFAULT_REGION
+    region = UserShard.objects.filter(user_id=user_id).values_list('region', flat=True).first()
+    return region or settings.DEFAULT_REGION
+
+
+def db_for_user_id(user_id):
+    return db_for_region(region_for_user_id(user_id))
+
+
+def db_for_user(user):
+    """The user's shard alias, memoized on the instance for the rest of the request."""
+    db = getattr(user, '_shard_db', None)
+    if db is None:
+        db = user._shard_db = db_for_user_id(user.pk)
+    return db
+
+
+def users_by_shard(user_ids):
+    """``{alias: [user ids]}`` for ``user_ids`` in one UserShard query."""
+    user_ids = list(user_ids)
+    if not is_multi_region():
+        return {db_for_region(None): user_ids} if user_ids else {}
+    regions = dict(UserShard.objects.filter(user_id__in=user_ids).values_list('user_id', 'region'))
+    grouped = {}
+    for user_id in user_ids:
+        grouped.setdefault(db_for_region(regions.get(user_id)), []).append(user_id)
+    return grouped
+
+
+class RegionRouter:
+    """Route sharded models by the user of the instance hint; everything else to 'default'."""
+
+    def _db_for_instance(self, instance):
+        if instance is None:
+            return None
+        if isinstance(instance, User):
+            return db_for_user(instance)
+        if is_sharded(type(instance)) and instance._state.db:
+            return instance._state.db
+        user = instance._state.fields_cache.get('user')
+        if user is not None:
+            return db_for_user(user)
+        user_id = getattr(instance, 'user_id', None)
+        return db_for_user_id(user_id) if user_id is not None else None
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return 'default'
+        return self._db_for_instance(hints.get('instance'))
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shard rows point at mirrored users and centers
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema operations run everywhere: every shard carries the full schema.
+        # Data migrations (RunPython/RunSQL, which pass no model) query through
+        # the router and so would rewrite 'default' again while a new shard is
+        # migrated; a new shard is empty anyway. One that must run per shard
+        # opts in with hints={'shards': True} and uses schema_editor.connection.alias.
+        if model_name is None and db != 'default':
+            return hints.get('shards', False)
+        return None
+
+
+def _fields(obj):
+    return {field.attname: getattr(obj, field.attname) for field in obj._meta.concrete_fields}
+
+
+def _upsert(model, alias, fields):
+    # update()/bulk_create() send no signals, so a mirror never re-mirrors
+    if not model._base_manager.using(alias).filter(pk=fields['id']).update(**fields):
+        model._base_manager.using(alias).bulk_create([model(**fields)])
+
+
+def mirror_user(user, aliases=None):
+    """Copy ``user`` into its shard (or ``aliases``) so shard rows can reference it."""
+    fields = _fields(user)
+    # Logins only ever check 'default'; keep password hashes out of the shards
+    fields['password'] = '!'
+    for alias in aliases or [db_for_user(user)]:
+        if alias != 'default':
+            _upsert(User, alias, fields)
+
+
+def mirror_center(center):
+    fields = _fields(center)
+    for alias in shard_aliases():
+        if alias != 'default':
+            _upsert(DonationCenter, alias, fields)
+
+
+def drop_mirror(model, pk, aliases=None):
+    for alias in aliases or shard_aliases():
+        if alias != 'default':
+            model._base_manager.using(alias).filter(pk=pk).delete()
+
+
+def sync_reference_data():
+    """Mirror every center and every user into the shards that need them; returns counts."""
+    centers = list(DonationCenter.objects.all())
+    for center in centers:
+        mirror_center(center)
+    users = 0
+    for user in User.objects.filter(shard__isnull=False).iterator():
+        mirror_user(user)
+        users += 1
+    return {'centers': len(centers), 'users': users}
+
+
+def seed_id_blocks(using='default', **kwargs):
+    """
+    post_migrate hook: start each sharded table's ids at its shard's block so
+    rows created in different shards never share an id.
+    """
+    if using not in shard_aliases():
+        return
+    floor = shard_aliases().index(using) * ID_BLOCK
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or not floor:
+        return
+    with conn.cursor() as cursor:
+        for model in SHARDED_MODELS:
+            if not model._meta.pk.auto_created:
+                continue  # archive tables keep the ids of the rows they copy
+            table = model._meta.db_table
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [floor, table, floor])
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, floor, table],
+            )
+
+
+def scatter(func, aliases=None):
+    """Run ``func(alias)`` against every shard in parallel; results come back in alias order."""
+    aliases = list(aliases or shard_aliases())
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            # Connections are per thread; don't leak one per pool thread
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return list(pool.map(run, aliases))
+
+
+def derive_region(user):
+    """The configured region of the centers the user gives at most, or None."""
+    db = db_for_user(user)
+    visits = Counter()
+    for model in (Donation, DonationAppointment):
+        visits.update(model.objects.using(db).filter(user=user).values_list('donation_center_id', flat=True))
+    regions = Counter()
+    for center_id, region in DonationCenter.objects.filter(pk__in=visits).values_list('id', 'region'):
+        if region in settings.SHARDS:
+            regions[region] += visits[center_id]
+    return regions.most_common(1)[0][0] if regions else None
+
+
+def place_user(user, region):
+    """
+    Record a new ``user``'s region before any of their sharded rows exist, so
+    they are created in that shard from the start; nothing needs moving.
+    """
+    if region not in settings.SHARDS:
+        raise ValueError(f"Unknown region '{region}'. Choose from: {', '.join(settings.SHARDS)}")
+    UserShard.objects.create(user=user, region=region)
+    user._shard_db = db_for_region(region)
+    mirror_user(user)
+
+
+def move_user(user, region):
+    """
+    Move every sharded row of ``user`` to ``region``'s database; returns rows moved.
+
+    Rows are copied, the user is re-pointed, then the source rows are deleted.
+    The databases are separate, so this is not atomic: a write that reaches the
+    old shard between the copy and the switch is lost, and an interrupted move
+    is finished by running it again.
+    """
+    if region not in settings.SHARDS:
+        raise ValueError(f"Unknown region '{region}'. Choose from: {', '.join(settings.SHARDS)}")
+    source, target = db_for_user(user), db_for_region(region)
+
+    moved = 0
+    if source != target:
+        mirror_user(user, [target])
+        with transaction.atomic(using=target):
+            for model in SHARDED_MODELS:
+                rows = [model(**_fields(row)) for row in model._base_manager.using(source).filter(user=user)]
+                model._base_manager.using(target).bulk_create(rows, ignore_conflicts=True)
+                moved += len(rows)
+
+    UserShard.objects.update_or_create(user=user, defaults={'region': region})
+    user._shard_db = target
+
+    if source != target:
+        with transaction.atomic(using=source):
+            for model in reversed(SHARDED_MODELS):
+                model._base_manager.using(source).filter(user=user).delete()
+            drop_mirror(User, user.pk, [source])
+        profile_cache.bump_version(user.pk)
+    return moved
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import UserProfile, MedicalAllergy, Medication, MedicalCondition, DonationCenter
+from .geocoding import fill_coordinates
+from .opening_hours import index_center
+from .profile_cache import bump_version
+from .sharding import drop_mirror, is_multi_region, mirror_center, mirror_user, place_user
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, using='default', **kwargs):
+    # Every user has a profile from the start, so profile reads never write
+    if created and not raw and using == 'default':
+        # Set by RegisterSerializer: route the profile to the donor's shard
+        region = getattr(instance, '_shard_region', '')
+        if region and region != settings.DEFAULT_REGION:
+            place_user(instance, region)
+        UserProfile.objects.for_user(instance).get_or_create(user=instance)
+
+
+# Shards keep copies of the users and centers their rows reference. Writes to
+# the copies themselves (using != 'default') are not mirrored again.
+@receiver(post_save, sender=User)
+def mirror_user_to_shard(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    if raw or using != 'default' or created or not is_multi_region():
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    mirror_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def drop_user_mirror(sender, instance, using='default', **kwargs):
+    if using == 'default' and is_multi_region():
+        drop_mirror(User, instance.pk)
+
+
+@receiver(post_save, sender=DonationCenter)
+def mirror_center_to_shards(sender, instance, raw=False, using='default', **kwargs):
+    if not raw and using == 'default' and is_multi_region():
+        mirror_center(instance)
+
+
+@receiver(post_delete, sender=DonationCenter)
+def drop_center_mirror(sender, instance, using='default', **kwargs):
+    if using == 'default' and is_multi_region():
+        drop_mirror(DonationCenter, instance.pk)
+
+
+# Coordinates come from the local gazetteer, never from a remote geocoder.
+# Centers keep coordinates that were entered by hand.
+@receiver(pre_save, sender=UserProfile)
+def geocode_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fill_coordinates(instance)
+
+
+@receiver(pre_save, sender=DonationCenter)
+def geocode_center(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fill_coordinates(instance, overwrite=False)
+
+
+@receiver(post_save, sender=DonationCenter)
+def index_center_hours(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    if raw or using != 'default':
+        return
+    if update_fields is None or 'operating_hours' in update_fields:
+        index_center(instance)
+
+
+def invalidate_profile_cache(sender, instance, using='default', **kwargs):
+    user_id = instance.pk if sender is User else instance.user_id
+    transaction.on_commit(lambda: bump_version(user_id), using=using)
+
+
+for model in (User, UserProfile, MedicalAllergy, Medication, MedicalCondition):
+    post_save.connect(invalidate_profile_cache, sender=model, dispatch_uid=f'profile_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_profile_cache, sender=model, dispatch_uid=f'profile_cache_delete_{model.__name__}')
@@ -0,0 +1,43 @@
+"""Background tasks runnable through the job queue (see accounts.jobs)."""
+from django.utils import timezone
+
+from .archive import archive
+from .forecasting import forecast_shortages
+from .jobs import task
+from .models import EmergencyRequest
+from .notifications import process_outbox
+from .rollups import refresh_rollups
+from .sync import prune_tombstones
+
+
+@task('notifications.process_outbox')
+def process_notification_outbox(batch_size=500):
+    return process_outbox(worker_id='job-queue', batch_size=batch_size)
+
+
+@task('emergency.expire_requests')
+def expire_emergency_requests():
+    now = timezone.now()
+    return EmergencyRequest.objects.filter(status='active', expires_at__lte=now).update(
+        status='expired', updated_at=now
+    )
+
+
+@task('sync.prune_tombstones')
+def prune_sync_tombstones():
+    return prune_tombstones()
+
+
+@task('analytics.refresh_rollups')
+def refresh_analytics_rollups():
+    return refresh_rollups()
+
+
+@task('forecast.shortages')
+def forecast_blood_shortages():
+    return forecast_shortages()
+
+
+@task('archive.closed_records')
+def archive_closed_records(batch_size=500, max_batches=200):
+    return archive(batch_size=batch_size, max_batches=max_batches, pause=0.05)
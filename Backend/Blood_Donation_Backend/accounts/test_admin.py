@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import admin as accounts_admin
+from .admin import EstimatedCountPaginator, estimated_row_count
+from .models import DonationAppointment, DonationCenter, EmergencyRequest
+from .test_emergency import make_request
+
+APPOINTMENTS_URL = '/admin/accounts/donationappointment/'
+REQUESTS_URL = '/admin/accounts/emergencyrequest/'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_superuser(username='operator', password='pass12345')
+        cls.donor = User.objects.create_user(username='donor', password='pass12345')
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+
+    def setUp(self):
+        self.client.force_login(self.operator)
+
+    def appointment(self, status):
+        appointment = DonationAppointment.objects.create(
+            user=self.donor, donation_center=self.center, status=status,
+            appointment_date=timezone.now() + timedelta(days=1),
+        )
+        DonationAppointment.objects.filter(pk=appointment.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        return appointment
+
+    def run_action(self, url, action, objects):
+        return self.client.post(url, {
+            'action': action, '_selected_action': [obj.pk for obj in objects],
+        }, follow=True)
+
+    def test_mark_completed(self):
+        scheduled, confirmed, cancelled = (self.appointment(s) for s in ('scheduled', 'confirmed', 'cancelled'))
+        started = timezone.now()
+        response = self.run_action(APPOINTMENTS_URL, 'mark_completed', [scheduled, confirmed, cancelled])
+        self.assertContains(response, '2 appointments marked completed.')
+        statuses = dict(DonationAppointment.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            statuses, {scheduled.pk: 'completed', confirmed.pk: 'completed', cancelled.pk: 'cancelled'},
+        )
+        # Sync clients see the change
+        self.assertGreaterEqual(DonationAppointment.objects.get(pk=scheduled.pk).updated_at, started)
+        self.assertLess(DonationAppointment.objects.get(pk=cancelled.pk).updated_at, started)
+
+    def test_expire_requests(self):
+        active, fulfilled = make_request(), make_request()
+        EmergencyRequest.objects.filter(pk=fulfilled.pk).update(status='fulfilled')
+        response = self.run_action(REQUESTS_URL, 'expire_requests', [active, fulfilled])
+        self.assertContains(response, '1 requests expired.')
+        self.assertEqual(
+            dict(EmergencyRequest.objects.values_list('pk', 'status')),
+            {active.pk: 'expired', fulfilled.pk: 'fulfilled'},
+        )
+
+    def test_actions_need_change_permission(self):
+        viewer = User.objects.create_user(username='viewer', password='pass12345', is_staff=True)
+        viewer.user_permissions.add(Permission.objects.get(codename='view_emergencyrequest'))
+        self.client.force_login(viewer)
+        active = make_request()
+        response = self.run_action(REQUESTS_URL, 'expire_requests', [active])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(EmergencyRequest.objects.get(pk=active.pk).status, 'active')
+
+    def test_change_lists_render(self):
+        self.appointment('scheduled')
+        make_request()
+        for url, params in ((APPOINTMENTS_URL, {}), (APPOINTMENTS_URL, {'status': 'scheduled'}),
+                            (REQUESTS_URL, {'status': 'expired'})):
+            with self.subTest(url=url, params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for _ in range(5):
+            make_request()
+
+    def count(self, queryset, estimate=None):
+        with mock.patch.object(accounts_admin, 'estimated_row_count', return_value=estimate) as estimated:
+            count = EstimatedCountPaginator(queryset, 2).count
+        return count, estimated.called
+
+    @mock.patch.object(accounts_admin, 'COUNT_LIMIT', 3)
+    def test_unfiltered_large_table_uses_the_estimate(self):
+        self.assertEqual(self.count(EmergencyRequest.objects.all(), estimate=50_000), (50_000, True))
+
+    @mock.patch.object(accounts_admin, 'COUNT_LIMIT', 3)
+    def test_small_or_unknown_estimates_are_counted_up_to_the_limit(self):
+        self.assertEqual(self.count(EmergencyRequest.objects.all(), estimate=2), (3, True))
+        self.assertEqual(self.count(EmergencyRequest.objects.all(), estimate=None), (3, True))
+
+    @mock.patch.object(accounts_admin, 'COUNT_LIMIT', 3)
+    def test_filtered_lists_never_estimate(self):
+        self.assertEqual(self.count(EmergencyRequest.objects.filter(status='active'), estimate=50_000), (3, False))
+        self.assertEqual(self.count(EmergencyRequest.objects.filter(status='expired')), (0, False))
+
+    def test_exact_count_below_the_limit(self):
+        self.assertEqual(self.count(EmergencyRequest.objects.all())[0], 5)
+        paginator = EstimatedCountPaginator(EmergencyRequest.objects.order_by('-id'), 2)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(paginator.page(3).object_list), 1)
+
+    def test_sqlite_estimate_comes_from_analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_row_count(EmergencyRequest), 5)
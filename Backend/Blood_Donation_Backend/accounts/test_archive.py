@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .archive import archive, archive_batch, archive_stats
+from .models import (
+    ArchivedDonation, ArchivedDonorNotification, ArchivedEmergencyRequest, ArchivedEmergencyResponse,
+    ArchivedNotificationOutbox, Donation, DonationCenter, DonorNotification, EmergencyRequest,
+    EmergencyResponse, NotificationOutbox,
+)
+from .test_emergency import make_request
+
+
+class ArchiveBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donors = [User.objects.create_user(username=f'donor{i}', password='x') for i in range(2)]
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+
+    def closed_request(self, days_ago=120, status='fulfilled', outbox_status='done'):
+        emergency = make_request()
+        for donor in self.donors:
+            EmergencyResponse.objects.create(emergency_request=emergency, user=donor, status='confirmed')
+        event = NotificationOutbox.objects.create(
+            event='emergency_created', emergency_request=emergency, status=outbox_status, recipients_count=2,
+        )
+        for donor in self.donors:
+            DonorNotification.objects.create(outbox=event, user=donor, sent_at=timezone.now())
+        EmergencyRequest.objects.filter(pk=emergency.pk).update(
+            status=status, updated_at=timezone.now() - timedelta(days=days_ago),
+        )
+        return emergency, event
+
+    def test_emergency_request_takes_its_children(self):
+        emergency, event = self.closed_request()
+        response_ids = set(EmergencyResponse.objects.values_list('id', flat=True))
+        notification_ids = set(DonorNotification.objects.values_list('id', flat=True))
+
+        self.assertEqual(archive_batch('emergency_requests'), 1)
+        self.assertFalse(EmergencyRequest.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(DonorNotification.objects.exists())
+
+        archived = ArchivedEmergencyRequest.objects.get(pk=emergency.pk)
+        self.assertEqual((archived.status, archived.hospital_name), ('fulfilled', 'City Hospital'))
+        self.assertEqual(set(archived.responses.values_list('id', flat=True)), response_ids)
+        archived_event = archived.outbox_events.get()
+        self.assertEqual((archived_event.pk, archived_event.status, archived_event.recipients_count), (event.pk, 'done', 2))
+        self.assertEqual(set(archived_event.notifications.values_list('id', flat=True)), notification_ids)
+        self.assertEqual(
+            set(ArchivedDonorNotification.objects.values_list('user_id', flat=True)), {d.pk for d in self.donors},
+        )
+
+    def test_undelivered_and_recent_requests_stay(self):
+        self.closed_request(outbox_status='pending')
+        self.closed_request(outbox_status='processing')
+        self.closed_request(days_ago=10)
+        self.closed_request(status='active')
+        self.assertEqual(archive_batch('emergency_requests'), 0)
+        self.assertEqual(EmergencyRequest.objects.count(), 4)
+
+    def test_failed_outbox_does_not_block(self):
+        self.closed_request(outbox_status='failed')
+        self.assertEqual(archive_batch('emergency_requests'), 1)
+        self.assertEqual(ArchivedNotificationOutbox.objects.get().status, 'failed')
+
+    def test_rerun_after_an_interrupted_copy(self):
+        emergency, _ = self.closed_request()
+        # A previous run copied the parent and died before deleting
+        ArchivedEmergencyRequest.objects.create(
+            **{f.attname: getattr(emergency, f.attname) for f in EmergencyRequest._meta.concrete_fields},
+        )
+        self.assertEqual(archive_batch('emergency_requests'), 1)
+        self.assertEqual(ArchivedEmergencyRequest.objects.count(), 1)
+        self.assertEqual(ArchivedEmergencyResponse.objects.count(), 2)
+
+    def test_batches(self):
+        for _ in range(3):
+            self.closed_request()
+        self.assertEqual(archive(['emergency_requests'], batch_size=2), {'emergency_requests': 3})
+        self.assertEqual(archive_stats()['emergency_requests'], {'live': 0, 'archived': 3, 'eligible': 0})
+
+    def test_donations(self):
+        old = datetime(2024, 1, 9, 9, tzinfo=dt_timezone.utc)
+        for status in ('completed', 'cancelled', 'scheduled'):
+            Donation.objects.create(user=self.donors[0], donation_center=self.center, status=status, scheduled_date=old)
+        Donation.objects.create(
+            user=self.donors[0], donation_center=self.center, status='completed', scheduled_date=timezone.now(),
+        )
+        self.assertEqual(archive_batch('donations'), 2)
+        self.assertEqual(set(ArchivedDonation.objects.values_list('status', flat=True)), {'completed', 'cancelled'})
+        self.assertEqual(Donation.objects.count(), 2)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class DonationHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+        other = User.objects.create_user(username='other', password='pass12345')
+        center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+        cls.donations = {
+            year: Donation.objects.create(
+                user=cls.user, donation_center=center, status='completed',
+                scheduled_date=datetime(year, 3, 1, 9, tzinfo=dt_timezone.utc),
+            )
+            for year in (2022, 2023, 2024, 2026)
+        }
+        Donation.objects.create(
+            user=other, donation_center=center, status='completed',
+            scheduled_date=datetime(2023, 6, 1, 9, tzinfo=dt_timezone.utc),
+        )
+        # 2022 and 2024 go to the archive; 2023 stays live out of order
+        Donation.objects.filter(pk=cls.donations[2023].pk).update(status='scheduled')
+        archive_batch('donations', now=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        Donation.objects.filter(pk=cls.donations[2023].pk).update(status='completed')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, **params):
+        response = self.client.get('/api/donations/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_live_only_by_default(self):
+        self.assertEqual(self.ids(), [self.donations[2026].pk, self.donations[2023].pk])
+
+    def test_history_all_merges_newest_first(self):
+        self.assertEqual(ArchivedDonation.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.ids(history='all'), [self.donations[year].pk for year in (2026, 2024, 2023, 2022)])
+
+    def test_history_all_serializes_archived_rows_like_live_ones(self):
+        response = self.client.get('/api/donations/', {'history': 'all'})
+        rows = {row['id']: row for row in response.json()}
+        archived, live = rows[self.donations[2024].pk], rows[self.donations[2026].pk]
+        self.assertEqual(archived['donation_center']['name'], 'North')
+        self.assertEqual(set(archived) - {'archived_at'}, set(live))
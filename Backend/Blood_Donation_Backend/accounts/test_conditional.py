@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from . import conditional, metrics
+from .models import Donation, DonationAppointment, DonationCenter, EmergencyRequest
+from .test_emergency import make_request
+
+
+@override_settings(
+    THROTTLE_BUCKETS={},
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+        cls.appointments = [
+            DonationAppointment.objects.create(
+                user=cls.user, donation_center=cls.center,
+                appointment_date=datetime(2026, 11, day, 9, tzinfo=dt_timezone.utc),
+            )
+            for day in (1, 2)
+        ]
+        Donation.objects.create(
+            user=cls.user, donation_center=cls.center, scheduled_date=datetime(2026, 10, 1, 9, tzinfo=dt_timezone.utc),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, **headers):
+        return self.client.get(path, headers=headers)
+
+    def assertRevalidates(self, path, change):
+        first = self.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(path, if_none_match=first['ETag']).status_code, 304)
+        change()
+        second = self.get(path, if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        return second
+
+    def test_center_rename_changes_donation_and_appointment_etags(self):
+        def rename():
+            self.center.name = 'North Side'
+            self.center.save()
+
+        response = self.assertRevalidates('/api/appointments/', rename)
+        self.assertEqual(response.json()[0]['donation_center']['name'], 'North Side')
+        self.assertRevalidates(f'/api/appointments/{self.appointments[0].pk}/', rename)
+        self.assertRevalidates('/api/donations/', rename)
+
+    def test_collections_have_no_last_modified(self):
+        response = self.get('/api/appointments/')
+        self.assertNotIn('Last-Modified', response)
+        # A client that only sends If-Modified-Since still sees the delete
+        # of an older row
+        self.client.delete(f'/api/appointments/{self.appointments[0].pk}/')
+        response = self.get('/api/appointments/', if_modified_since=http_date(timezone.now().timestamp() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_detail_last_modified_includes_the_center(self):
+        path = f'/api/appointments/{self.appointments[0].pk}/'
+        later = timezone.now() + timedelta(hours=1)
+        DonationCenter.objects.filter(pk=self.center.pk).update(updated_at=later)
+        response = self.get(path)
+        self.assertEqual(response['Last-Modified'], http_date(int(later.timestamp())))
+        self.assertEqual(self.get(path, if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_emergency_request_leaving_the_list(self):
+        emergency = make_request()
+
+        def fulfil():
+            EmergencyRequest.objects.filter(pk=emergency.pk).update(status='fulfilled')
+
+        response = self.assertRevalidates('/api/emergency-requests/', fulfil)
+        self.assertEqual(response.json(), [])
+
+    def test_counters_are_buffered_in_process(self):
+        etag = self.get('/api/appointments/')['ETag']
+        with mock.patch.object(conditional, '_counters', metrics.BufferedCounters(interval=3600)), \
+                mock.patch.object(metrics, 'incr', wraps=metrics.incr) as incr:
+            before = conditional.conditional_stats()
+            incr.reset_mock()
+            for _ in range(3):
+                self.get('/api/appointments/', if_none_match=etag)
+            self.assertFalse(incr.called)
+            stats = conditional.conditional_stats()
+        self.assertEqual(stats['requests'] - before['requests'], 3)
+        self.assertEqual(stats['with_validators'] - before['with_validators'], 3)
+        self.assertEqual(stats['not_modified'] - before['not_modified'], 3)
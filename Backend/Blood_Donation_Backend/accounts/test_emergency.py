@@ -0,0 +1,184 @@
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import EmergencyRequest, EmergencyResponse, NotificationOutbox
+
+
+def make_request(units_needed=2, **kwargs):
+    return EmergencyRequest.objects.create(
+        hospital_name='City Hospital', blood_type_needed='O-', units_needed=units_needed,
+        contact_person='Dr Lee', contact_phone='555-0199', location='Springfield',
+        expires_at=kwargs.pop('expires_at', timezone.now() + timedelta(hours=6)), **kwargs,
+    )
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class ResponseCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donors = [User.objects.create_user(username=f'donor{i}', password='pass12345') for i in range(3)]
+
+    def setUp(self):
+        self.emergency = make_request(units_needed=2)
+
+    def respond(self, donor, status='interested'):
+        client = APIClient()
+        client.force_authenticate(donor)
+        response = client.post(
+            '/api/emergency-responses/', {'emergency_request_id': self.emergency.pk, 'status': status}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return EmergencyResponse.objects.get(pk=response.json()['id'])
+
+    def change(self, response, status):
+        client = APIClient()
+        client.force_authenticate(response.user)
+        result = client.patch(f'/api/emergency-responses/{response.pk}/', {'status': status}, format='json')
+        self.assertEqual(result.status_code, 200, result.content)
+
+    def assertCounters(self, status, responses, interested, confirmed):
+        self.emergency.refresh_from_db()
+        self.assertEqual(
+            (self.emergency.status, self.emergency.responses_count,
+             self.emergency.interested_count, self.emergency.confirmed_count),
+            (status, responses, interested, confirmed),
+        )
+
+    def test_create(self):
+        self.respond(self.donors[0])
+        self.assertCounters('active', 1, 1, 0)
+
+    def test_duplicate_response_rejected(self):
+        self.respond(self.donors[0])
+        client = APIClient()
+        client.force_authenticate(self.donors[0])
+        response = client.post(
+            '/api/emergency-responses/', {'emergency_request_id': self.emergency.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertCounters('active', 1, 1, 0)
+
+    def test_confirm_until_fulfilled(self):
+        first, second = self.respond(self.donors[0]), self.respond(self.donors[1])
+        self.change(first, 'confirmed')
+        self.assertCounters('active', 2, 1, 1)
+        self.change(second, 'confirmed')
+        self.assertCounters('fulfilled', 2, 0, 2)
+        # Completed donations still count as cover
+        self.change(second, 'completed')
+        self.assertCounters('fulfilled', 2, 0, 2)
+
+    def test_cancel_reopens_fulfilled_request(self):
+        first = self.respond(self.donors[0], 'confirmed')
+        second = self.respond(self.donors[1], 'confirmed')
+        self.assertCounters('fulfilled', 2, 0, 2)
+        self.change(first, 'cancelled')
+        self.assertCounters('active', 2, 0, 1)
+        self.change(second, 'cancelled')
+        self.assertCounters('active', 2, 0, 0)
+        self.change(first, 'confirmed')
+        self.change(second, 'confirmed')
+        self.assertCounters('fulfilled', 2, 0, 2)
+
+    def test_expired_request_is_not_reopened(self):
+        first = self.respond(self.donors[0], 'confirmed')
+        self.respond(self.donors[1], 'confirmed')
+        EmergencyRequest.objects.filter(pk=self.emergency.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertTrue(first.change_status('cancelled'))
+        self.assertCounters('fulfilled', 2, 0, 1)
+
+    def test_cancelled_request_stays_cancelled(self):
+        first = self.respond(self.donors[0], 'confirmed')
+        EmergencyRequest.objects.filter(pk=self.emergency.pk).update(status='cancelled')
+        first.change_status('cancelled')
+        self.assertCounters('cancelled', 1, 0, 0)
+
+    def test_interleaved_confirmations(self):
+        first, second = self.respond(self.donors[0]), self.respond(self.donors[1])
+        # Two requests that both loaded their response before either wrote
+        stale_first = EmergencyResponse.objects.get(pk=first.pk)
+        stale_second = EmergencyResponse.objects.get(pk=second.pk)
+        self.assertTrue(stale_first.change_status('confirmed'))
+        self.assertTrue(stale_second.change_status('confirmed'))
+        self.assertCounters('fulfilled', 2, 0, 2)
+        # A writer holding an outdated status loses the compare-and-set
+        outdated = EmergencyResponse.objects.get(pk=first.pk)
+        outdated.status = 'interested'
+        self.assertFalse(outdated.change_status('cancelled'))
+        self.assertCounters('fulfilled', 2, 0, 2)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class RaiseEmergencyRequestTests(TestCase):
+    payload = {
+        'hospital_name': 'City Hospital', 'blood_type_needed': 'O-', 'units_needed': 3, 'urgency': 'critical',
+        'contact_person': 'Dr Lee', 'contact_phone': '555-0199', 'location': 'Springfield',
+        'expires_at': '2099-01-01T00:00:00Z',
+    }
+
+    def post(self, user, **extra):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/emergency-requests/', {**self.payload, **extra}, format='json')
+
+    def test_donor_cannot_raise_a_request(self):
+        donor = User.objects.create_user(username='donor', password='pass12345')
+        self.assertEqual(self.post(donor).status_code, 403)
+        self.assertFalse(EmergencyRequest.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+        # Reading stays open to donors
+        client = APIClient()
+        client.force_authenticate(donor)
+        self.assertEqual(client.get('/api/emergency-requests/').status_code, 200)
+
+    def test_hospital_account_raises_an_active_request(self):
+        hospital = User.objects.create_user(username='hospital', password='pass12345')
+        hospital.user_permissions.add(Permission.objects.get(codename='add_emergencyrequest'))
+        response = self.post(hospital, status='fulfilled', confirmed_count=3)
+        self.assertEqual(response.status_code, 201, response.content)
+        emergency = EmergencyRequest.objects.get()
+        self.assertEqual((emergency.status, emergency.confirmed_count), ('active', 0))
+        self.assertEqual(NotificationOutbox.objects.get().emergency_request, emergency)
+
+    def test_staff_may_raise_a_request(self):
+        staff = User.objects.create_user(username='operator', password='pass12345', is_staff=True)
+        self.assertEqual(self.post(staff).status_code, 201)
+
+
+class ConcurrentConfirmationTests(TransactionTestCase):
+    def test_two_threads_confirm(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('shared-cache in-memory SQLite fails concurrent writers instead of serializing them')
+        emergency = make_request(units_needed=2)
+        responses = [
+            EmergencyResponse.objects.create(
+                emergency_request=emergency, user=User.objects.create_user(username=f'd{i}', password='x'),
+            )
+            for i in range(2)
+        ]
+        EmergencyRequest.apply_response_change(emergency.pk, new_status='interested')
+        EmergencyRequest.apply_response_change(emergency.pk, new_status='interested')
+        barrier = threading.Barrier(2)
+        results = []
+
+        def confirm(response):
+            barrier.wait()
+            try:
+                results.append(response.change_status('confirmed'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=confirm, args=(response,)) for response in responses]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True, True])
+        emergency.refresh_from_db()
+        self.assertEqual((emergency.status, emergency.interested_count, emergency.confirmed_count), ('fulfilled', 0, 2))
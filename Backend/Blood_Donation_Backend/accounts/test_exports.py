@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Donation, DonationCenter
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='auditor', password='pass12345')
+        cls.donor = User.objects.create_user(username='donor', password='pass12345')
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+        cls.other_center = DonationCenter.objects.create(name='South', address='2 Main St', phone_number='555-0101')
+        cls.donations = [
+            Donation.objects.create(
+                user=cls.donor, donation_center=center, status=status,
+                scheduled_date=datetime(2026, 3, day, 9, tzinfo=dt_timezone.utc),
+            )
+            for center, status, day in [
+                (cls.center, 'completed', 1), (cls.center, 'cancelled', 2), (cls.other_center, 'completed', 3),
+            ]
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, kind='donations', **params):
+        response = self.client.get(f'/api/exports/{kind}/', params)
+        return response, b''.join(response.streaming_content).decode() if response.streaming else None
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="donations-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(row['id']) for row in rows], [d.pk for d in self.donations])
+        self.assertEqual(rows[0]['user__username'], 'donor')
+        self.assertEqual(rows[0]['donation_center__name'], 'North')
+
+    def test_ndjson_with_filters(self):
+        response, body = self.export(output='ndjson', center=self.center.pk, status='completed')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.donations[0].pk])
+
+    def test_date_range_is_inclusive(self):
+        _, body = self.export(output='ndjson', start='2026-03-02', end='2026-03-03')
+        ids = [json.loads(line)['id'] for line in body.splitlines()]
+        self.assertEqual(ids, [self.donations[1].pk, self.donations[2].pk])
+
+    def test_bad_parameters(self):
+        for params in ({'output': 'xml'}, {'status': 'lost'}, {'start': 'March'}, {'center': 'x'}):
+            with self.subTest(params=params):
+                response, _ = self.export(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        response, _ = self.export(kind='medications')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.donor)
+        response, _ = self.export()
+        self.assertEqual(response.status_code, 403)
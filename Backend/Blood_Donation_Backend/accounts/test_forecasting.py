@@ -0,0 +1,137 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .forecasting import forecast_arrays, forecast_shortages, smoothed_level, weekday_profile
+from .models import Donation, DonationCenter, EmergencyRequest, ShortageForecast
+
+
+def reference_level(values, alpha):
+    level = values[0]
+    for value in values:
+        level = alpha * value + (1 - alpha) * level
+    return level
+
+
+class ForecastArrayTests(SimpleTestCase):
+    def test_smoothed_level_matches_the_recurrence(self):
+        rng = np.random.default_rng(7)
+        series = rng.poisson(3.0, size=(2, 3, 60)).astype(float)
+        for alpha in (0.05, 0.3, 1.0):
+            with self.subTest(alpha=alpha):
+                expected = np.array([[reference_level(s, alpha) for s in center] for center in series])
+                np.testing.assert_allclose(smoothed_level(series, alpha), expected)
+
+    def test_constant_series_keeps_its_level(self):
+        np.testing.assert_allclose(smoothed_level(np.full((1, 1, 30), 4.0), 0.1), [[4.0]])
+
+    def test_weekday_profile(self):
+        # Four weeks from a Monday: one unit on weekdays, two at weekends
+        week = [1, 1, 1, 1, 1, 2, 2]
+        series = np.array(week * 4, dtype=float).reshape(1, 1, 28)
+        np.testing.assert_allclose(weekday_profile(series, 0), [np.array(week) * 7 / 9])
+        # The same data starting on a Saturday gives the same factors by weekday
+        shifted = np.array((week[5:] + week[:5]) * 4, dtype=float).reshape(1, 1, 28)
+        np.testing.assert_allclose(weekday_profile(shifted, 5), [np.array(week) * 7 / 9])
+
+    def test_weekday_profile_without_history_is_flat(self):
+        np.testing.assert_allclose(weekday_profile(np.zeros((3, 2, 14)), 2), np.ones((2, 7)))
+
+    def test_flat_forecast(self):
+        supply = np.full((1, 2, 56), 2.0)
+        demand = np.stack([np.full((1, 56), 3.0), np.full((1, 56), 1.0)], axis=1)
+        expected_supply, expected_demand, shortage = forecast_arrays(supply, demand, 0, horizon=7)
+        np.testing.assert_allclose(expected_supply, [[14.0, 14.0]])
+        np.testing.assert_allclose(expected_demand, [[21.0, 7.0]])
+        # Surplus is not negative shortage
+        np.testing.assert_allclose(shortage, [[7.0, 0.0]])
+
+    def test_horizon_follows_the_weekday_profile(self):
+        week = np.array([1, 1, 1, 1, 1, 2, 2], dtype=float)
+        supply = np.tile(week, 4).reshape(1, 1, 28)
+        demand = np.zeros_like(supply)
+        # alpha=1: the level is the last day (a Sunday, 2 units); the next day
+        # is a Monday at 7/9 of the mean
+        expected_supply, _, _ = forecast_arrays(supply, demand, 0, horizon=1, alpha=1.0)
+        np.testing.assert_allclose(expected_supply, [[2 * 7 / 9]])
+        expected_supply, _, _ = forecast_arrays(supply, demand, 0, horizon=7, alpha=1.0)
+        np.testing.assert_allclose(expected_supply, [[2 * 7]])
+
+
+class ForecastShortagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = User.objects.create_user(username='donor', password='pass12345')
+        cls.north = DonationCenter.objects.create(
+            name='North', address='1 Main St', phone_number='555-0100',
+            latitude=Decimal('51.50000000'), longitude=Decimal('-0.10000000'),
+        )
+        cls.south = DonationCenter.objects.create(
+            name='South', address='2 Main St', phone_number='555-0101',
+            latitude=Decimal('50.80000000'), longitude=Decimal('-0.10000000'),
+        )
+
+    def days_ago(self, days):
+        return timezone.now() - timedelta(days=days)
+
+    def request(self, days_ago, units, latitude=None, longitude=None, **kwargs):
+        emergency = EmergencyRequest.objects.create(
+            hospital_name='City Hospital', blood_type_needed=kwargs.pop('blood_type', 'O-'), units_needed=units,
+            contact_person='Dr Lee', contact_phone='555-0199', location='Somewhere',
+            latitude=latitude, longitude=longitude, expires_at=timezone.now() + timedelta(hours=6), **kwargs,
+        )
+        EmergencyRequest.objects.filter(pk=emergency.pk).update(created_at=self.days_ago(days_ago))
+
+    def forecast(self, center, blood_type):
+        return ShortageForecast.objects.get(donation_center=center, blood_type=blood_type)
+
+    def test_demand_goes_to_the_nearest_center(self):
+        self.request(3, 4, Decimal('50.81'), Decimal('-0.11'), urgency='medium')
+        self.assertEqual(forecast_shortages(horizon=7, history_days=28), 2 * 8)
+        self.assertEqual(self.forecast(self.north, 'O-').expected_demand, 0)
+        south = self.forecast(self.south, 'O-')
+        self.assertGreater(south.expected_demand, 0)
+        self.assertEqual(south.shortage, south.expected_demand)
+
+    def test_unplaced_demand_follows_supply_share(self):
+        for days in range(1, 15):
+            Donation.objects.create(
+                user=self.donor, donation_center=self.north, status='completed', blood_type='A+',
+                units_collected=Decimal('1.00'), scheduled_date=self.days_ago(days),
+            )
+        self.request(2, 5, blood_type='A+', urgency='critical')
+        forecast_shortages(horizon=7, history_days=28)
+        north = self.forecast(self.north, 'A+')
+        self.assertGreater(north.expected_supply, 0)
+        self.assertGreater(north.expected_demand, 0)
+        self.assertEqual(self.forecast(self.south, 'A+').expected_demand, 0)
+
+    def test_urgency_weights_and_cancelled_requests(self):
+        self.request(3, 4, Decimal('51.5'), Decimal('-0.1'), urgency='medium')
+        forecast_shortages(horizon=7, history_days=28)
+        medium = self.forecast(self.north, 'O-').expected_demand
+
+        EmergencyRequest.objects.update(urgency='critical')
+        self.request(3, 4, Decimal('51.5'), Decimal('-0.1'), urgency='critical', status='cancelled')
+        forecast_shortages(horizon=7, history_days=28)
+        self.assertAlmostEqual(self.forecast(self.north, 'O-').expected_demand, medium * 1.5, places=1)
+
+    def test_rows_are_replaced(self):
+        forecast_shortages(horizon=7, history_days=28)
+        DonationCenter.objects.filter(pk=self.south.pk).update(is_active=False)
+        forecast_shortages(horizon=7, history_days=28)
+        self.assertEqual(set(ShortageForecast.objects.values_list('donation_center', flat=True)), {self.north.pk})
+
+    def test_history_must_cover_a_day(self):
+        with self.assertRaisesMessage(ValueError, 'history_days'):
+            forecast_shortages(history_days=0)
+        with self.assertRaisesMessage(CommandError, '--history'):
+            call_command('forecast_shortages', '--history', '0', stdout=StringIO())
+        self.assertFalse(ShortageForecast.objects.exists())
@@ -0,0 +1,132 @@
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import geocoding
+from .geocoding import Gazetteer, normalize
+from .models import DonationCenter, GeocodeCache, UserProfile
+
+GAZETTEER = """postal_code,place,latitude,longitude
+SW1A 1AA,,51.501009,-0.141588
+,Springfield,39.7817,-89.6501
+,New York City,40.7128,-74.0060
+10001,New York,40.7506,-73.9972
+10001,New York,40.7516,-73.9982
+"""
+
+
+def point(latitude, longitude):
+    return Decimal(latitude).quantize(geocoding.COORDINATE), Decimal(longitude).quantize(geocoding.COORDINATE)
+
+
+class GeocodingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'gazetteer.csv'
+        self.path.write_text(GAZETTEER)
+        self.use_gazetteer(self.path)
+
+    def use_gazetteer(self, path):
+        override = override_settings(GEOCODER_GAZETTEER=path)
+        override.enable()
+        self.addCleanup(override.disable)
+        # The gazetteer is read once per process; make the next lookup load ``path``
+        patcher = mock.patch.object(geocoding, '_gazetteer', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def save_profile(self, address):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.address = address
+        profile.save()
+        profile.refresh_from_db()
+        return profile.latitude, profile.longitude
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  10 Downing St.,  London,, SW1A-2AA '), '10 downing st, london, sw1a 2aa')
+        self.assertEqual(normalize(None), '')
+
+    def test_postal_code_wins_over_place(self):
+        self.assertEqual(self.save_profile('1 Main St, Springfield, SW1A 1AA'), point('51.501009', '-0.141588'))
+        self.assertEqual(GeocodeCache.objects.get().precision, 'postal')
+
+    def test_place_falls_back_to_the_longest_name(self):
+        self.assertEqual(self.save_profile('5 Elm Rd, Springfield'), point('39.7817', '-89.6501'))
+        self.assertEqual(self.save_profile('350 5th Ave, New York City'), point('40.7128', '-74.0060'))
+
+    def test_repeated_keys_resolve_to_their_mean(self):
+        self.assertEqual(self.save_profile('350 5th Ave, NY 10001'), point('40.7511', '-73.9977'))
+
+    def test_profile_address_change_replaces_or_clears_coordinates(self):
+        self.save_profile('Springfield')
+        self.assertEqual(self.save_profile('Atlantis'), (None, None))
+        self.assertEqual(GeocodeCache.objects.get(query='atlantis').precision, '')
+
+    def test_lookups_are_memoized(self):
+        with mock.patch.object(Gazetteer, 'lookup', autospec=True, side_effect=Gazetteer.lookup) as lookup:
+            self.save_profile('5 Elm Rd, Springfield')
+            # Same address after normalization: served from GeocodeCache
+            self.save_profile('5 ELM RD,  springfield')
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_replacing_the_file_invalidates_the_cache(self):
+        self.save_profile('Springfield')
+        self.path.write_text(GAZETTEER.replace('39.7817', '39.8000'))
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.use_gazetteer(self.path)
+        self.assertEqual(self.save_profile('springfield'), point('39.8', '-89.6501'))
+        self.assertEqual(GeocodeCache.objects.count(), 1)
+
+    def test_geonames_dump(self):
+        path = self.path.with_suffix('.txt')
+        path.write_text('US\t62701\tSpringfield\tIllinois\tIL\tSangamon\t167\t\t\t39.8\t-89.64\t4\n')
+        self.use_gazetteer(path)
+        self.assertEqual(self.save_profile('Capitol Ave, IL 62701'), point('39.8', '-89.64'))
+
+    def test_without_a_gazetteer_nothing_is_cached(self):
+        self.use_gazetteer(self.path.with_name('missing.csv'))
+        with self.assertLogs('accounts.geocoding', 'WARNING'):
+            self.assertEqual(self.save_profile('Springfield'), (None, None))
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    def test_centers_keep_coordinates_entered_by_hand(self):
+        placed = DonationCenter.objects.create(name='North', address='Springfield', phone_number='555-0100')
+        manual = DonationCenter.objects.create(
+            name='South', address='Springfield', phone_number='555-0101',
+            latitude=Decimal('1.00000000'), longitude=Decimal('2.00000000'),
+        )
+        placed.refresh_from_db()
+        manual.refresh_from_db()
+        self.assertEqual((placed.latitude, placed.longitude), point('39.7817', '-89.6501'))
+        self.assertEqual((manual.latitude, manual.longitude), (Decimal('1'), Decimal('2')))
+
+    def test_geocode_addresses_command(self):
+        UserProfile.objects.filter(user=self.user).update(
+            address='Springfield', updated_at=timezone.now() - timedelta(days=1),
+        )
+        before = UserProfile.objects.get(user=self.user).updated_at
+        out = StringIO()
+        call_command('geocode_addresses', '--batch-size', '1', stdout=out)
+        self.assertIn('Geocoded 1 profile(s)', out.getvalue())
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.latitude, profile.longitude), point('39.7817', '-89.6501'))
+        # Sync clients see the change
+        self.assertGreater(profile.updated_at, before)
+        out = StringIO()
+        call_command('geocode_addresses', stdout=out)
+        self.assertIn('Geocoded 0 profile(s)', out.getvalue())
@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import jobs
+from .models import Job
+
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task('tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def run_next(self, worker_id='w1'):
+        job = jobs.claim(worker_id)
+        self.assertIsNotNone(job)
+        jobs.run_job(job)
+        job.refresh_from_db()
+        return job
+
+    def make_ready(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def strand(self, job, worker_id='dead-worker'):
+        """Leave ``job`` claimed by a worker whose lock expired a minute ago."""
+        Job.objects.filter(pk=job.pk).update(
+            status='running', locked_by=worker_id, attempts=job.attempts + 1,
+            locked_at=timezone.now() - jobs.LOCK_TIMEOUT - timedelta(minutes=1),
+        )
+
+    def test_success(self):
+        jobs.enqueue('tests.record', 'a')
+        job = self.run_next()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('succeeded', 1, ''))
+        self.assertEqual(CALLS, ['a'])
+
+    def test_retry_with_exponential_backoff_then_fail(self):
+        job = jobs.enqueue('tests.explode', max_attempts=3)
+        for attempt, backoff in [(1, 10), (2, 20)]:
+            before = timezone.now()
+            job = self.run_next()
+            self.assertEqual((job.status, job.attempts, job.last_error), ('queued', attempt, 'boom'))
+            self.assertAlmostEqual((job.run_at - before).total_seconds(), backoff, delta=1)
+            # Not claimable until the backoff has passed
+            self.assertIsNone(jobs.claim('w1'))
+            self.make_ready(job)
+        job = self.run_next()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+    def test_backoff_is_capped(self):
+        job = jobs.enqueue('tests.explode', max_attempts=20)
+        Job.objects.filter(pk=job.pk).update(attempts=15)
+        before = timezone.now()
+        job = self.run_next()
+        self.assertAlmostEqual((job.run_at - before).total_seconds(), jobs.BACKOFF_MAX_SECONDS, delta=1)
+
+    def test_stale_claim_is_retried_with_backoff(self):
+        job = jobs.enqueue('tests.record', 'b')
+        self.strand(job)
+        Job.objects.create(name='tests.record', status='running', locked_by='live', locked_at=timezone.now())
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('queued', 1, ''))
+        self.assertIn('dead-worker', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(Job.objects.filter(status='running').count(), 1)
+
+    def test_stale_claim_at_max_attempts_fails(self):
+        job = jobs.enqueue('tests.record', 'c', max_attempts=2)
+        Job.objects.filter(pk=job.pk).update(attempts=1)
+        job.refresh_from_db()
+        self.strand(job)
+        jobs.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_periodic_job_goes_back_to_its_schedule(self):
+        jobs.schedule_periodic({'every-minute': {'task': 'tests.record', 'interval': 60, 'args': ['p']}})
+        job = Job.objects.get(periodic_key='every-minute')
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1)
+        job.refresh_from_db()
+        self.strand(job)
+        jobs.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+    def test_late_finish_by_the_lost_worker_is_ignored(self):
+        job = jobs.enqueue('tests.record', 'd')
+        self.strand(job)
+        lost = Job.objects.get(pk=job.pk)
+        jobs.requeue_stale()
+        jobs._finish(lost, status='succeeded', last_error='')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+    def test_work_loop_sweeps_stale_jobs(self):
+        job = jobs.enqueue('tests.record', 'e')
+        self.strand(job)
+        with mock.patch.object(jobs, 'BACKOFF_BASE_SECONDS', 0):
+            self.assertEqual(jobs.work('w1', burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('succeeded', 2))
+        self.assertEqual(CALLS, ['e'])
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import load_shedding
+from .load_shedding import build_limiter, get_limiter
+
+CONFIG = {
+    'concurrency': 2,
+    'retry_after': 5,
+    'exempt': [r'^/api/metrics/$'],
+    'classes': {
+        'emergency': {'paths': [r'^/api/emergency-(requests|responses)/'], 'queue': 4, 'timeout': 2.0, 'retry_after': 1},
+        'default': {'queue': 4, 'timeout': 2.0},
+        'bulk': {'paths': [r'^/api/(donations|exports)/'], 'share': 0.5, 'retry_after': 30},
+    },
+}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting')
+        time.sleep(0.001)
+
+
+class PriorityLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = build_limiter(CONFIG)
+        # Shared counters are flushed to the cache; keep them out of these tests
+        patcher = mock.patch.object(load_shedding.metrics, 'incr')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stats(self, name):
+        return self.limiter.stats()['classes'][name]
+
+    def test_classify(self):
+        self.assertEqual(self.limiter.classify('/api/emergency-requests/'), 'emergency')
+        self.assertEqual(self.limiter.classify('/api/donations/'), 'bulk')
+        self.assertEqual(self.limiter.classify('/api/profile/'), 'default')
+
+    def test_share_keeps_slots_for_higher_classes(self):
+        self.assertTrue(self.limiter.acquire('bulk'))
+        # Bulk may hold half of the two slots; without a queue it is shed at once
+        self.assertFalse(self.limiter.acquire('bulk'))
+        self.assertTrue(self.limiter.acquire('emergency'))
+        self.assertEqual(self.stats('bulk')['admitted'], 1)
+        self.assertEqual(self.stats('bulk')['shed'], 1)
+        self.limiter.release('bulk')
+        self.assertTrue(self.limiter.acquire('bulk'))
+
+    def test_freed_slot_goes_to_the_highest_waiting_class(self):
+        self.limiter.acquire('default')
+        self.limiter.acquire('default')
+        admitted = []
+
+        def wait(name):
+            if self.limiter.acquire(name):
+                admitted.append(name)
+
+        threads = [threading.Thread(target=wait, args=(name,)) for name in ('default', 'emergency')]
+        threads[0].start()
+        wait_for(lambda: self.stats('default')['queue_depth'] == 1)
+        threads[1].start()
+        wait_for(lambda: self.stats('emergency')['queue_depth'] == 1)
+
+        self.limiter.release('default')
+        threads[1].join(1)
+        self.assertEqual(admitted, ['emergency'])
+        self.limiter.release('default')
+        threads[0].join(1)
+        self.assertEqual(admitted, ['emergency', 'default'])
+
+    def test_wait_times_out(self):
+        limiter = build_limiter({**CONFIG, 'classes': {'default': {'queue': 1, 'timeout': 0.01}}})
+        self.assertTrue(limiter.acquire('default'))
+        self.assertTrue(limiter.acquire('default'))
+        self.assertFalse(limiter.acquire('default'))
+        stats = limiter.stats()['classes']['default']
+        self.assertEqual((stats['timed_out'], stats['queue_depth']), (1, 0))
+
+    def test_async_wait_leaves_the_event_loop_running(self):
+        self.limiter.acquire('default')
+        self.limiter.acquire('default')
+
+        async def scenario():
+            waiting = asyncio.create_task(self.limiter.aacquire('emergency'))
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.stats('emergency')['queue_depth'], 1)
+            # Runs while the request above waits; a blocking wait would time out first
+            self.limiter.release('default')
+            return await waiting
+
+        started = time.monotonic()
+        self.assertTrue(asyncio.run(scenario()))
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(self.limiter.stats()['running'], 2)
+
+    def test_async_waiter_woken_from_another_thread(self):
+        self.limiter.acquire('default')
+        self.limiter.acquire('default')
+
+        async def scenario():
+            waiting = asyncio.create_task(self.limiter.aacquire('default'))
+            await asyncio.sleep(0.01)
+            await asyncio.to_thread(self.limiter.release, 'default')
+            return await waiting
+
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_async_wait_times_out_or_is_cancelled(self):
+        limiter = build_limiter({**CONFIG, 'classes': {'default': {'queue': 2, 'timeout': 0.01}}})
+        limiter.acquire('default')
+        limiter.acquire('default')
+        self.assertFalse(asyncio.run(limiter.aacquire('default')))
+
+        async def cancelled():
+            waiting = asyncio.create_task(limiter.aacquire('default'))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+
+        asyncio.run(cancelled())
+        stats = limiter.stats()
+        self.assertEqual((stats['running'], stats['classes']['default']['queue_depth']), (2, 0))
+
+
+@override_settings(THROTTLE_BUCKETS={}, LOAD_SHEDDING=CONFIG)
+class LoadSheddingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+
+    def setUp(self):
+        # A limiter of this test's own, built from CONFIG
+        patcher = mock.patch.object(load_shedding, '_limiter', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = get_limiter()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_shed_request_gets_503_and_retry_after(self):
+        self.limiter.acquire('bulk')
+        response = self.client.get('/api/donations/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(response.json(), {'error': 'Server is busy, please retry later.'})
+
+        self.limiter.release('bulk')
+        self.assertEqual(self.client.get('/api/donations/').status_code, 200)
+        self.assertEqual(self.limiter.stats()['running'], 0)
+
+    def test_emergency_traffic_keeps_its_slot(self):
+        self.limiter.acquire('bulk')
+        self.assertEqual(self.client.get('/api/donations/').status_code, 503)
+        self.assertEqual(self.client.get('/api/emergency-requests/').status_code, 200)
+
+    def test_exempt_paths_skip_the_limiter(self):
+        self.limiter.acquire('emergency')
+        self.limiter.acquire('emergency')
+        self.assertNotEqual(self.client.get('/api/metrics/').status_code, 503)
+
+    async def test_async_stack(self):
+        client = AsyncClient()
+        self.limiter.acquire('bulk')
+        # Under ASGI the middleware must never take the blocking path
+        with mock.patch.object(self.limiter, 'acquire', side_effect=AssertionError('blocking acquire')):
+            response = await client.get('/api/donations/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '30')
+            # Admitted: reaches the view, which wants a login, and gives the slot back
+            response = await client.get('/api/emergency-requests/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.limiter.stats()['running'], 1)
+
+    def test_disabled(self):
+        with self.settings(LOAD_SHEDDING={'concurrency': 0}):
+            self.assertIsNone(get_limiter())
@@ -0,0 +1,77 @@
+import json
+import logging
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .log import REDACTED, JsonFormatter, RedactPHIFilter, redact
+
+
+class CaptureHandler(logging.Handler):
+    """The redaction and formatting of the configured 'queue' handler, written to a list."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.addFilter(RedactPHIFilter())
+        self.setFormatter(JsonFormatter())
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class RedactionTests(TestCase):
+    def setUp(self):
+        self.handler = CaptureHandler()
+        logger = logging.getLogger('accounts')
+        logger.addHandler(self.handler)
+        self.addCleanup(logger.removeHandler, self.handler)
+
+    def assertRedacted(self, message, payload, secrets):
+        output = '\n'.join(self.handler.lines)
+        self.assertIn(message, [json.loads(line)['message'] for line in self.handler.lines])
+        for secret in secrets:
+            self.assertNotIn(secret, output)
+        for record in map(json.loads, self.handler.lines):
+            for key in payload:
+                if 'data' in record and key in record['data']:
+                    self.assertEqual(record['data'][key], REDACTED)
+
+    def test_register_payload(self):
+        payload = {
+            'username': 'bobdonor', 'email': 'bob@example.org', 'first_name': 'Roberta',
+            'last_name': 'Quimby', 'password': 'Xk7!long-pass', 'password2': 'Xk7!long-pass',
+        }
+        response = APIClient().post('/api/register/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertRedacted('Registration data received', payload, ['bobdonor', 'bob@example.org', 'Roberta', 'Quimby', 'Xk7!long-pass'])
+
+    def test_profile_payload(self):
+        user = User.objects.create_user(username='carol', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            'blood_type': 'AB-', 'phone_number': '555-867-5309', 'address': '42 Hidden Lane',
+            'date_of_birth': '1980-02-29', 'emergency_contact_name': 'Dmitri Voss',
+            'emergency_contact_phone': '555-111-2222',
+        }
+        response = client.patch('/api/profile/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertRedacted('Profile update received', payload, ['AB-', '555-867-5309', '42 Hidden Lane', '1980-02-29', 'Dmitri Voss'])
+
+    def test_nested_medical_fields(self):
+        data = redact({
+            'allergies': [{'allergy_name': 'penicillin', 'severity': 'severe'}],
+            'record': {'frequency': 'daily', 'start_date': '2026-01-01', 'is_chronic': True},
+            'location': 'Ward 3', 'latitude': 51.5, 'contact_person': 'Dr Who', 'user_id': 7,
+        })
+        self.assertEqual(data['allergies'], REDACTED)
+        self.assertEqual(
+            data['record'], {'frequency': REDACTED, 'start_date': REDACTED, 'is_chronic': REDACTED}
+        )
+        self.assertEqual(data['location'], REDACTED)
+        self.assertEqual(data['latitude'], REDACTED)
+        self.assertEqual(data['contact_person'], REDACTED)
+        self.assertEqual(data['user_id'], 7)
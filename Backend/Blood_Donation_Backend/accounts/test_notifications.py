@@ -0,0 +1,104 @@
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import DonorNotification, NotificationOutbox, UserProfile
+from .notifications import CLAIM_LEASE, LocmemBackend, process_outbox
+from .test_emergency import make_request
+
+
+class RecordingBackend(LocmemBackend):
+    """Records each batch; ``on_send(batch_number)`` runs before a batch is delivered."""
+
+    def __init__(self, on_send=None):
+        self.batches = []
+        self.on_send = on_send
+
+    def send_messages(self, messages):
+        if self.on_send:
+            self.on_send(len(self.batches) + 1)
+        self.batches.append([message['user_id'] for message in messages])
+        return len(messages)
+
+
+class OutboxLeaseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.donors = [User.objects.create_user(username=f'donor{i}', password='x') for i in range(4)]
+        UserProfile.objects.filter(user__in=cls.donors).update(blood_type='O-')
+
+    def setUp(self):
+        self.event = NotificationOutbox.objects.create(event='emergency_created', emergency_request=make_request())
+
+    def claim(self):
+        self.event.refresh_from_db()
+        return self.event.claimed_by, self.event.claimed_at
+
+    def test_claim_is_renewed_before_every_batch(self):
+        seen = []
+        backend = RecordingBackend(on_send=lambda batch: seen.append(self.claim()))
+        stats = process_outbox(worker_id='w1', batch_size=1, backend=backend)
+        self.assertEqual((stats['events'], stats['sent'], stats['lost']), (1, 4, 0))
+        self.assertEqual({worker for worker, _ in seen}, {'w1'})
+        claimed_at = [at for _, at in seen]
+        self.assertEqual(claimed_at, sorted(set(claimed_at)))
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.recipients_count), ('done', 4))
+
+    def test_worker_stops_when_its_lease_is_taken_over(self):
+        def reclaim(batch):
+            if batch == 2:
+                NotificationOutbox.objects.filter(pk=self.event.pk).update(
+                    claimed_by='w2', claimed_at=timezone.now(),
+                )
+
+        backend = RecordingBackend(on_send=reclaim)
+        stats = process_outbox(worker_id='w1', batch_size=1, backend=backend)
+        # The second batch was already past the check; the third is never sent
+        self.assertEqual(len(backend.batches), 2)
+        self.assertEqual(stats['lost'], 1)
+        self.assertEqual(self.claim()[0], 'w2')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.status, 'processing')
+
+    def test_reclaimed_row_resumes_without_renotifying(self):
+        def crash(batch):
+            if batch == 3:
+                raise ConnectionError('gateway down')
+
+        first = RecordingBackend(on_send=crash)
+        stats = process_outbox(worker_id='w1', batch_size=1, backend=first)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(DonorNotification.objects.filter(sent_at__isnull=False).count(), 2)
+
+        # Not claimable while the failed worker's lease runs
+        self.assertEqual(process_outbox(worker_id='w2', batch_size=1, backend=RecordingBackend())['events'], 0)
+
+        NotificationOutbox.objects.filter(pk=self.event.pk).update(
+            claimed_at=timezone.now() - CLAIM_LEASE - timedelta(seconds=1),
+        )
+        second = RecordingBackend()
+        stats = process_outbox(worker_id='w2', batch_size=1, backend=second)
+        self.assertEqual((stats['events'], stats['sent']), (1, 2))
+        delivered = Counter(user_id for backend in (first, second) for batch in backend.batches for user_id in batch)
+        self.assertEqual(delivered, Counter({donor.pk: 1 for donor in self.donors}))
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.attempts, self.event.claimed_by), ('done', 2, 'w2'))
+
+
+class ProcessNotificationsCommandTests(TestCase):
+    def test_lost_leases_are_reported(self):
+        stats = {'events': 0, 'sent': 3, 'failed': 0, 'lost': 1, 'seconds': 0.5, 'per_second': 6.0}
+        out = StringIO()
+        with mock.patch('accounts.management.commands.process_notifications.process_outbox', return_value=stats):
+            call_command('process_notifications', '--once', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('1 lost to another worker', lines[0])
+        self.assertIn('0 failed, 1 lost to another worker', lines[1])
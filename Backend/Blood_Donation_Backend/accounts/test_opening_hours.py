@@ -0,0 +1,137 @@
+from importlib import import_module
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import CenterOpeningHours, DonationCenter
+from .opening_hours import DAY_MINUTES, WEEK_MINUTES, parse_operating_hours
+
+MON, TUE, WED, THU, FRI, SAT, SUN = range(7)
+
+
+def hm(text):
+    hour, minute = text.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def spans(days, start, end):
+    """The week intervals for ``start``-``end`` ('HH:MM', end may pass 24:00) on each of ``days``."""
+    return [(day * DAY_MINUTES + hm(start), day * DAY_MINUTES + hm(end)) for day in days]
+
+
+WEEKDAYS = [MON, TUE, WED, THU, FRI]
+EVERY_DAY = list(range(7))
+
+# (text, expected intervals)
+CASES = [
+    ('Mon-Fri: 8AM-6PM, Sat: 9AM-3PM', spans(WEEKDAYS, '08:00', '18:00') + spans([SAT], '09:00', '15:00')),
+    ('Daily 07:00-20:00', spans(EVERY_DAY, '07:00', '20:00')),
+    ('Weekdays 9-5', spans(WEEKDAYS, '09:00', '17:00')),
+    ('Mon-Fri 12-4', spans(WEEKDAYS, '12:00', '16:00')),
+    ('Sat 12-12', spans([SAT], '12:00', '24:00')),
+    ('Tue 10-2', spans([TUE], '10:00', '14:00')),
+    ('Mon 8-12', spans([MON], '08:00', '12:00')),
+    ('Wed 22:00-06:00', spans([WED], '22:00', '30:00')),
+    ('Thu noon to midnight', spans([THU], '12:00', '24:00')),
+    ('Fri 8.30 a.m. - 1 p.m. and 2pm-5:45pm', spans([FRI], '08:30', '13:00') + spans([FRI], '14:00', '17:45')),
+    ('Mon, Wed & Fri: 9am-1pm', spans([MON, WED, FRI], '09:00', '13:00')),
+    ('Fri-Mon 10am-4pm', spans([MON, FRI, SAT, SUN], '10:00', '16:00')),
+    ('Sat-Sun: 10pm-2am', [(0, hm('02:00'))] + spans([SAT], '22:00', '26:00') + [(SUN * DAY_MINUTES + hm('22:00'), WEEK_MINUTES)]),
+    ('Mon-Sat 9-5, Sun closed', spans(WEEKDAYS + [SAT], '09:00', '17:00')),
+    ('Weekends 24 hours', [(SAT * DAY_MINUTES, WEEK_MINUTES)]),
+    ('Open 24/7', [(0, WEEK_MINUTES)]),
+    ('Open 24 hours', [(0, WEEK_MINUTES)]),
+    ('8am-6pm', spans(EVERY_DAY, '08:00', '18:00')),
+    ('Mon 9-5 and Mon 4pm-8pm', spans([MON], '09:00', '20:00')),
+    ('Mon-Fri 9-12, 1-5', spans(WEEKDAYS, '09:00', '12:00') + spans(WEEKDAYS, '13:00', '17:00')),
+    ('Sat 8am-12pm, 1-3', spans([SAT], '08:00', '12:00') + spans([SAT], '13:00', '15:00')),
+    ('Sun 10-11:30, 1-4pm', spans([SUN], '10:00', '11:30') + spans([SUN], '13:00', '16:00')),
+    ('Mon 25:00-26:00', []),
+    ('By appointment, call 555-0100', []),
+    ('Closed for renovation', []),
+    ('', []),
+]
+
+
+def merged(intervals):
+    result = []
+    for start, end in sorted(intervals):
+        if result and start <= result[-1][1]:
+            result[-1] = (result[-1][0], max(result[-1][1], end))
+        else:
+            result.append((start, end))
+    return result
+
+
+class ParseOperatingHoursTests(SimpleTestCase):
+    def test_cases(self):
+        for text, expected in CASES:
+            with self.subTest(text=text):
+                self.assertEqual(parse_operating_hours(text), merged(expected))
+
+    def test_none(self):
+        self.assertEqual(parse_operating_hours(None), [])
+
+    def test_migration_parser_is_a_frozen_copy(self):
+        # 0014 must not follow later changes to the live parser
+        migration = import_module('accounts.migrations.0014_center_opening_hours')
+        self.assertEqual(migration.parse_operating_hours.__module__, migration.__name__)
+        self.assertEqual(migration.parse_operating_hours('Mon 9-5'), spans([MON], '09:00', '17:00'))
+        self.assertEqual(
+            migration.parse_operating_hours('Mon 9-12, 1-5'),
+            spans([MON], '09:00', '12:00') + spans([MON], '13:00', '17:00'),
+        )
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class OpenAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+        cls.day = DonationCenter.objects.create(
+            name='Day', address='1 Main St', phone_number='555-0100', operating_hours='Mon-Fri 12-4',
+        )
+        cls.night = DonationCenter.objects.create(
+            name='Night', address='2 Main St', phone_number='555-0101', operating_hours='Sat-Sun: 10pm-2am',
+        )
+        DonationCenter.objects.create(name='Always', address='3 Main St', phone_number='555-0102', operating_hours='Open 24 hours')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def open_at(self, moment):
+        response = self.client.get('/api/donation-centers/', {'open_at': moment})
+        self.assertEqual(response.status_code, 200)
+        return [center['name'] for center in response.json()]
+
+    def test_open_at(self):
+        # 2026-01-05 is a Monday
+        self.assertEqual(self.open_at('2026-01-05T13:00:00Z'), ['Always', 'Day'])
+        self.assertEqual(self.open_at('2026-01-05T01:00:00Z'), ['Always', 'Night'])
+        self.assertEqual(self.open_at('2026-01-10T23:30:00Z'), ['Always', 'Night'])
+        self.assertEqual(self.open_at('2026-01-05T16:00:00Z'), ['Always'])
+
+    def test_bad_open_at(self):
+        response = self.client.get('/api/donation-centers/', {'open_at': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_saving_a_center_reindexes_it(self):
+        self.day.operating_hours = 'Sun 9-5'
+        self.day.save()
+        self.assertEqual(
+            list(self.day.opening_hours.values_list('start_minute', 'end_minute')),
+            [(SUN * DAY_MINUTES + hm('09:00'), SUN * DAY_MINUTES + hm('17:00'))],
+        )
+
+    def test_index_opening_hours_command(self):
+        CenterOpeningHours.objects.all().delete()
+        DonationCenter.objects.filter(pk=self.night.pk).update(operating_hours='whenever')
+        out = StringIO()
+        call_command('index_opening_hours', stdout=out)
+        self.assertIn("could not parse 'whenever'", out.getvalue())
+        self.assertIn('for 3 center(s)', out.getvalue())
+        self.assertEqual(self.open_at('2026-01-05T13:00:00Z'), ['Always', 'Day'])
@@ -0,0 +1,76 @@
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import profile_cache
+from .models import MedicalAllergy, UserProfile
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class ProfileCacheInvalidationTests(TransactionTestCase):
+    """Versions move in on_commit hooks, so these run with real transactions."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # The configured backend and options, in a private directory
+        caches = {'default': {**settings.CACHES['default'], 'LOCATION': tmp.name}}
+        override = override_settings(CACHES=caches)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username='donor', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_profile(self, **headers):
+        return self.client.get('/api/profile/', headers=headers)
+
+    def test_backend_options(self):
+        self.assertEqual(cache._max_entries, settings.CACHES['default']['OPTIONS']['MAX_ENTRIES'])
+        self.assertEqual(cache._cull_frequency, settings.CACHES['default']['OPTIONS']['CULL_FREQUENCY'])
+
+    def test_payload_is_cached_until_the_version_moves(self):
+        self.assertEqual(self.get_profile().json()['phone_number'], '')
+        version, payload = profile_cache.get_cached(self.user.pk)
+        self.assertIsNotNone(payload)
+
+        # A write that bypasses the API still invalidates on commit
+        UserProfile.objects.filter(user=self.user).update(phone_number='555-0100')
+        self.assertEqual(self.get_profile().json()['phone_number'], '')
+        UserProfile.objects.get(user=self.user).save()
+        self.assertNotEqual(profile_cache.get_version(self.user.pk), version)
+        self.assertEqual(self.get_profile().json()['phone_number'], '555-0100')
+
+    def test_medical_records_invalidate(self):
+        first = self.get_profile()
+        MedicalAllergy.objects.create(user=self.user, allergy_name='latex')
+        second = self.get_profile(if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([a['allergy_name'] for a in second.json()['allergies']], ['latex'])
+        self.assertEqual(self.get_profile(if_none_match=second['ETag']).status_code, 304)
+
+    def test_api_update_invalidates(self):
+        self.get_profile()
+        response = self.client.patch('/api/profile/', {'blood_type': 'B+'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_profile().json()['blood_type'], 'B+')
+
+    def test_rolled_back_write_keeps_the_version(self):
+        self.get_profile()
+        version = profile_cache.get_version(self.user.pk)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            MedicalAllergy.objects.create(user=self.user, allergy_name='latex')
+            raise RuntimeError
+        self.assertEqual(profile_cache.get_version(self.user.pk), version)
+
+    def test_evicted_version_key_never_serves_old_data(self):
+        self.get_profile()
+        UserProfile.objects.filter(user=self.user).update(phone_number='555-0100')
+        cache.delete(f'profile:version:{self.user.pk}')
+        self.assertEqual(self.get_profile().json()['phone_number'], '555-0100')
@@ -0,0 +1,107 @@
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .profiling import TOKEN_MAX_AGE, ProfileStore, check_token, make_token
+
+
+@override_settings(
+    THROTTLE_BUCKETS={}, PROFILING_SAMPLE_RATE=0.0, PROFILING_MAX_FILES=200,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(PROFILING_DIR=Path(tmp.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+
+    def login(self, token=None, username='zz-secret-user'):
+        headers = {'X-Profile': token} if token else {}
+        return self.client.post(
+            '/api/login/', {'username': username, 'password': 'wrong-pass'}, format='json', headers=headers,
+        )
+
+    def test_valid_token_stores_profile_and_sql(self):
+        response = self.login(make_token('ci'))
+        self.assertEqual(response.status_code, 401)
+        profile_id = response['X-Profile-Id']
+        meta, stats_path = ProfileStore().load(profile_id)
+        self.assertTrue(stats_path.exists())
+        self.assertEqual(
+            (meta['method'], meta['path'], meta['status'], meta['sampled']), ('POST', '/api/login/', 401, False),
+        )
+        user_lookup = [q for q in meta['queries'] if 'auth_user' in q['sql']]
+        self.assertTrue(user_lookup)
+        self.assertEqual(user_lookup[0]['alias'], 'default')
+        self.assertAlmostEqual(meta['sql_ms'], sum(q['ms'] for q in meta['queries']), delta=0.2)
+        # Statement text only: the looked-up username is a parameter
+        self.assertNotIn('zz-secret-user', stats_path.with_suffix('.json').read_text())
+
+    async def test_async_stack(self):
+        client = AsyncClient()
+        response = await client.post(
+            '/api/login/', {'username': 'zz-secret-user', 'password': 'wrong-pass'},
+            content_type='application/json', headers={'X-Profile': make_token()},
+        )
+        self.assertEqual(response.status_code, 401)
+        meta, _ = ProfileStore().load(response['X-Profile-Id'])
+        # The view's queries ran where the recorder could see them
+        self.assertTrue([q for q in meta['queries'] if 'auth_user' in q['sql']])
+        self.assertNotIn('X-Profile-Id', await client.get('/api/metrics/'))
+
+    def test_bad_tokens_are_ignored(self):
+        token = make_token()
+        for bad in ('garbage', token[:-1] + ('A' if token[-1] != 'A' else 'B')):
+            with self.subTest(token=bad):
+                self.assertFalse(check_token(bad))
+                self.assertNotIn('X-Profile-Id', self.login(bad))
+        self.assertEqual(ProfileStore().list(), [])
+
+    def test_expired_token(self):
+        token = make_token()
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + TOKEN_MAX_AGE + 1):
+            self.assertFalse(check_token(token))
+            self.assertNotIn('X-Profile-Id', self.login(token))
+
+    def test_sampling(self):
+        self.assertNotIn('X-Profile-Id', self.login())
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            response = self.login()
+        meta, _ = ProfileStore().load(response['X-Profile-Id'])
+        self.assertTrue(meta['sampled'])
+
+    def test_rotation_keeps_the_newest(self):
+        with self.settings(PROFILING_MAX_FILES=2):
+            ids = []
+            for _ in range(3):
+                ids.append(self.login(make_token())['X-Profile-Id'])
+                time.sleep(0.002)  # ids order by millisecond
+            self.assertEqual([p['id'] for p in ProfileStore().list()], ids[:0:-1])
+            self.assertEqual(len(list(ProfileStore().path.glob('*.prof'))), 2)
+
+    def test_profiles_command(self):
+        profile_id = self.login(make_token())['X-Profile-Id']
+        out = StringIO()
+        call_command('profiles', 'list', stdout=out)
+        self.assertIn(profile_id, out.getvalue())
+        out = StringIO()
+        call_command('profiles', 'show', profile_id, '--queries', '3', stdout=out)
+        self.assertIn('POST /api/login/ -> 401', out.getvalue())
+        self.assertIn('Slowest SQL', out.getvalue())
+        out = StringIO()
+        call_command('profiles', 'token', stdout=out, stderr=StringIO())
+        self.assertTrue(check_token(out.getvalue().strip()))
@@ -0,0 +1,130 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from . import rollups
+from .archive import archive_batch
+from .models import Donation, DonationCenter, DonationRollup
+from .rollups import refresh, watermark_position
+
+
+def monday(day):
+    return day - timedelta(days=day.weekday())
+
+
+class RollupRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+
+    def donate(self, day, units='0.50', status='completed', blood_type='O+'):
+        donation = Donation.objects.create(
+            user=self.user, donation_center=self.center, status=status, blood_type=blood_type,
+            units_collected=Decimal(units), scheduled_date=datetime(day.year, day.month, day.day, 9, tzinfo=dt_timezone.utc),
+        )
+        # Settled before the commit-lag horizon of the next refresh
+        Donation.objects.filter(pk=donation.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        return donation
+
+    def rollup(self, grain, start):
+        return {
+            (row.blood_type, row.donations, row.units)
+            for row in DonationRollup.objects.filter(grain=grain, period_start=start)
+        }
+
+    def later(self, minutes=2):
+        """Run the next refresh as if ``minutes`` had passed (``timezone.now`` is patched everywhere)."""
+        return mock.patch('accounts.rollups.timezone.now', return_value=timezone.now() + timedelta(minutes=minutes))
+
+    def test_period_totals(self):
+        self.donate(date(2026, 3, 3), '0.50')
+        self.donate(date(2026, 3, 4), '0.45')
+        self.donate(date(2026, 3, 4), '0.50', blood_type='A-')
+        self.donate(date(2026, 3, 4), status='cancelled')
+        self.donate(date(2026, 3, 12), '0.40')
+        stats = refresh('donations')
+        self.assertEqual(stats, {'periods': 3, 'rows': 5})
+        self.assertEqual(
+            self.rollup('week', monday(date(2026, 3, 3))),
+            {('O+', 2, Decimal('0.95')), ('A-', 1, Decimal('0.50'))},
+        )
+        self.assertEqual(self.rollup('week', monday(date(2026, 3, 12))), {('O+', 1, Decimal('0.40'))})
+        self.assertEqual(
+            self.rollup('month', date(2026, 3, 1)),
+            {('O+', 3, Decimal('1.35')), ('A-', 1, Decimal('0.50'))},
+        )
+
+    def test_watermark_limits_the_next_run_to_changed_periods(self):
+        self.donate(date(2026, 3, 3))
+        first = self.donate(date(2026, 5, 5))
+        refresh('donations')
+        position = watermark_position('donations')
+        self.assertIsNotNone(position)
+
+        start = timezone.now()
+        with mock.patch.object(rollups, 'recompute_period', wraps=rollups.recompute_period) as recompute:
+            with self.later(2):
+                self.assertEqual(refresh('donations'), {'periods': 0, 'rows': 0})
+            recompute.assert_not_called()
+
+            Donation.objects.filter(pk=first.pk).update(
+                units_collected=Decimal('0.30'), updated_at=start + timedelta(minutes=3),
+            )
+            with self.later(5):
+                refresh('donations')
+        recomputed = {(call.args[1], call.args[2]) for call in recompute.call_args_list}
+        self.assertEqual(recomputed, {('week', monday(date(2026, 5, 5))), ('month', date(2026, 5, 1))})
+        self.assertEqual(self.rollup('week', monday(date(2026, 5, 5))), {('O+', 1, Decimal('0.30'))})
+        self.assertGreater(watermark_position('donations'), position)
+
+    def test_rows_inside_the_commit_lag_wait_for_the_next_run(self):
+        donation = self.donate(date(2026, 3, 3))
+        Donation.objects.filter(pk=donation.pk).update(updated_at=timezone.now())
+        refresh('donations')
+        self.assertFalse(DonationRollup.objects.exists())
+        with self.later():
+            refresh('donations')
+        self.assertEqual(self.rollup('week', monday(date(2026, 3, 3))), {('O+', 1, Decimal('0.50'))})
+
+    def test_failed_run_keeps_finished_periods_and_the_old_watermark(self):
+        self.donate(date(2026, 3, 3))
+        self.donate(date(2026, 5, 5))
+        calls = []
+
+        def fail_second(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('disk full')
+            return original(*args)
+
+        original = rollups.recompute_period
+        with mock.patch.object(rollups, 'recompute_period', side_effect=fail_second), self.assertRaises(RuntimeError):
+            refresh('donations')
+        # The first period was committed on its own
+        self.assertEqual(self.rollup('week', monday(date(2026, 3, 3))), {('O+', 1, Decimal('0.50'))})
+        self.assertIsNone(watermark_position('donations'))
+        refresh('donations')
+        self.assertEqual(self.rollup('week', monday(date(2026, 5, 5))), {('O+', 1, Decimal('0.50'))})
+
+    def test_rebuild_drops_emptied_periods_and_keeps_archived_rows(self):
+        old = self.donate(date(2024, 1, 9))
+        deleted = self.donate(date(2026, 3, 3))
+        self.donate(date(2026, 5, 5))
+        refresh('donations')
+        self.assertEqual(archive_batch('donations', now=timezone.now()), 1)
+        deleted.delete()
+
+        # An incremental run cannot see the delete; a rebuild does
+        with self.later():
+            refresh('donations')
+            self.assertTrue(self.rollup('week', monday(date(2026, 3, 3))))
+            refresh('donations', rebuild=True)
+        self.assertEqual(self.rollup('week', monday(date(2026, 3, 3))), set())
+        self.assertEqual(self.rollup('month', date(2026, 3, 1)), set())
+        self.assertEqual(self.rollup('week', monday(old.scheduled_date.date())), {('O+', 1, Decimal('0.50'))})
+        self.assertEqual(self.rollup('week', monday(date(2026, 5, 5))), {('O+', 1, Decimal('0.50'))})
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import DonationCenter, EmergencyRequest
+from .search import build_match_query, search_centers, search_emergency_requests
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = DonationCenter.objects.create(
+            name='Riverside Blood Bank', address='12 Mill Road, Springfield', phone_number='555-0100',
+        )
+        cls.request = EmergencyRequest.objects.create(
+            hospital_name='St Mary Hospital', blood_type_needed='O-', units_needed=3,
+            contact_person='Dr Lee', contact_phone='555-0199', location='Springfield',
+            expires_at=timezone.now() + timedelta(hours=6),
+        )
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 triggers are SQLite specific')
+
+    def test_match_query_quotes_prefix_terms(self):
+        self.assertEqual(build_match_query('river "bank'), '"river"* "bank"*')
+        self.assertEqual(build_match_query('  '), '')
+
+    def test_prefix_match(self):
+        self.assertEqual(search_centers('river'), [self.center])
+        self.assertEqual(search_centers('mill spring'), [self.center])
+        self.assertEqual(search_centers('river harbour'), [])
+
+    def test_update_reindexes(self):
+        self.center.name = 'Harbour Donor Centre'
+        self.center.save()
+        self.assertEqual(search_centers('harbour'), [self.center])
+        self.assertEqual(search_centers('riverside'), [])
+
+    def test_delete_unindexes(self):
+        self.center.delete()
+        self.assertEqual(search_centers('riverside'), [])
+
+    def test_inactive_centers_hidden(self):
+        DonationCenter.objects.filter(pk=self.center.pk).update(is_active=False)
+        self.assertEqual(search_centers('riverside'), [])
+
+    def test_emergency_requests(self):
+        self.assertEqual(search_emergency_requests('mary'), [self.request])
+        EmergencyRequest.objects.filter(pk=self.request.pk).update(status='fulfilled')
+        self.assertEqual(search_emergency_requests('mary'), [])
+
+    def test_expired_requests_hidden(self):
+        EmergencyRequest.objects.filter(pk=self.request.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(search_emergency_requests('mary'), [])
+
+    def test_icontains_fallback(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(search_centers('side mill'), [self.center])
+            self.assertEqual(search_centers('side harbour'), [])
+            self.assertEqual(search_emergency_requests('mary spring'), [self.request])
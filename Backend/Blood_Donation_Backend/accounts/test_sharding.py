@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Donation, DonationCenter, MedicalAllergy, UserProfile, UserShard
+from .sharding import ID_BLOCK, RegionRouter, move_user, scatter, seed_id_blocks, users_by_shard
+
+# Declared in Blood_Donation_Backend.test_settings
+SHARD = 'shard_test'
+
+
+@override_settings(
+    THROTTLE_BUCKETS={}, SHARDS={'default': 'default', 'north': SHARD},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class RegionShardTests(TransactionTestCase):
+    # Committed rows: scatter() reads every shard from its own threads
+    databases = {'default', SHARD}
+
+    def setUp(self):
+        seed_id_blocks(using=SHARD)
+        self.center = DonationCenter.objects.create(
+            name='North', address='1 Main St', phone_number='555-0100', region='north',
+        )
+
+    def register(self, username, **extra):
+        return APIClient().post('/api/register/', {
+            'username': username, 'password': 'Sturdy-pass-42', 'password2': 'Sturdy-pass-42', **extra,
+        }, format='json')
+
+    def client_for(self, username):
+        client = APIClient()
+        # A fresh instance: db_for_user memoizes the shard on the user object
+        client.force_authenticate(User.objects.get(username=username))
+        return client
+
+    def test_registration_places_the_donor_in_their_region(self):
+        self.assertEqual(self.register('nora', region='north').status_code, 201)
+        user = User.objects.get(username='nora')
+        self.assertEqual(UserShard.objects.get(user=user).region, 'north')
+        # Created in the shard, not moved there: its id comes from the shard's block
+        self.assertGreater(UserProfile.objects.using(SHARD).get(user=user).pk, ID_BLOCK)
+        self.assertFalse(UserProfile.objects.using('default').filter(user=user).exists())
+        # The shard holds a copy of the user without the password hash
+        self.assertEqual(User.objects.using(SHARD).get(pk=user.pk).password, '!')
+
+        response = self.client_for('nora').get('/api/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'nora')
+
+    def test_registration_without_a_region_stays_in_the_default_shard(self):
+        self.assertEqual(self.register('dana').status_code, 201)
+        user = User.objects.get(username='dana')
+        self.assertFalse(UserShard.objects.filter(user=user).exists())
+        self.assertTrue(UserProfile.objects.using('default').filter(user=user).exists())
+
+    def test_unknown_region_is_rejected(self):
+        response = self.register('zed', region='atlantis')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('region', response.json()['errors'])
+        self.assertFalse(User.objects.filter(username='zed').exists())
+
+    def test_writes_and_reads_stay_in_the_shard(self):
+        self.register('nora', region='north')
+        client = self.client_for('nora')
+        response = client.post('/api/allergies/', {'allergy_name': 'Latex', 'severity': 'mild'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Numbered from the shard's id block
+        self.assertGreaterEqual(response.json()['id'], ID_BLOCK)
+        self.assertEqual(MedicalAllergy.objects.using(SHARD).count(), 1)
+        self.assertEqual(MedicalAllergy.objects.using('default').count(), 0)
+        self.assertEqual([row['allergy_name'] for row in client.get('/api/allergies/').json()], ['Latex'])
+
+        # The center was mirrored, so the shard can join donations to it
+        user = User.objects.get(username='nora')
+        Donation.objects.create(
+            user=user, donation_center=self.center, status='scheduled', scheduled_date=timezone.now(),
+        )
+        rows = client.get('/api/donations/').json()
+        self.assertEqual([row['donation_center']['name'] for row in rows], ['North'])
+
+    def test_move_user_and_scatter(self):
+        self.register('nora', region='north')
+        self.register('dana')
+        nora, dana = User.objects.get(username='nora'), User.objects.get(username='dana')
+        self.assertEqual(users_by_shard([nora.pk, dana.pk]), {SHARD: [nora.pk], 'default': [dana.pk]})
+        counts = scatter(lambda alias: UserProfile.objects.using(alias).count())
+        self.assertEqual(counts, [1, 1])
+
+        MedicalAllergy.objects.create(user=nora, allergy_name='Latex')
+        self.assertEqual(move_user(nora, 'default'), 2)
+        self.assertEqual(MedicalAllergy.objects.using('default').filter(user=nora).count(), 1)
+        self.assertFalse(MedicalAllergy.objects.using(SHARD).exists())
+        self.assertFalse(User.objects.using(SHARD).filter(pk=nora.pk).exists())
+        self.assertEqual(UserShard.objects.get(user=nora).region, 'default')
+
+    def test_data_migrations_skip_shards(self):
+        router = RegionRouter()
+        # RunPython and RunSQL pass no model name
+        self.assertIs(router.allow_migrate(SHARD, 'accounts'), False)
+        self.assertIs(router.allow_migrate(SHARD, 'accounts', shards=True), True)
+        self.assertIsNone(router.allow_migrate('default', 'accounts'))
+        self.assertIsNone(router.allow_migrate(SHARD, 'accounts', model_name='donation'))
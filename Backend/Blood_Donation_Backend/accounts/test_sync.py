@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import DonationAppointment, DonationCenter, MedicalAllergy, Tombstone
+from .sync import TOMBSTONE_RETENTION, encode_cursor
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='donor', password='pass12345')
+        cls.other = User.objects.create_user(username='other', password='pass12345')
+        cls.center = DonationCenter.objects.create(name='North', address='1 Main St', phone_number='555-0100')
+        cls.allergies = [
+            MedicalAllergy.objects.create(user=cls.user, allergy_name=name) for name in ('latex', 'pollen', 'nuts')
+        ]
+        cls.appointment = DonationAppointment.objects.create(
+            user=cls.user, donation_center=cls.center, appointment_date=datetime(2026, 11, 1, 9, tzinfo=dt_timezone.utc),
+        )
+        MedicalAllergy.objects.create(user=cls.other, allergy_name='dust')
+        # Everything settled well before the commit-lag horizon
+        cls.long_ago = timezone.now() - timedelta(hours=1)
+        MedicalAllergy.objects.update(updated_at=cls.long_ago)
+        DonationAppointment.objects.update(updated_at=cls.long_ago)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, data, stream='allergies'):
+        return [row['id'] for row in data['changes'][stream]]
+
+    def touch(self, row, minutes_ago=1):
+        type(row).objects.filter(pk=row.pk).update(updated_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def test_full_sync_then_nothing_new(self):
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual(self.ids(data), [a.pk for a in self.allergies])
+        self.assertEqual(self.ids(data, 'appointments'), [self.appointment.pk])
+        again = self.sync(data['cursor'])
+        self.assertFalse(again['full'])
+        self.assertEqual(self.ids(again), [])
+        self.assertEqual(self.ids(again, 'appointments'), [])
+
+    def test_only_changes_since_the_cursor(self):
+        cursor = self.sync()['cursor']
+        self.touch(self.allergies[1])
+        data = self.sync(cursor)
+        self.assertEqual(self.ids(data), [self.allergies[1].pk])
+        self.assertEqual(self.sync(data['cursor'])['changes']['allergies'], [])
+
+    def test_rows_inside_the_commit_lag_are_sent_again(self):
+        cursor = self.sync()['cursor']
+        MedicalAllergy.objects.filter(pk=self.allergies[0].pk).update(updated_at=timezone.now())
+        first = self.sync(cursor)
+        self.assertEqual(self.ids(first), [self.allergies[0].pk])
+        # The cursor did not move past a row that may still have company
+        self.assertEqual(self.ids(self.sync(first['cursor'])), [self.allergies[0].pk])
+
+    def test_pages_deliver_every_row_once(self):
+        seen, cursor = [], None
+        for _ in range(10):
+            data = self.sync(cursor, limit=1)
+            seen.extend(self.ids(data))
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [a.pk for a in self.allergies])
+
+    def test_equal_timestamps_are_ordered_by_id(self):
+        cursor = self.sync()['cursor']
+        stamp = timezone.now() - timedelta(minutes=1)
+        MedicalAllergy.objects.filter(user=self.user).update(updated_at=stamp)
+        first = self.sync(cursor, limit=2)
+        second = self.sync(first['cursor'], limit=2)
+        self.assertEqual(self.ids(first) + self.ids(second), [a.pk for a in self.allergies])
+
+    def test_tombstones(self):
+        cursor = self.sync()['cursor']
+        response = self.client.delete(f'/api/appointments/{self.appointment.pk}/')
+        self.assertEqual(response.status_code, 204)
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(minutes=1))
+        data = self.sync(cursor)
+        self.assertEqual(data['deleted']['appointments'], [self.appointment.pk])
+        self.assertEqual(self.sync(data['cursor'])['deleted']['appointments'], [])
+
+        # A full sync leaves deleted rows out and skips their tombstones
+        full = self.sync()
+        self.assertEqual(self.ids(full, 'appointments'), [])
+        self.assertEqual(full['deleted']['appointments'], [])
+        self.assertEqual(self.sync(full['cursor'])['deleted']['appointments'], [])
+
+    def test_cursor_older_than_tombstone_retention_forces_full_resync(self):
+        # Positions past every row: only the fallback can return them again
+        issued_at = timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1)
+        cursor = encode_cursor({'allergies': [timezone.now().isoformat(), 10 ** 9]}, issued_at)
+        data = self.sync(cursor)
+        self.assertTrue(data['full'])
+        self.assertEqual(self.ids(data), [a.pk for a in self.allergies])
+
+    def test_other_users_rows_are_not_synced(self):
+        data = self.sync()
+        names = [row['allergy_name'] for row in data['changes']['allergies']]
+        self.assertNotIn('dust', names)
+
+    def test_bad_parameters(self):
+        for params in ({'since': 'garbage'}, {'limit': 'ten'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/sync/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
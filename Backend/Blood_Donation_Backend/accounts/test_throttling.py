@@ -0,0 +1,83 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import throttling
+from .throttling import TokenBucketStore
+
+BUCKETS = {
+    'login': {
+        'ip': {'capacity': 20, 'per_minute': 10},
+        'user': {'capacity': 5, 'per_minute': 2},
+    },
+}
+
+
+@override_settings(
+    THROTTLE_BUCKETS=BUCKETS,
+    # Fast hashing: the ip bucket refills while slow logins run
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class LoginThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='victim', password='right-pass-123')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = TokenBucketStore(Path(tmp.name) / 'throttle.sqlite3')
+        patcher = mock.patch.object(throttling, '_store', store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def login(self, password, ip):
+        return self.client.post(
+            '/api/login/', {'username': 'victim', 'password': password}, format='json', REMOTE_ADDR=ip,
+        )
+
+    def test_failures_from_other_clients_do_not_lock_the_owner_out(self):
+        for i in range(6):
+            self.assertEqual(self.login('wrong', f'10.0.0.{i + 1}').status_code, 401)
+        self.assertEqual(self.login('right-pass-123', '192.168.1.20').status_code, 200)
+
+    def test_repeated_failures_from_one_client_are_throttled(self):
+        for _ in range(5):
+            self.assertEqual(self.login('wrong', '10.0.0.1').status_code, 401)
+        response = self.login('right-pass-123', '10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Another client is unaffected
+        self.assertEqual(self.login('right-pass-123', '10.0.0.2').status_code, 200)
+
+    def test_successful_logins_are_not_charged_to_the_username(self):
+        for _ in range(8):
+            self.assertEqual(self.login('right-pass-123', '10.0.0.1').status_code, 200)
+
+    def test_bucket_refills(self):
+        for _ in range(5):
+            self.login('wrong', '10.0.0.1')
+        self.assertEqual(self.login('right-pass-123', '10.0.0.1').status_code, 429)
+        # 2 per minute: one token back after 30 seconds
+        later = time.time() + 31
+        with mock.patch('accounts.throttling.time.time', return_value=later):
+            self.assertEqual(self.login('right-pass-123', '10.0.0.1').status_code, 200)
+
+    def test_ip_bucket_still_limits_every_attempt(self):
+        for i in range(20):
+            self.client.post('/api/login/', {'username': f'guess{i}', 'password': 'x'}, format='json',
+                             REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(self.login('right-pass-123', '10.0.0.9').status_code, 429)
+
+    def test_counters(self):
+        for _ in range(6):
+            self.login('wrong', '10.0.0.1')
+        counters = throttling.get_store().counters()
+        self.assertEqual(counters['login.user']['throttled'], 1)
+        self.assertEqual(counters['login.user']['allowed'], 5)
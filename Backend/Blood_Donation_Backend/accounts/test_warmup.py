@@ -0,0 +1,112 @@
+import json
+import subprocess
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from . import warmup
+from .management.commands.profile_imports import Command as ProfileImports
+
+TIMINGS = {'load_seconds': 0.2, 'first_request_seconds': 0.05, 'second_request_seconds': 0.005}
+
+
+def probe_result(total_us, returncode=0):
+    """What ``python -X importtime`` prints for two top-level imports adding up to ``total_us``."""
+    stderr = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        f'import time:       100 | {total_us // 2:10d} | django',
+        'import time:        50 |        400 |   django.utils',
+        f'import time:       200 | {total_us - total_us // 2:10d} | rest_framework',
+    ])
+    return subprocess.CompletedProcess([], returncode, stdout=json.dumps(TIMINGS) + '\n', stderr=stderr)
+
+
+class ProfileImportsTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def run_command(self, total_us, *args):
+        out = StringIO()
+        with mock.patch('subprocess.run', return_value=probe_result(total_us)) as run:
+            call_command('profile_imports', *args, stdout=out)
+        return out.getvalue(), run
+
+    def save_baseline(self, total_us):
+        path = self.dir / 'baseline.json'
+        self.run_command(total_us, '--save', str(path))
+        return path
+
+    def test_report(self):
+        output, run = self.run_command(10_000)
+        self.assertIn('-X', run.call_args.args[0])
+        self.assertIn('total import time 10.0 ms', output)
+        self.assertIn('first request 50.0 ms', output)
+
+    def test_save(self):
+        path = self.save_baseline(10_000)
+        report = json.loads(path.read_text())
+        self.assertEqual(report['total_import_ms'], 10.0)
+        self.assertEqual([m['module'] for m in report['modules']], ['django', 'django.utils', 'rest_framework'])
+
+    def test_regression_within_the_limit_passes(self):
+        baseline = self.save_baseline(10_000)
+        output, _ = self.run_command(10_400, '--baseline', str(baseline), '--fail-over', '5')
+        self.assertIn('total import +0.4 ms (+4.0%)', output)
+
+    def test_regression_over_the_limit_fails(self):
+        baseline = self.save_baseline(10_000)
+        with self.assertRaisesMessage(CommandError, 'regressed by 20.0% (limit 5.0%)'):
+            self.run_command(12_000, '--baseline', str(baseline), '--fail-over', '5')
+
+    def test_exit_status(self):
+        baseline = self.save_baseline(10_000)
+        with mock.patch('subprocess.run', return_value=probe_result(12_000)), \
+                mock.patch('sys.stderr', new_callable=StringIO), self.assertRaises(SystemExit) as exit:
+            ProfileImports(stdout=StringIO()).run_from_argv(
+                ['manage.py', 'profile_imports', '--baseline', str(baseline), '--fail-over', '5'],
+            )
+        self.assertEqual(exit.exception.code, 1)
+
+    def test_fail_over_needs_a_baseline(self):
+        with mock.patch('subprocess.run') as run, self.assertRaisesMessage(CommandError, '--baseline'):
+            call_command('profile_imports', '--fail-over', '5')
+        run.assert_not_called()
+
+    def test_probe_failure(self):
+        with mock.patch('subprocess.run', return_value=probe_result(0, returncode=1)), \
+                self.assertRaisesMessage(CommandError, 'Probe failed'):
+            call_command('profile_imports', stdout=StringIO())
+
+
+class WarmUpTests(TransactionTestCase):
+    # prime_databases closes every connection, which a TestCase transaction would
+    # not survive, and opens every configured alias, the test shard included
+    databases = '__all__'
+
+    def test_every_step_runs(self):
+        report = warmup.warm_up()
+        self.assertEqual(list(report), [name for name, _ in warmup.STEPS])
+        for name, step in report.items():
+            with self.subTest(step=name):
+                # The gazetteer step counts 0 entries when no file is configured
+                self.assertIsNotNone(step['count'])
+        self.assertGreater(report['urls']['count'], 0)
+        self.assertEqual(report['imports']['count'], len(warmup.PRELOAD_MODULES))
+
+    def test_failed_step_does_not_stop_the_others(self):
+        def broken():
+            raise OSError('gazetteer missing')
+
+        steps = [('imports', warmup.preload_modules), ('broken', broken), ('urls', warmup.resolve_urls)]
+        with mock.patch.object(warmup, 'STEPS', steps), self.assertLogs('accounts.warmup', 'WARNING') as logs:
+            report = warmup.warm_up()
+        self.assertIsNone(report['broken']['count'])
+        self.assertGreater(report['urls']['count'], 0)
+        self.assertIn('Warm-up step failed', logs.output[0])
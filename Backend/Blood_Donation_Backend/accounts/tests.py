@@ -0,0 +1,115 @@
+import re
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import (
+    UserProfile, Tombstone, ArchivedDonation, GeocodeCache,
+    Donation, DonationAppointment, EmergencyRequest
+)
+from .rollups import ROLLUPS, trend_queryset
+from .sync import SYNC_STREAMS, keyset_after
+from .views import (
+    DonationCenterListView, DonationHistoryView,
+    AppointmentListCreateView, AppointmentDetailView,
+    EmergencyRequestListView,
+    MedicalAllergyListCreateView, MedicationListCreateView,
+    MedicalConditionListCreateView
+)
+
+
+class QueryPlanTests(TestCase):
+    """Fail if a hot view query falls back to a full table scan or a temp sort."""
+
+    # "SCAN <table>" without an index is a full table scan; a scan over a
+    # (partial) index that already yields the requested order is fine.
+    FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='pass12345')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN checks are SQLite specific')
+
+    def view_queryset(self, view_class, params=None, **kwargs):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=self.user)
+        view = view_class()
+        view.setup(request, **kwargs)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    def assertIndexedPlan(self, queryset, range_pattern=None):
+        self.assertIndexedSQL(*queryset.query.sql_with_params(), range_pattern=range_pattern)
+
+    def assertIndexedSQL(self, sql, params=(), range_pattern=None):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+        if range_pattern:
+            # The index must be used for the keyset range, not just the user prefix
+            self.assertRegex(plan, range_pattern, f'Index range not used:\n{plan}')
+        self.assertIsNone(self.FULL_SCAN.search(plan), f'Full table scan:\n{plan}')
+        self.assertNotIn('USE TEMP B-TREE', plan, f'Temp B-tree sort:\n{plan}')
+
+    def test_donation_history(self):
+        self.assertIndexedPlan(self.view_queryset(DonationHistoryView))
+
+    def test_appointment_list(self):
+        self.assertIndexedPlan(self.view_queryset(AppointmentListCreateView))
+
+    def test_appointment_detail(self):
+        self.assertIndexedPlan(self.view_queryset(AppointmentDetailView, pk=1).filter(pk=1))
+
+    def test_emergency_request_list(self):
+        self.assertIndexedPlan(self.view_queryset(EmergencyRequestListView))
+
+    def test_donation_center_list(self):
+        self.assertIndexedPlan(self.view_queryset(DonationCenterListView))
+
+    def test_centers_open_at(self):
+        self.assertIndexedPlan(self.view_queryset(DonationCenterListView, {'open_at': '2026-01-05T10:00:00Z'}))
+
+    def test_medical_lists(self):
+        for view_class in (MedicalAllergyListCreateView, MedicationListCreateView,
+                           MedicalConditionListCreateView):
+            with self.subTest(view=view_class.__name__):
+                self.assertIndexedPlan(self.view_queryset(view_class))
+
+    def test_archived_donation_history(self):
+        self.assertIndexedPlan(ArchivedDonation.objects.filter(user=self.user).order_by('-scheduled_date'))
+
+    def test_profile_lookup(self):
+        self.assertIndexedPlan(UserProfile.objects.filter(user=self.user))
+
+    def test_geocode_cache_lookup(self):
+        self.assertIndexedPlan(GeocodeCache.objects.filter(key__in=['a' * 40, 'b' * 40]))
+
+    def test_sync_streams(self):
+        position = ['2026-01-01T00:00:00+00:00', 1]
+        for stream, (model, _, _) in SYNC_STREAMS.items():
+            with self.subTest(stream=stream):
+                queryset = keyset_after(model.objects.filter(user=self.user), 'updated_at', position)
+                self.assertIndexedPlan(queryset, range_pattern=r'updated_at>')
+        queryset = keyset_after(Tombstone.objects.filter(user=self.user), 'deleted_at', position)
+        self.assertIndexedPlan(queryset, range_pattern=r'deleted_at>')
+
+    def test_trend_reads(self):
+        for metric in ROLLUPS:
+            with self.subTest(metric=metric):
+                self.assertIndexedPlan(trend_queryset(metric, 'week', start='2026-01-01', end='2026-06-30'))
+
+    def test_admin_change_lists(self):
+        superuser = User.objects.create_superuser(username='operator', password='pass12345')
+        for model, status in ((Donation, 'completed'), (DonationAppointment, 'completed'), (EmergencyRequest, 'expired')):
+            with self.subTest(model=model.__name__):
+                request = RequestFactory().get('/', {'status': status, 'p': 3})
+                request.user = superuser
+                changelist = admin.site._registry[model].get_changelist_instance(request)
+                self.assertIndexedPlan(changelist.get_queryset(request)[100:150])
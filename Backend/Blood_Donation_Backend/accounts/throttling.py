@@ -0,0 +1,209 @@
+"""
+Token-bucket throttling shared by every worker process on the host.
+
+Buckets live in a small SQLite file next to the main database, so limits hold
+across gunicorn/uwsgi workers without an external cache. Each check is one
+short ``BEGIN IMMEDIATE`` transaction.
+"""
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counter (
+    scope TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, outcome)
+);
+"""
+
+# Buckets idle this long are full again and can be forgotten
+STALE_AFTER = 24 * 60 * 60
+
+
+class TokenBucketStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def consume(self, scope, key, capacity, refill_rate, cost=1.0):
+        """
+        Take ``cost`` tokens from the bucket ``scope:key``.
+
+        Returns ``(allowed, retry_after_seconds)``.
+        """
+        bucket_key = f'{scope}:{key}'
+        now = time.time()
+        conn = self.connection
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM bucket WHERE key = ?', (bucket_key,)
+            ).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (bucket_key, tokens, now),
+            )
+            conn.execute(
+                'INSERT INTO counter (scope, outcome, count) VALUES (?, ?, 1) '
+                'ON CONFLICT(scope, outcome) DO UPDATE SET count = count + 1',
+                (scope, 'allowed' if allowed else 'throttled'),
+            )
+            if random.random() < 0.001:
+                conn.execute('DELETE FROM bucket WHERE updated < ?', (now - STALE_AFTER,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        retry_after = 0 if allowed else (cost - tokens) / refill_rate
+        return allowed, retry_after
+
+    def check(self, scope, key, capacity, refill_rate, cost=1.0):
+        """Like ``consume`` but without spending: would ``cost`` tokens be available?"""
+        now = time.time()
+        conn = self.connection
+        row = conn.execute('SELECT tokens, updated FROM bucket WHERE key = ?', (f'{scope}:{key}',)).fetchone()
+        tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_rate)
+        if tokens >= cost:
+            return True, 0
+        conn.execute(
+            'INSERT INTO counter (scope, outcome, count) VALUES (?, ?, 1) '
+            'ON CONFLICT(scope, outcome) DO UPDATE SET count = count + 1',
+            (scope, 'throttled'),
+        )
+        return False, (cost - tokens) / refill_rate
+
+    def counters(self):
+        stats = {}
+        for scope, outcome, count in self.connection.execute('SELECT scope, outcome, count FROM counter'):
+            stats.setdefault(scope, {'allowed': 0, 'throttled': 0})[outcome] = count
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TokenBucketStore(settings.THROTTLE_STORE_PATH)
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle configured by ``settings.THROTTLE_BUCKETS[scope]``, which may hold
+    an ``'ip'`` and/or a ``'user'`` bucket of the form
+    ``{'capacity': <burst size>, 'per_minute': <sustained rate>}``.
+
+    Buckets named in ``charge_on_failure`` are only checked per request; the
+    view spends their tokens through ``record_failure()``.
+    """
+    scope = None
+    charge_on_failure = ()
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_user_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        return None
+
+    def allow_request(self, request, view):
+        config = getattr(settings, 'THROTTLE_BUCKETS', {}).get(self.scope)
+        if not config:
+            return True
+
+        idents = {'ip': self.get_ident(request), 'user': self.get_user_ident(request)}
+        for kind, bucket in config.items():
+            ident = idents.get(kind)
+            if ident is None:
+                continue
+            spend = get_store().check if kind in self.charge_on_failure else get_store().consume
+            try:
+                allowed, retry_after = spend(
+                    f'{self.scope}.{kind}', ident,
+                    capacity=bucket['capacity'],
+                    refill_rate=bucket['per_minute'] / 60.0,
+                )
+            except sqlite3.Error:
+                # Fail open: a broken throttle store must not take logins down
+                logger.warning('Throttle store unavailable', exc_info=True)
+                return True
+            if not allowed:
+                self.wait_seconds = retry_after
+                return False
+        return True
+
+    def record_failure(self, request):
+        """Spend a token from each ``charge_on_failure`` bucket of this request."""
+        config = getattr(settings, 'THROTTLE_BUCKETS', {}).get(self.scope, {})
+        idents = {'ip': self.get_ident(request), 'user': self.get_user_ident(request)}
+        for kind in self.charge_on_failure:
+            bucket, ident = config.get(kind), idents.get(kind)
+            if bucket is None or ident is None:
+                continue
+            try:
+                get_store().consume(
+                    f'{self.scope}.{kind}', ident,
+                    capacity=bucket['capacity'],
+                    refill_rate=bucket['per_minute'] / 60.0,
+                )
+            except sqlite3.Error:
+                logger.warning('Throttle store unavailable', exc_info=True)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+    # Only failed logins count against the username, so the owner can still log in
+    charge_on_failure = ('user',)
+
+    def get_user_ident(self, request):
+        # Not authenticated yet: key the per-user bucket on the client and the
+        # attempted username, so nobody can lock another client out of an account
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return f'{self.get_ident(request)}:{str(username).lower()}' if username else None
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
+
+
+class EmergencyResponseThrottle(TokenBucketThrottle):
+    scope = 'emergency_response'
@@ -1,21 +1,23 @@
 from django.urls import path
 from .views import (
-    RegisterView, UserView, UserProfileView,
+    LoginView, RegisterView, UserView, UserProfileView,
     DonationCenterListView, DonationHistoryView,
     AppointmentListCreateView, AppointmentDetailView,
-    EmergencyRequestListView, EmergencyResponseCreateView,
+    EmergencyRequestListView, EmergencyResponseCreateView, EmergencyResponseDetailView,
     MedicalAllergyListCreateView, MedicalAllergyDetailView,
     MedicationListCreateView, MedicationDetailView,
-    MedicalConditionListCreateView, MedicalConditionDetailView
+    MedicalConditionListCreateView, MedicalConditionDetailView,
+    SearchView, ExportView, MetricsView, SyncView, TrendsView,
+    ShortageForecastListView
 )
 from .test_views import test_register
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     # Authentication
     path('register/', RegisterView.as_view(), name='register'),
     path('test-register/', test_register, name='test_register'),
-    path('login/', TokenObtainPairView.as_view(), name='login'),
+    path('login/', LoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # User Profile
@@ -35,6 +37,23 @@ urlpatterns = [
     # Emergency Requests
     path('emergency-requests/', EmergencyRequestListView.as_view(), name='emergency_requests'),
     path('emergency-responses/', EmergencyResponseCreateView.as_view(), name='emergency_responses'),
+    path('emergency-responses/<int:pk>/', EmergencyResponseDetailView.as_view(), name='emergency_response_detail'),
+    
+    # Offline sync
+    path('sync/', SyncView.as_view(), name='sync'),
+    
+    # Search
+    path('search/', SearchView.as_view(), name='search'),
+    
+    # Exports
+    path('exports/<str:kind>/', ExportView.as_view(), name='export'),
+    
+    # Analytics
+    path('analytics/trends/', TrendsView.as_view(), name='analytics_trends'),
+    path('forecasts/shortages/', ShortageForecastListView.as_view(), name='shortage_forecasts'),
+    
+    # Monitoring
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     
     # Medical Information
     path('allergies/', MedicalAllergyListCreateView.as_view(), name='allergies'),
@@ -1,26 +1,63 @@
+import logging
+
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .serializers import (
     UserSerializer, RegisterSerializer, UserProfileSerializer,
     MedicalAllergySerializer, MedicationSerializer, MedicalConditionSerializer,
     DonationCenterSerializer, DonationSerializer, DonationAppointmentSerializer,
-    EmergencyRequestSerializer, EmergencyResponseSerializer
+    EmergencyRequestSerializer, EmergencyResponseSerializer, ShortageForecastSerializer
 )
 from .models import (
     UserProfile, MedicalAllergy, Medication, MedicalCondition,
     DonationCenter, Donation, DonationAppointment,
-    EmergencyRequest, EmergencyResponse
+    EmergencyRequest, EmergencyResponse, NotificationOutbox, ShortageForecast
+)
+from . import profile_cache
+from .sync import InvalidCursor, TombstoneDestroyMixin, sync_changes
+from .conditional import ConditionalGetMixin, conditional_stats, make_etag
+from .search import search_centers, search_emergency_requests
+from .opening_hours import is_open_at
+from .archive import full_history
+from .sharding import db_for_user
+from .exports import build_export_querysets, iter_export
+from .rollups import trend_queryset, watermark_position
+from .notifications import outbox_stats
+from .jobs import queue_stats
+from .load_shedding import load_shedding_stats
+from .throttling import (
+    LoginThrottle, RegisterThrottle, EmergencyResponseThrottle, get_store as get_throttle_store
 )
 
+logger = logging.getLogger(__name__)
+
+class LoginView(TokenObtainPairView):
+    throttle_classes = (LoginThrottle,)
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            LoginThrottle().record_failure(request)
+            raise
+
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     serializer_class = RegisterSerializer
+    throttle_classes = (RegisterThrottle,)
     
     def create(self, request, *args, **kwargs):
-        print(f"Registration data received: {request.data}")  # Debug logging
+        logger.info('Registration data received', extra={'data': request.data})
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
@@ -32,7 +69,7 @@ class RegisterView(generics.CreateAPIView):
                 'message': 'User created successfully'
             }, status=status.HTTP_201_CREATED)
         else:
-            print(f"Serializer errors: {serializer.errors}")  # Debug logging
+            logger.info('Registration rejected', extra={'errors': serializer.errors})
             return Response({
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -49,65 +86,109 @@ class CurrentUserView(generics.RetrieveAPIView):
     def get_object(self):
         return self.request.user
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = UserProfileSerializer
     
     def get_object(self):
-        profile, created = UserProfile.objects.get_or_create(user=self.request.user)
+        # Profiles are created with the user, so this is a plain read. The
+        # profile lives in the user's shard, so attach the user rather than join
+        profile = get_object_or_404(UserProfile.objects.for_user(self.request.user))
+        profile.user = self.request.user
         return profile
     
+    def get_validators(self, request, *args, **kwargs):
+        # The cache version changes with the profile and every medical record
+        return make_etag('profile', request.user.pk, profile_cache.get_version(request.user.pk)), None
+    
+    def retrieve(self, request, *args, **kwargs):
+        version, data = profile_cache.get_cached(request.user.pk)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            profile_cache.set_cached(request.user.pk, version, data)
+        return Response(data)
+    
     def update(self, request, *args, **kwargs):
-        print(f"Profile update data received: {request.data}")  # Debug logging
+        logger.info('Profile update received', extra={'data': request.data})
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         
         if serializer.is_valid():
             self.perform_update(serializer)
-            print(f"Profile updated successfully: {serializer.data}")  # Debug logging
+            logger.info('Profile updated', extra={'data': {'user_id': request.user.pk, 'fields': sorted(request.data)}})
             return Response(serializer.data)
         else:
-            print(f"Profile serializer errors: {serializer.errors}")  # Debug logging
+            logger.info('Profile update rejected', extra={'errors': serializer.errors})
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Donation Centers
 class DonationCenterListView(generics.ListAPIView):
+    """Active centers by name; ``?open_at=now`` or ``?open_at=<ISO date-time>`` keeps those open then."""
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = DonationCenterSerializer
     
     def get_queryset(self):
-        return DonationCenter.objects.filter(is_active=True)
+        queryset = DonationCenter.objects.filter(is_active=True)
+        open_at = self.request.query_params.get('open_at')
+        if open_at:
+            moment = timezone.now() if open_at == 'now' else parse_datetime(open_at)
+            if moment is None:
+                raise ValidationError({'open_at': "Must be 'now' or an ISO 8601 date-time."})
+            queryset = queryset.filter(is_open_at(moment))
+        return queryset.order_by('name')
 
 # Donations History
-class DonationHistoryView(generics.ListAPIView):
+class DonationHistoryView(ConditionalGetMixin, generics.ListAPIView):
+    """Live donations; ``?history=all`` merges in the archived ones."""
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = DonationSerializer
+    conditional_related = ('donation_center',)
     
     def get_queryset(self):
-        return Donation.objects.filter(user=self.request.user)
+        return Donation.objects.for_user(self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('history') != 'all':
+            return super().list(request, *args, **kwargs)
+        rows = full_history('donations', using=db_for_user(request.user), user=request.user)
+        return Response(self.get_serializer(rows, many=True).data)
 
 # Appointments
-class AppointmentListCreateView(generics.ListCreateAPIView):
+class AppointmentListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = DonationAppointmentSerializer
+    conditional_related = ('donation_center',)
     
     def get_queryset(self):
-        return DonationAppointment.objects.filter(user=self.request.user)
+        return DonationAppointment.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AppointmentDetailView(TombstoneDestroyMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = DonationAppointmentSerializer
+    sync_kind = 'appointments'
+    conditional_related = ('donation_center',)
     
     def get_queryset(self):
-        return DonationAppointment.objects.filter(user=self.request.user)
+        return DonationAppointment.objects.for_user(self.request.user)
 
 # Emergency Requests
-class EmergencyRequestListView(generics.ListAPIView):
-    permission_classes = (permissions.IsAuthenticated,)
+class CanRaiseEmergencyRequest(permissions.BasePermission):
+    """
+    Any signed-in user may read; only staff and hospital accounts (granted
+    ``accounts.add_emergencyrequest``) may raise a request, which alerts donors.
+    """
+
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return request.user.is_staff or request.user.has_perm('accounts.add_emergencyrequest')
+
+class EmergencyRequestListView(ConditionalGetMixin, generics.ListCreateAPIView):
+    permission_classes = (permissions.IsAuthenticated, CanRaiseEmergencyRequest)
     serializer_class = EmergencyRequestSerializer
     
     def get_queryset(self):
@@ -115,13 +196,172 @@ class EmergencyRequestListView(generics.ListAPIView):
             status='active',
             expires_at__gt=timezone.now()
         ).order_by('-urgency', '-created_at')
+    
+    def perform_create(self, serializer):
+        # Donor fan-out happens in the process_notifications worker, not here
+        with transaction.atomic():
+            emergency_request = serializer.save()
+            NotificationOutbox.enqueue_emergency(emergency_request)
 
 class EmergencyResponseCreateView(generics.CreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = EmergencyResponseSerializer
+    throttle_classes = (EmergencyResponseThrottle,)
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                response = serializer.save(user=self.request.user)
+                EmergencyRequest.apply_response_change(
+                    response.emergency_request_id, new_status=response.status
+                )
+        except IntegrityError:
+            raise ValidationError({'emergency_request_id': ['You have already responded to this request.']})
+
+class EmergencyResponseDetailView(generics.RetrieveUpdateAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = EmergencyResponseSerializer
+    
+    def get_queryset(self):
+        return EmergencyResponse.objects.filter(user=self.request.user)
+    
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        new_status = serializer.validated_data.pop('status', instance.status)
+        with transaction.atomic():
+            if not instance.change_status(new_status):
+                raise ValidationError({'status': ['This response was changed concurrently, please retry.']})
+            serializer.save()
+
+# Search
+class SearchView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_limit = 50
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kind = request.query_params.get('type')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.max_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        context = {'request': request}
+        results = {}
+        if kind in (None, 'centers'):
+            results['centers'] = DonationCenterSerializer(
+                search_centers(query, limit), many=True, context=context
+            ).data
+        if kind in (None, 'emergency_requests'):
+            results['emergency_requests'] = EmergencyRequestSerializer(
+                search_emergency_requests(query, limit), many=True, context=context
+            ).data
+        return Response({'query': query, 'results': results})
+
+# Bulk exports for partner hospitals and auditors
+class ExportView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+    content_types = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+    
+    def get(self, request, kind):
+        params = request.query_params
+        # 'format' is reserved by DRF for renderer negotiation
+        export_format = params.get('output', 'csv')
+        try:
+            querysets = build_export_querysets(
+                kind,
+                center=params.get('center'),
+                start=params.get('start'),
+                end=params.get('end'),
+                status=params.get('status'),
+                include_archived=params.get('history') == 'all',
+            )
+            rows = iter_export(kind, export_format, querysets)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(rows, content_type=self.content_types[export_format])
+        filename = f"{kind}-{timezone.now():%Y%m%d%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+# Analytics
+class TrendsView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+    
+    def get(self, request):
+        params = request.query_params
+        metric = params.get('metric', 'donations')
+        try:
+            rows = trend_queryset(
+                metric,
+                grain=params.get('grain', 'week'),
+                start=params.get('start'),
+                end=params.get('end'),
+                **{key: params.get(key) for key in ('center', 'blood_type', 'urgency') if key in params}
+            )
+            results = list(rows)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'metric': metric,
+            'grain': params.get('grain', 'week'),
+            'as_of': watermark_position(metric),
+            'results': results,
+        })
+
+class ShortageForecastListView(generics.ListAPIView):
+    """Latest nightly forecast; only (center, blood type) pairs expected to run short unless ?all=1."""
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = ShortageForecastSerializer
+    
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = ShortageForecast.objects.select_related('donation_center')
+        if params.get('center'):
+            try:
+                queryset = queryset.filter(donation_center_id=int(params['center']))
+            except ValueError:
+                raise ValidationError({'center': 'Must be an integer id.'})
+        if params.get('blood_type'):
+            queryset = queryset.filter(blood_type=params['blood_type'])
+        if params.get('all') in ('1', 'true'):
+            return queryset.order_by('donation_center_id', 'blood_type')
+        return queryset.filter(shortage__gt=0).order_by('-shortage')
+
+# Delta sync for offline clients
+class SyncView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_limit = 1000
+    
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 500)), self.max_limit))
+            data = sync_changes(
+                request.user,
+                cursor=request.query_params.get('since') or None,
+                limit=limit,
+                context={'request': request},
+            )
+        except (InvalidCursor, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+# Operational metrics
+class MetricsView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+    
+    def get(self, request):
+        return Response({
+            'throttling': get_throttle_store().counters(),
+            'notifications': outbox_stats(),
+            'jobs': queue_stats(),
+            'conditional_get': conditional_stats(),
+            'load_shedding': load_shedding_stats(),
+        })
 
 # Medical Information Views
 class MedicalAllergyListCreateView(generics.ListCreateAPIView):
@@ -129,50 +369,53 @@ class MedicalAllergyListCreateView(generics.ListCreateAPIView):
     serializer_class = MedicalAllergySerializer
     
     def get_queryset(self):
-        return MedicalAllergy.objects.filter(user=self.request.user)
+        return MedicalAllergy.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class MedicalAllergyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MedicalAllergyDetailView(TombstoneDestroyMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = MedicalAllergySerializer
+    sync_kind = 'allergies'
     
     def get_queryset(self):
-        return MedicalAllergy.objects.filter(user=self.request.user)
+        return MedicalAllergy.objects.for_user(self.request.user)
 
 class MedicationListCreateView(generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = MedicationSerializer
     
     def get_queryset(self):
-        return Medication.objects.filter(user=self.request.user)
+        return Medication.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class MedicationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MedicationDetailView(TombstoneDestroyMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = MedicationSerializer
+    sync_kind = 'medications'
     
     def get_queryset(self):
-        return Medication.objects.filter(user=self.request.user)
+        return Medication.objects.for_user(self.request.user)
 
 class MedicalConditionListCreateView(generics.ListCreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = MedicalConditionSerializer
     
     def get_queryset(self):
-        return MedicalCondition.objects.filter(user=self.request.user)
+        return MedicalCondition.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class MedicalConditionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MedicalConditionDetailView(TombstoneDestroyMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = MedicalConditionSerializer
+    sync_kind = 'medical_conditions'
     
     def get_queryset(self):
-        return MedicalCondition.objects.filter(user=self.request.user)
+        return MedicalCondition.objects.for_user(self.request.user)
 
-# JWT login view is provided by SimpleJWT
+# JWT login view is provided by SimpleJWT (throttled via LoginView above)
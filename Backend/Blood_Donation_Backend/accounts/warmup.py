@@ -0,0 +1,120 @@
+"""
+Pay the first-request costs of a fresh worker before it takes traffic.
+
+Enabled by ``DJANGO_WARMUP=1`` in the environment (see ``wsgi.py`` and
+``asgi.py``). Each step is best effort: a failure is logged and startup
+carries on, so a broken warm-up can only make the first request slower.
+"""
+import logging
+import time
+from importlib import import_module
+
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by Django/DRF on the first request otherwise
+PRELOAD_MODULES = [
+    'rest_framework.generics',
+    'rest_framework.metadata',
+    'rest_framework.negotiation',
+    'rest_framework.parsers',
+    'rest_framework.renderers',
+    'rest_framework_simplejwt.authentication',
+    'rest_framework_simplejwt.serializers',
+    'rest_framework_simplejwt.tokens',
+    'accounts.views',
+]
+
+API_SETTINGS = [
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_METADATA_CLASS',
+]
+
+
+def _url_patterns(patterns):
+    for pattern in patterns:
+        pattern.pattern.regex  # compiled lazily on first access
+        if hasattr(pattern, 'url_patterns'):
+            yield from _url_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def preload_modules():
+    for name in PRELOAD_MODULES:
+        import_module(name)
+    for name in API_SETTINGS:
+        # Resolves the dotted paths and imports the classes
+        getattr(api_settings, name)
+    return len(PRELOAD_MODULES)
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # builds the reverse lookup tables
+    return sum(1 for _ in _url_patterns(resolver.url_patterns))
+
+
+def build_serializers():
+    built = 0
+    for pattern in _url_patterns(get_resolver().url_patterns):
+        view_class = getattr(pattern.callback, 'view_class', None)
+        serializer_class = getattr(view_class, 'serializer_class', None)
+        if serializer_class is None:
+            continue
+        # Fills model _meta caches and imports field/validator modules
+        serializer_class().fields
+        built += 1
+    return built
+
+
+def prime_databases():
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    # Opening the file loads the driver and warms the OS page cache; close
+    # again so pre-forked workers never share a connection
+    connections.close_all()
+    return len(connections.all())
+
+
+def load_gazetteer():
+    # Otherwise the first profile save of the process reads the whole file
+    from .geocoding import get_gazetteer
+    gazetteer = get_gazetteer()
+    return len(gazetteer.postal_codes) + len(gazetteer.places)
+
+
+STEPS = [
+    ('imports', preload_modules),
+    ('urls', resolve_urls),
+    ('serializers', build_serializers),
+    ('database', prime_databases),
+    ('gazetteer', load_gazetteer),
+]
+
+
+def warm_up():
+    """Run every warm-up step; returns ``{step: {'seconds': s, 'count': n}}``."""
+    report = {}
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            count = step()
+        except Exception:
+            logger.warning('Warm-up step failed', exc_info=True, extra={'data': {'step': name}})
+            count = None
+        report[name] = {'seconds': round(time.perf_counter() - step_started, 4), 'count': count}
+    logger.info('Worker warm-up complete', extra={'data': {
+        'seconds': round(time.perf_counter() - started, 4),
+        'steps': report,
+    }})
+    return report